@@ -0,0 +1,196 @@
+"""
+Chronological simulation of the market models over long horizons.
+
+The horizon is solved in consecutive chunks (a day or a week) with the model of one step. The state at the end of a
+chunk is the initial state of the next one: the energy stored in the battery and the production of the last hour,
+which limits the ramps of the first hour (step2). The results of every chunk are appended to CSV files and the model
+is discarded, so the memory does not grow with the horizon:
+
+    python chronological.py --model copper_plate --days 365
+    python chronological.py --model battery --days 28 --chunk 168 --output output/battery_4_weeks
+    python chronological.py --model zonal --data scaled_240 --days 7   # CSV schema of data/, see scaled_instance.py
+
+The demand (system_demand.csv) and the wind profiles (wind_capacity_factors.csv) are hourly series in chronological
+order. A series shorter than the horizon is repeated, so the 24-hour profiles of data/ give the same day every day.
+"""
+import os
+import sys
+import time
+import importlib
+import argparse
+
+import pandas as pd
+from gurobipy import GRB
+
+from scaled_instance import DATA_DIR, load_dataset, model_inputs
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Model kind: (step directory, model class)
+MODELS = {
+    'copper_plate': ('step1', 'Step1_model'),
+    'battery': ('step2', 'Step2_model'),
+    'nodal': ('step3_nodal', 'Step3_model'),
+    'zonal': ('step3_zonal', 'Step3_zonal'),
+}
+
+def load_step(kind):
+    # InputData and model class of the step. The steps use flat imports, so only one step can be loaded per process
+    directory, model_class = MODELS[kind]
+    sys.path.insert(0, os.path.join(script_dir, directory))
+    input_data = importlib.import_module('input_data')
+    model = importlib.import_module('model')
+    return input_data.InputData, getattr(model, model_class)
+
+def hourly_series(values, hours):
+    # First hours of the series, repeated if it is shorter than the horizon
+    return [values[i % len(values)] for i in range(hours)]
+
+class ChronologicalSimulation:
+    """
+    Solves a model over a horizon in chunks and streams the results to output_dir.
+
+    Args:
+        kind (str): Model of MODELS.
+        inputs (dict): Inputs of scaled_instance.model_inputs.
+        hours (int): Length of the horizon [h].
+        chunk (int): Hours solved in every model, 24 (daily) or 168 (weekly).
+        output_dir (str): Directory of the CSV files.
+    """
+    def __init__(self, kind, inputs, hours, chunk=24, output_dir='output/chronological'):
+        self.kind = kind
+        self.inputs = inputs
+        self.hours = hours
+        self.chunk = chunk
+        self.output_dir = output_dir
+        self.InputData, self.Model = load_step(kind)
+
+        # Hourly series over the whole horizon
+        self.demand = hourly_series(inputs['system_demand'], hours)
+        self.wind = {
+            gen['Unit #']: hourly_series(gen['Pmax (MW)'], hours)
+            for gen in inputs['generators'] if gen['wind']
+        }
+
+        # State carried over between chunks
+        self.initial_battery_storage = None
+        self.p_initial = dict(inputs.get('p_initial', {}))
+
+    def chunk_input_data(self, start, length):
+        # InputData of the hours start + 1, ..., start + length of the horizon
+        inputs = self.inputs
+        generators = [
+            dict(gen, **{'Pmax (MW)': self.wind[gen['Unit #']][start:start + length]}) if gen['wind'] else gen
+            for gen in inputs['generators']
+        ]
+        demand = self.demand[start:start + length]
+        if self.kind in ('copper_plate', 'battery'):
+            demand_per_load = {d: share for (d, n), share in inputs['demand_per_load'].items()}
+        else:
+            demand_per_load = inputs['demand_per_load']
+
+        if self.kind == 'copper_plate':
+            return self.InputData(generators, inputs['bid_offers'], demand, demand_per_load, num_hours=length)
+        if self.kind == 'battery':
+            input_data = self.InputData(generators, inputs['bid_offers'], demand, demand_per_load, self.p_initial, num_hours=length)
+            input_data.initial_battery_storage = self.initial_battery_storage
+            return input_data
+        if self.kind == 'nodal':
+            return self.InputData(generators, inputs['bid_offers'], demand, demand_per_load,
+                                  inputs['bus_reactance'], inputs['bus_capacity'], num_hours=length)
+        return self.InputData(generators, inputs['bid_offers'], demand, demand_per_load,
+                              inputs['bus_reactance'], inputs['bus_capacity'], inputs['zone_mapping'], num_hours=length)
+
+    def prices(self, model):
+        # Price of every hour of the chunk, one column per node or zone for the network models
+        if self.kind == 'nodal':
+            prices = pd.Series(model.results.nodal_price).unstack(level=0)
+        elif self.kind == 'zonal':
+            prices = pd.Series(model.results.zonal_price).unstack(level=0)
+        else:
+            prices = pd.Series(model.results.price).to_frame('price')
+        return prices.loc[model.data.timeSpan]
+
+    def carry_over(self, model):
+        # The end of the chunk is the initial state of the next one
+        last = model.data.timeSpan[-1]
+        if self.kind == 'battery':
+            self.initial_battery_storage = model.results.stored_energy[last]
+            self.p_initial = {g: model.results.production[g, last] for g in model.data.generators}
+
+    def append(self, name, frame, start):
+        # Appends the rows of the chunk to a CSV file, indexed by the hour of the horizon
+        frame = frame.copy()
+        frame.index = [start + t for t in frame.index]
+        frame.index.name = 'hour'
+        path = os.path.join(self.output_dir, f'{name}.csv')
+        frame.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0)
+
+    def run(self, verbose=True):
+        """
+        Solves every chunk of the horizon in order.
+
+        Returns:
+            pd.DataFrame: Status, objective and times of every chunk (also written to chunks.csv).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = []
+        for number, start in enumerate(range(0, self.hours, self.chunk), 1):
+            length = min(self.chunk, self.hours - start)
+            begin = time.perf_counter()
+            model = self.Model(self.chunk_input_data(start, length))
+            build_time = time.perf_counter() - begin
+            model.model.setParam('OutputFlag', 0)
+            model.solve()
+
+            status = model.model.status
+            if status != GRB.OPTIMAL:
+                raise RuntimeError(f"Chunk {number} (hours {start + 1}-{start + length}) finished with status {status}")
+            model.extract()
+
+            self.append('prices', self.prices(model), start)
+            self.append('production', model.results.production_data, start)
+            if self.kind == 'battery':
+                battery = pd.DataFrame({
+                    'charging': model.results.power_charging,
+                    'discharging': model.results.power_discharging,
+                    'stored_energy': model.results.stored_energy,
+                })
+                self.append('battery', battery, start)
+            self.carry_over(model)
+
+            summary.append({
+                'chunk': number,
+                'first_hour': start + 1,
+                'hours': length,
+                'objective': model.results.objective,
+                'build': build_time,
+                'solve': model.profile['phases'].get('solve', 0),
+                'extract': model.profile['phases'].get('extract', 0),
+            })
+            pd.DataFrame(summary[-1:]).to_csv(os.path.join(self.output_dir, 'chunks.csv'), index=False,
+                                              mode='w' if number == 1 else 'a', header=number == 1)
+            if verbose:
+                print(f"Chunk {number}: hours {start + 1}-{start + length}, objective {model.results.objective:.2f}", flush=True)
+
+            # Frees the Gurobi model before building the next one
+            model.model.dispose()
+            del model
+        return pd.DataFrame(summary)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chronological simulation of a market model in daily or weekly chunks")
+    parser.add_argument('--model', choices=sorted(MODELS), required=True)
+    parser.add_argument('--days', type=int, default=7, help="Length of the horizon [days]")
+    parser.add_argument('--hours', type=int, default=None, help="Length of the horizon [h], overrides --days")
+    parser.add_argument('--chunk', type=int, default=24, help="Hours solved in every model, 24 (daily) or 168 (weekly)")
+    parser.add_argument('--data', default=DATA_DIR, help="Directory with the CSV schema of data/")
+    parser.add_argument('--output', default=os.path.join(script_dir, 'output', 'chronological'))
+    args = parser.parse_args()
+
+    hours = args.hours or 24 * args.days
+    inputs = model_inputs(load_dataset(args.data))
+    simulation = ChronologicalSimulation(args.model, inputs, hours, chunk=args.chunk, output_dir=args.output)
+    summary = simulation.run()
+    print(f"\n{len(summary)} chunks, total objective {summary['objective'].sum():.2f}, "
+          f"solve time {summary['solve'].sum():.2f} s. Results written to {args.output}")
@@ -0,0 +1,217 @@
+"""
+Decomposition of the nodal and zonal prices and surplus accounting of a solved step3 model.
+
+Every quantity is computed with matrix operations on the values and duals extracted in one call per constraint family,
+so the cost grows with the size of the arrays and not with Python loops over the buses and hours:
+
+    model = Step3_model(input_data); model.run()
+    decomposition = nodal_decomposition(model)
+    decomposition['congestion']                 # hours x buses
+    decomposition['congestion_rent'].sum()      # per line
+
+Nodal prices: LMP_n = energy + congestion_n. The energy component is the price of the reference bus and the
+congestion component is -sum_l PTDF[l, n] * mu_l, where mu_l is the dual of the flow limits of line l (positive when
+the line is congested from its first to its second bus), plus the same terms of the post-contingency limits of an N-1
+secure market. The merchandising surplus (what the loads pay minus what the
+producers are paid) equals the sum of the congestion rents flow_l * (LMP_to - LMP_from).
+
+Zonal prices: the same accounting with the zones and the borders between them. The energy component is the price of
+the first zone and the border duals are the reduced costs of the flows at their ATC limits.
+
+    python market_decomposition.py --model nodal --hours 24
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from network import incidence_matrix, ptdf_matrix
+
+# Arrays with one column per line (or border), the others have one column per bus (or zone)
+LINE_ARRAYS = ('flow', 'line_dual', 'congestion_rent')
+
+def values(model, items, attribute):
+    # Attribute of a list of Gurobi variables or constraints in a single call
+    return np.array(model.model.getAttr(attribute, items))
+
+def hourly(model, family, keys, attribute):
+    # hours x keys array of an attribute of a dict of variables or constraints indexed by (*key, t)
+    hours = model.data.timeSpan
+    items = [family[(*key, t) if isinstance(key, tuple) else (key, t)] for t in hours for key in keys]
+    return values(model, items, attribute).reshape(len(hours), len(keys))
+
+def market_arrays(model, price, unit_location, load_location, locations):
+    """
+    Production, demand, bids and surpluses of every location (bus or zone).
+
+    Args:
+        price (np.ndarray): hours x locations prices.
+        unit_location (list), load_location (list): Location of every generator and load.
+
+    Returns:
+        dict: producer_surplus and consumer_surplus (hours x locations) and merchandising_surplus (hours).
+    """
+    data = model.data
+    index = {location: i for i, location in enumerate(locations)}
+    production = hourly(model, model.variables.production, data.generators, 'X')
+    demand = hourly(model, model.variables.demand, data.loads, 'X')
+    bids = np.array([data.bid_offers[g] for g in data.generators])
+    demand_bids = np.array([[bid[d] for d in data.loads] for bid in data.demand_bid_price])
+
+    # Location of every generator and load as a 0/1 matrix
+    G = np.zeros((len(data.generators), len(locations)))
+    G[np.arange(len(data.generators)), [index[n] for n in unit_location]] = 1
+    D = np.zeros((len(data.loads), len(locations)))
+    D[np.arange(len(data.loads)), [index[n] for n in load_location]] = 1
+
+    unit_price = price @ G.T
+    load_price = price @ D.T
+    return {
+        'production': production @ G,
+        'demand': demand @ D,
+        'producer_surplus': ((unit_price - bids) * production) @ G,
+        'consumer_surplus': ((demand_bids - load_price) * demand) @ D,
+        'merchandising_surplus': (load_price * demand).sum(axis=1) - (unit_price * production).sum(axis=1),
+    }
+
+def as_frames(model, arrays, columns, lines):
+    # Labels the hours x locations and hours x lines arrays
+    hours = model.data.timeSpan
+    line_index = pd.MultiIndex.from_tuples(lines, names=['from', 'to'])
+    frames = {}
+    for name, array in arrays.items():
+        if array.ndim == 1:
+            frames[name] = pd.Series(array, index=hours, name=name)
+        elif name in LINE_ARRAYS:
+            frames[name] = pd.DataFrame(array, index=hours, columns=line_index)
+        else:
+            frames[name] = pd.DataFrame(array, index=hours, columns=columns)
+        frames[name].index.name = 'hour'
+    return frames
+
+def nodal_decomposition(model, reference=1):
+    """
+    Decomposes the prices of a solved Step3_model (step3_nodal).
+
+    Returns:
+        dict: DataFrames indexed by hour. lmp, energy, congestion, production, demand, producer_surplus and
+            consumer_surplus by bus; flow, line_dual and congestion_rent by line; merchandising_surplus (Series).
+    """
+    data = model.data
+    nodes = data.nodes
+    lines = list(data.bus_reactance.keys())
+
+    lmp = hourly(model, model.constraints.demand_equal_production, nodes, 'Pi')
+    line_dual = (hourly(model, model.constraints.max_bus_capacity, lines, 'Pi')
+                 + hourly(model, model.constraints.min_bus_capacity, lines, 'Pi'))
+    angle = hourly(model, model.variables.angle, nodes, 'X')
+
+    A = incidence_matrix(nodes, lines)
+    susceptance = 1 / np.array([data.bus_reactance[line] for line in lines])
+    flow = (angle @ A.T) * susceptance
+    ptdf = ptdf_matrix(nodes, lines, data.bus_reactance, reference)
+    congestion = -line_dual @ ptdf
+
+    # Post-contingency limits of the N-1 secure market (Step3_model.run_security_constrained). The flow they limit
+    # is flow_l + LODF[l, k] * flow_k, so their PTDF is PTDF[l] + LODF[l, k] * PTDF[k]
+    contingencies = getattr(model.constraints, 'contingency_limits', {})
+    if contingencies:
+        keys = list(contingencies)
+        position = {line: l for l, line in enumerate(lines)}
+        hour = {t: i for i, t in enumerate(data.timeSpan)}
+        dual = values(model, [c for key in keys for c in contingencies[key]], 'Pi').reshape(len(keys), 2).sum(axis=1)
+        l = np.array([position[line] for line, outage, t in keys])
+        k = np.array([position[outage] for line, outage, t in keys])
+        contingency_ptdf = ptdf[l] + model.lodf[l, k][:, None] * ptdf[k]
+        np.add.at(congestion, [hour[t] for line, outage, t in keys], -dual[:, None] * contingency_ptdf)
+
+    arrays = {
+        'lmp': lmp,
+        'energy': lmp - congestion,
+        'congestion': congestion,
+        'flow': flow,
+        'line_dual': line_dual,
+        'congestion_rent': -flow * (lmp @ A.T),
+    }
+    arrays.update(market_arrays(model, lmp, [data.P_node[g] for g in data.generators],
+                                [n for (d, n) in data.demand_per_load.keys()], nodes))
+    return as_frames(model, arrays, nodes, lines)
+
+def zonal_decomposition(model):
+    """
+    Decomposes the prices of a solved Step3_zonal (step3_zonal). The borders are the pairs of zones (a, b) with a < b,
+    and the flows are positive from a to b.
+
+    Returns:
+        dict: As nodal_decomposition, with zones instead of buses and borders instead of lines.
+    """
+    data = model.data
+    zones = data.zones
+    borders = [(a, b) for i, a in enumerate(zones) for b in zones[i + 1:]]
+
+    price = hourly(model, model.constraints.demand_equal_production, zones, 'Pi')
+    flow = hourly(model, model.variables.flow, borders, 'X')
+    # The flow of a border is only limited by the bounds of its two variables, flow[a, b] <= ATC and flow[b, a] >= -ATC
+    border_dual = (hourly(model, model.variables.flow, borders, 'RC')
+                   - hourly(model, model.variables.flow, [(b, a) for a, b in borders], 'RC'))
+
+    A = incidence_matrix(zones, borders)
+    energy = np.repeat(price[:, :1], len(zones), axis=1)
+    arrays = {
+        'lmp': price,
+        'energy': energy,
+        'congestion': price - energy,
+        'flow': flow,
+        'line_dual': border_dual,
+        'congestion_rent': -flow * (price @ A.T),
+    }
+    arrays.update(market_arrays(model, price, [data.zone_mapping[data.P_node[g]] for g in data.generators],
+                                [data.zone_mapping[n] for (d, n) in data.demand_per_load.keys()], zones))
+    return as_frames(model, arrays, zones, borders)
+
+def summary(decomposition):
+    # Totals over the time span, and the gap between the merchandising surplus and the congestion rents
+    return pd.Series({
+        'producer_surplus': decomposition['producer_surplus'].values.sum(),
+        'consumer_surplus': decomposition['consumer_surplus'].values.sum(),
+        'merchandising_surplus': decomposition['merchandising_surplus'].sum(),
+        'congestion_rent': decomposition['congestion_rent'].values.sum(),
+        'max_energy_spread': np.ptp(decomposition['energy'].values, axis=1).max(),
+    })
+
+if __name__ == "__main__":
+    from chronological import load_step
+    from scaled_instance import load_dataset, model_inputs
+
+    parser = argparse.ArgumentParser(description="Price decomposition and congestion rents of the nodal or zonal market")
+    parser.add_argument('--model', choices=['nodal', 'zonal'], required=True)
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--output', default=None, help="Directory of the CSV files")
+    args = parser.parse_args()
+
+    inputs = model_inputs(load_dataset())
+    InputData, Model = load_step(args.model)
+    if args.model == 'nodal':
+        input_data = InputData(inputs['generators'], inputs['bid_offers'], inputs['system_demand'], inputs['demand_per_load'],
+                               inputs['bus_reactance'], inputs['bus_capacity'], num_hours=args.hours)
+    else:
+        input_data = InputData(inputs['generators'], inputs['bid_offers'], inputs['system_demand'], inputs['demand_per_load'],
+                               inputs['bus_reactance'], inputs['bus_capacity'], inputs['zone_mapping'], num_hours=args.hours)
+    model = Model(input_data)
+    model.run()
+    decomposition = nodal_decomposition(model) if args.model == 'nodal' else zonal_decomposition(model)
+
+    print("\nCongestion component of the prices")
+    print(decomposition['congestion'].round(2))
+    print("\nCongestion rent of the congested lines")
+    rent = decomposition['congestion_rent'].sum()
+    print(rent[rent.abs() > 1e-6])
+    print("\nTotals")
+    print(summary(decomposition))
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for name, frame in decomposition.items():
+            frame.to_csv(os.path.join(args.output, f'{name}.csv'))
+        print(f"Results written to {args.output}")
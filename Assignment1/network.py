@@ -0,0 +1,71 @@
+"""
+DC power flow matrices of a network given by its line reactances.
+
+The lines are the keys (from bus, to bus) of bus_reactance and the flows are positive from the first to the second bus.
+Every matrix is a dense numpy array with the lines and buses in the order of the lines and nodes arguments:
+
+    A = incidence_matrix(nodes, lines)                      # lines x buses
+    H = ptdf_matrix(nodes, lines, bus_reactance)            # flow of every line per MW injected at every bus
+    flows = injections @ H.T                                # hours x lines, injections is hours x buses
+    L = lodf_matrix(H, nodes, lines)                        # change of the flows after the outage of every line
+"""
+import numpy as np
+
+def incidence_matrix(nodes, lines):
+    # +1 at the from bus and -1 at the to bus of every line
+    index = {n: i for i, n in enumerate(nodes)}
+    A = np.zeros((len(lines), len(nodes)))
+    rows = np.arange(len(lines))
+    A[rows, [index[n] for n, m in lines]] = 1
+    A[rows, [index[m] for n, m in lines]] = -1
+    return A
+
+def ptdf_matrix(nodes, lines, bus_reactance, reference=1):
+    """
+    Power transfer distribution factors.
+
+    Args:
+        nodes (list): Buses of the network.
+        lines (list): (from bus, to bus) keys of bus_reactance.
+        bus_reactance (dict): Reactance of every line.
+        reference (int): Slack bus, where every injection is withdrawn.
+
+    Returns:
+        np.ndarray: lines x buses matrix. Entry (l, n) is the flow on line l when 1 MW is injected at bus n and
+            withdrawn at the reference bus. The column of the reference bus is zero.
+    """
+    A = incidence_matrix(nodes, lines)
+    susceptance = 1 / np.array([bus_reactance[line] for line in lines])
+    B_line = susceptance[:, None] * A          # Flows as a function of the angles
+    B_bus = A.T @ B_line                        # Injections as a function of the angles
+    others = [i for i, n in enumerate(nodes) if n != reference]
+
+    ptdf = np.zeros((len(lines), len(nodes)))
+    # H = B_line B_bus^-1 without the reference bus, B_bus is symmetric
+    ptdf[:, others] = np.linalg.solve(B_bus[np.ix_(others, others)], B_line[:, others].T).T
+    return ptdf
+
+def lodf_matrix(ptdf, nodes, lines, tolerance=1e-6):
+    """
+    Line outage distribution factors.
+
+    Args:
+        ptdf (np.ndarray): lines x buses matrix of ptdf_matrix.
+        nodes (list), lines (list): Buses and lines in the order of the rows and columns of ptdf.
+        tolerance (float): Lines whose outage splits the network (1 - PTDF of the line on itself below the tolerance)
+            have no factors.
+
+    Returns:
+        np.ndarray: lines x lines matrix. Entry (l, k) is the change of the flow on line l per MW that flowed on line k
+            before its outage, so the flow after the outage of k is flow_l + LODF[l, k] * flow_k. The diagonal is -1
+            and the columns of the lines that split the network are NaN.
+    """
+    A = incidence_matrix(nodes, lines)
+    # Flow on every line per MW transferred from the first to the second bus of every line
+    transfer = ptdf @ A.T
+    denominator = 1 - np.diag(transfer)
+    islanding = denominator < tolerance
+    lodf = transfer / np.where(islanding, np.nan, denominator)
+    np.fill_diagonal(lodf, -1)
+    lodf[:, islanding] = np.nan
+    return lodf
@@ -0,0 +1,219 @@
+"""
+Synthetic scaled versions of the IEEE 24-bus system for stress testing the models.
+
+The 24-bus system in data/ is replicated K times. Copy k (0-based) renumbers its buses, units and loads
+by k * 24, k * 18 and k * 17, and consecutive copies are interconnected by tie lines between the same buses
+(a ring when K > 2). Generator bids and capacities are perturbed, every wind farm gets its own noisy copy of
+the wind profile and the system demand is scaled by K, so the share of every load is divided by K.
+
+The dataset has the tables of data/ and can be written with the same CSV schema or converted to the
+inputs of the InputData classes:
+
+    python scaled_instance.py --copies 10 --output scaled_240     # 240 buses
+
+    dataset = replicate(load_dataset(), copies=100)               # 2,400 buses
+    inputs = model_inputs(dataset)
+    input_data = InputData(inputs['generators'], inputs['bid_offers'], inputs['system_demand'], ...)
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Table name: CSV file
+FILES = {
+    'generators': 'GeneratorData.csv',
+    'bid_offers': 'bid_offers.csv',
+    'p_ini': 'p_ini.csv',
+    'system_demand': 'system_demand.csv',
+    'demand_per_load': 'demand_per_load.csv',
+    'wind_capacity_factors': 'wind_capacity_factors.csv',
+    'bus_reactance': 'bus_reactance.csv',
+    'bus_capacity': 'bus_capacity.csv',
+}
+
+BASE_BUSES = 24
+WIND_FARM_CAPACITY = 200
+
+# Zones of the 24-bus system, as in step3_zonal. Every copy keeps the zone of its base bus
+ZONE_MAPPING = {n: "Zone A" if n <= 12 else "Zone B" for n in range(1, BASE_BUSES + 1)}
+
+# Buses of a copy connected to the same buses of the next copy
+TIE_BUSES = (1, 13, 23)
+
+# Columns of GeneratorData.csv and bid_offers.csv that are perturbed
+CAPACITY_COLUMNS = ['Pmax (MW)', 'Pmin (MW)', 'R+ (MW)', 'R- (MW)', 'RU (MW/h)', 'RD (MW/h)']
+PRICE_COLUMNS = ['Bid', 'up_regulation', 'down_regulation', 'up_reserve', 'down_reserve']
+
+def load_dataset(data_dir=DATA_DIR):
+    # Tables of the 24-bus system
+    return {name: pd.read_csv(os.path.join(data_dir, file)) for name, file in FILES.items()}
+
+def write_dataset(dataset, output_dir):
+    # Writes the tables with the CSV schema of data/
+    os.makedirs(output_dir, exist_ok=True)
+    for name, file in FILES.items():
+        dataset[name].to_csv(os.path.join(output_dir, file), index=False)
+    return output_dir
+
+def tie_lines(copies, tie_reactance, tie_capacity):
+    # Lines between the TIE_BUSES of consecutive copies
+    pairs = [(k, k + 1) for k in range(copies - 1)]
+    if copies > 2:
+        pairs.append((copies - 1, 0))
+    lines = [(k * BASE_BUSES + bus, l * BASE_BUSES + bus) for k, l in pairs for bus in TIE_BUSES]
+    reactance = pd.DataFrame([(a, b, tie_reactance) for a, b in lines], columns=['From Bus', 'To Bus', 'Reactance'])
+    capacity = pd.DataFrame([(a, b, tie_capacity) for a, b in lines], columns=['From Bus', 'To Bus', 'Capacity'])
+    return reactance, capacity
+
+def replicate(base, copies, seed=0, bid_noise=0.05, capacity_noise=0.05, wind_noise=0.1,
+              demand_factor=1.0, tie_reactance=0.002, tie_capacity=500):
+    """
+    Replicates and interconnects the 24-bus system.
+
+    Args:
+        base (dict): Tables of load_dataset.
+        copies (int): Number of copies K. The system has 24 * K buses.
+        seed (int): Seed of the perturbations.
+        bid_noise (float): Standard deviation of the relative change of the bids (and reserve and regulation prices) of every unit.
+        capacity_noise (float): Standard deviation of the relative change of the capacities of every thermal unit.
+        wind_noise (float): Standard deviation of the relative change of the capacity factor of every wind farm and hour.
+        demand_factor (float): Extra scaling of the system demand on top of K.
+        tie_reactance (float), tie_capacity (float): Data of the tie lines between copies.
+
+    Returns:
+        dict: Tables with the schema of load_dataset. wind_capacity_factors keeps the base wind_cf column and adds
+            one column per wind unit ('unit_<id>') with its profile.
+    """
+    if copies < 1:
+        raise ValueError("The number of copies must be at least 1")
+    rng = np.random.default_rng(seed)
+    generators = base['generators']
+    num_units, num_loads = len(generators), len(base['demand_per_load'])
+
+    def factors(size, noise):
+        # Relative perturbations, kept positive
+        return np.clip(1 + noise * rng.standard_normal(size), 0.1, None)
+
+    units, bids, p_ini, profiles = [], [], [], {}
+    base_cf = base['wind_capacity_factors']['wind_cf'].to_numpy()
+    for k in range(copies):
+        unit = generators.copy()
+        unit['Unit #'] += k * num_units
+        unit['Node'] += k * BASE_BUSES
+        capacity = np.where(unit['wind'], 1.0, factors(num_units, capacity_noise))
+        for column in CAPACITY_COLUMNS:
+            unit[column] = unit[column] * capacity
+        units.append(unit)
+
+        bid = base['bid_offers'].copy()
+        bid['Unit'] += k * num_units
+        price = factors(num_units, bid_noise)
+        for column in PRICE_COLUMNS:
+            bid[column] = (bid[column] * price).round(2)
+        bids.append(bid)
+
+        initial = base['p_ini'].copy()
+        initial['Unit'] += k * num_units
+        initial['P_ini'] = np.minimum(initial['P_ini'] * capacity, unit['Pmax (MW)'].fillna(np.inf))
+        p_ini.append(initial)
+
+        for unit_id in unit.loc[unit['wind'], 'Unit #']:
+            profiles[f'unit_{unit_id}'] = np.clip(base_cf * factors(len(base_cf), wind_noise), 0, 1).round(3)
+
+    loads = []
+    for k in range(copies):
+        load = base['demand_per_load'].copy()
+        load['Load'] += k * num_loads
+        load['Node'] += k * BASE_BUSES
+        load['Demand'] = load['Demand'] / copies
+        loads.append(load)
+
+    reactance = [base['bus_reactance'].assign(**{'From Bus': base['bus_reactance']['From Bus'] + k * BASE_BUSES,
+                                                 'To Bus': base['bus_reactance']['To Bus'] + k * BASE_BUSES})
+                 for k in range(copies)]
+    capacity = [base['bus_capacity'].assign(**{'From Bus': base['bus_capacity']['From Bus'] + k * BASE_BUSES,
+                                               'To Bus': base['bus_capacity']['To Bus'] + k * BASE_BUSES})
+                for k in range(copies)]
+    tie_reactances, tie_capacities = tie_lines(copies, tie_reactance, tie_capacity)
+
+    wind = pd.concat([base['wind_capacity_factors'][['wind_cf']], pd.DataFrame(profiles)], axis=1)
+    return {
+        'generators': pd.concat(units, ignore_index=True),
+        'bid_offers': pd.concat(bids, ignore_index=True),
+        'p_ini': pd.concat(p_ini, ignore_index=True),
+        'system_demand': pd.DataFrame({'Demand': base['system_demand']['Demand'] * copies * demand_factor}),
+        'demand_per_load': pd.concat(loads, ignore_index=True),
+        'wind_capacity_factors': wind,
+        'bus_reactance': pd.concat(reactance + [tie_reactances], ignore_index=True),
+        'bus_capacity': pd.concat(capacity + [tie_capacities], ignore_index=True),
+    }
+
+def zone_mapping(dataset):
+    # Zone of every bus, the zone of its base bus
+    buses = pd.concat([dataset['bus_reactance']['From Bus'], dataset['bus_reactance']['To Bus']]).unique()
+    return {int(n): ZONE_MAPPING[(n - 1) % BASE_BUSES + 1] for n in sorted(buses)}
+
+def model_inputs(dataset, wind_farm_capacity=WIND_FARM_CAPACITY):
+    """
+    Converts the tables to the inputs of the InputData classes, as the input_data modules do with data/.
+    A wind unit uses its own profile if the dataset has one and the wind_cf column otherwise.
+
+    Returns:
+        dict: generators, bid_offers, bid_reserve_up, bid_reserve_down, p_initial, system_demand,
+            demand_per_load (indexed by (load, node), index it by load for the copper plate models),
+            bus_reactance, bus_capacity, zone_mapping and atc (capacity of the lines between zones).
+    """
+    wind = dataset['wind_capacity_factors']
+    generators = []
+    for gen in dataset['generators'].to_dict(orient='records'):
+        if gen['wind']:
+            column = f"unit_{gen['Unit #']}" if f"unit_{gen['Unit #']}" in wind else 'wind_cf'
+            gen['Pmax (MW)'] = (wind[column] * wind_farm_capacity).tolist()
+        else:
+            gen['Pmax (MW)'] = float(gen['Pmax (MW)'])
+        generators.append(gen)
+
+    bids = dataset['bid_offers'].set_index('Unit')
+    bus_reactance = {(int(a), int(b)): x for a, b, x in dataset['bus_reactance'].itertuples(index=False)}
+    bus_capacity = {(int(a), int(b)): c for a, b, c in dataset['bus_capacity'].itertuples(index=False)}
+    zones = zone_mapping(dataset)
+    return {
+        'generators': generators,
+        'bid_offers': bids['Bid'].to_dict(),
+        'bid_reserve_up': bids['up_reserve'].to_dict(),
+        'bid_reserve_down': bids['down_reserve'].to_dict(),
+        'p_initial': pd.Series(dataset['p_ini']['P_ini'].values, index=dataset['p_ini']['Unit']).to_dict(),
+        'system_demand': dataset['system_demand']['Demand'].tolist(),
+        'demand_per_load': {(int(d), int(n)): share for d, n, share in dataset['demand_per_load'].itertuples(index=False)},
+        'bus_reactance': bus_reactance,
+        'bus_capacity': bus_capacity,
+        'zone_mapping': zones,
+        'atc': sum(c for (a, b), c in bus_capacity.items() if zones[a] != zones[b]),
+    }
+
+def scaled_inputs(buses, seed=0, **kwargs):
+    # Inputs of a scaled system with the given number of buses (a multiple of 24)
+    if buses % BASE_BUSES:
+        raise ValueError(f"The number of buses must be a multiple of {BASE_BUSES}")
+    return model_inputs(replicate(load_dataset(), buses // BASE_BUSES, seed=seed, **kwargs))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes a scaled copy of the IEEE 24-bus system with the CSV schema of data/")
+    parser.add_argument('--copies', type=int, required=True, help="Number of copies of the 24-bus system")
+    parser.add_argument('--output', required=True, help="Output directory")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bid-noise', type=float, default=0.05)
+    parser.add_argument('--capacity-noise', type=float, default=0.05)
+    parser.add_argument('--wind-noise', type=float, default=0.1)
+    parser.add_argument('--demand-factor', type=float, default=1.0)
+    args = parser.parse_args()
+
+    dataset = replicate(load_dataset(), args.copies, seed=args.seed, bid_noise=args.bid_noise, capacity_noise=args.capacity_noise,
+                        wind_noise=args.wind_noise, demand_factor=args.demand_factor)
+    write_dataset(dataset, args.output)
+    print(f"{args.copies * BASE_BUSES} buses, {len(dataset['generators'])} units, {len(dataset['demand_per_load'])} loads "
+          f"and {len(dataset['bus_reactance'])} lines written to {args.output}")
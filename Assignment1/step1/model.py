@@ -1,8 +1,13 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from input_data import InputData
 
 '''
@@ -16,7 +21,7 @@ class Expando(object):
     '''
     pass
 
-class Step1_model:
+class Step1_model(TimedModel):
     # Step1_model is a class that represents the optimization model. It receives an instance of the InputData class to build the optimization model and solve it.
 
     def __init__(self, input_data: InputData):
@@ -44,9 +49,8 @@ class Step1_model:
         
     def build_constraints(self):
         # Create the constraints
-        num_hours = len(self.data.timeSpan)
-        num_days = num_hours // 24
         
+        self.start_family('production_upper_limit')
         # Production upper limits limits. Makes distinction between wind and non-wind generators
         self.constraints.production_upper_limit = {}
         for g in self.data.generators:
@@ -62,11 +66,12 @@ class Step1_model:
                     constraint = self.model.addConstr(
                         self.variables.production[g, t], #* self.variables.on[g, t], 
                         GRB.LESS_EQUAL, 
-                        self.data.Pmax[g][t_index - 24 * num_days],
+                        self.data.Pmax[g][t_index],
                         name = f"ProductionMAXLimit_{g}_{t}"
                     )
                 self.constraints.production_upper_limit[g, t] = constraint
         
+        self.start_family('production_lower_limit')
         # Production lower limits
         self.constraints.production_lower_limit = {
             (g, t): self.model.addConstr(self.variables.production[g, t], 
@@ -77,6 +82,7 @@ class Step1_model:
             for t in self.data.timeSpan
         }
         
+        self.start_family('demand_upper_limit')
         # Demand upper limit
         self.constraints.demand_upper_limit = {
             (d, t): self.model.addConstr(self.variables.demand[d, t],
@@ -87,6 +93,7 @@ class Step1_model:
             for d in self.data.loads
         }
 
+        self.start_family('demand_equal_production')
         # System balance constraint. The dual value of this constraint is the market clearing price
         self.constraints.demand_equal_production = {
             t:  self.model.addConstr( - gp.quicksum(self.variables.production[g, t] for g in self.data.generators), 
@@ -119,18 +126,7 @@ class Step1_model:
         self.model = gp.Model(name="Investment Optimization Model")
         self.model.setParam('OutputFlag', 1)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         # Save the results in the results attribute
@@ -198,9 +194,9 @@ class Step1_model:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
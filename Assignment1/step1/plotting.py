@@ -35,9 +35,6 @@ def plot_generation_and_bid(input_data, hour=0):
     bid_prices_desc = [bid_dict[k] for k in keys_desc]
 
     # Generation Supply Curve (Ascending)
-    num_hours = len(input_data.timeSpan)
-    num_days = num_hours // 24  # used for wind generation indexing
-    
     # Sort generator keys by their bid offers (lowest first)
     sorted_keys = sorted(input_data.bid_offers, key=lambda k: input_data.bid_offers[k])
     
@@ -48,7 +45,7 @@ def plot_generation_and_bid(input_data, hour=0):
             gen_val = input_data.Pmax[key]
         else:
             # For wind generators, select the appropriate hour value
-            gen_val = input_data.Pmax[key][hour - 24 * num_days]
+            gen_val = input_data.Pmax[key][hour]
         generation_values.append(gen_val)
         generation_prices.append(input_data.bid_offers[key])
     
@@ -5,12 +5,12 @@ import os
 
 # The class is used to instantiate an object that is passed to the model class to build the optimization model.
 class InputData:
-    def __init__(self, generators: list, bid_offers: dict, demand: list, demand_per_load: dict, p_initial: dict):  
+    def __init__(self, generators: list, bid_offers: dict, demand: list, demand_per_load: dict, p_initial: dict, num_hours: int = 24):  
         # Initialize dictionaries to store data
 
         # SETS         
         self.generators = [i for i in range(1,len(generators)+1)]
-        self.timeSpan = [i for i in range(1,25)]
+        self.timeSpan = [i for i in range(1, num_hours+1)]
         self.loads = [i for i in range(1,len(demand_per_load)+1)]
 
         # GENERATOR DATA
@@ -37,22 +37,26 @@ class InputData:
         self.max_battery_discharging_power = 300 # MW
         self.battery_charge_efficiency = 0.94 
         self.battery_discharge_efficiency = 0.96
+        self.initial_battery_storage = None # MWh at the start of the time span, None starts empty
 
-        # Adjust demand to the time span
+        # Adjust demand to the time span. A 24-hour profile is sampled for shorter time spans and repeated
+        # every day for longer ones, a longer series is used in chronological order
         num_hours = len(self.timeSpan)
-        num_days = num_hours // 24
-        if num_hours <= 24:
+        if len(self.demand) == 24 and num_hours <= 24:
             factor = 24 / num_hours
             adjusted_demand = [self.demand[int(i * factor)] for i in range(num_hours)]
         else:
-            # Repeats the demands in order
-            adjusted_demand = [self.demand[i % 24] for i in range(num_hours)]
+            adjusted_demand = [self.demand[i % len(self.demand)] for i in range(num_hours)]
         self.demand = adjusted_demand
 
         # Populate the dictionaries with data from the generators input
         for gen in generators:
             unit_id = gen['Unit #']
-            self.Pmax[unit_id] = gen['Pmax (MW)']
+            if gen['wind']:
+                # Hourly wind production, repeated if the series is shorter than the time span
+                self.Pmax[unit_id] = [gen['Pmax (MW)'][i % len(gen['Pmax (MW)'])] for i in range(num_hours)]
+            else:
+                self.Pmax[unit_id] = gen['Pmax (MW)']
             self.Pmin[unit_id] = gen['Pmin (MW)']
             self.Max_up_reserve[unit_id] = gen['R+ (MW)']
             self.Max_down_reserve[unit_id] = gen['R- (MW)']
@@ -64,15 +68,15 @@ class InputData:
         
         # CALCULATE DEMAND BID PRICE
         sorted_keys = sorted(bid_offers, key=lambda k: bid_offers[k])
-        sorted_power = []
         
         for t, _ in enumerate(self.timeSpan):
             demand_bid_price = {}
+            sorted_power = []
             for key in sorted_keys:  
                 if not self.wind[key]:
                     sorted_power.append(self.Pmax[key])
                 else:
-                    sorted_power.append(self.Pmax[key][t - 24 * num_days])
+                    sorted_power.append(self.Pmax[key][t])
             accumulated_power = 0
             for key, power in zip(sorted_keys, sorted_power):
                 accumulated_power += power
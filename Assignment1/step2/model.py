@@ -1,7 +1,12 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from input_data import InputData
 
 class Expando(object):
@@ -10,7 +15,7 @@ class Expando(object):
     '''
     pass
 
-class Step2_model:
+class Step2_model(TimedModel):
     # Step2_model is a class that represents the optimization model. It receives an instance of the InputData class to build the optimization model and solve it.
 
     def __init__(self, input_data: InputData):
@@ -50,9 +55,8 @@ class Step2_model:
 
     def build_constraints(self):
         # Create the constraints
-        num_hours = len(self.data.timeSpan)
-        num_days = num_hours // 24
         
+        self.start_family('production_upper_limit')
         # Production upper limits limits. Makes distinction between wind and non-wind generators
         self.constraints.production_upper_limit = {}
         for g in self.data.generators:
@@ -68,11 +72,12 @@ class Step2_model:
                     constraint = self.model.addConstr(
                         self.variables.production[g, t], 
                         GRB.LESS_EQUAL, 
-                        self.data.Pmax[g][t_index - 24 * num_days],
+                        self.data.Pmax[g][t_index],
                         name = f"ProductionMAXLimit_{g}_{t}"
                     )
                 self.constraints.production_upper_limit[g, t] = constraint
         
+        self.start_family('production_lower_limit')
         # Production lower limits
         self.constraints.production_lower_limit = {
             (g, t): self.model.addConstr(self.variables.production[g, t], 
@@ -83,6 +88,7 @@ class Step2_model:
             for t in self.data.timeSpan
         }
         
+        self.start_family('demand_upper_limit')
         # Demand upper limit
         self.constraints.demand_upper_limit = {
             (d, t): self.model.addConstr(self.variables.demand[d, t],
@@ -93,6 +99,7 @@ class Step2_model:
             for d in self.data.loads 
         }
 
+        self.start_family('demand_equal_production')
         # System balance constraint. The dual value of the constraint is the market clearing price
         self.constraints.demand_equal_production = {
             t: self.model.addConstr( - (gp.quicksum(self.variables.production[g, t] for g in self.data.generators) - 
@@ -104,6 +111,7 @@ class Step2_model:
             for t in self.data.timeSpan
         }
 
+        self.start_family('ramp_up')
         # Ramp up constraint
         self.constraints.ramp_up = {
             (g, t): self.model.addConstr(self.variables.production[g, t] - self.variables.production[g, t-1],
@@ -114,6 +122,7 @@ class Step2_model:
             for t in self.data.timeSpan if t > 1
         }
 
+        self.start_family('ramp_up_initial')
         # Ramp up initial constraint
         self.constraints.ramp_up_initial = {
             g: self.model.addConstr(self.variables.production[g, 1] - self.data.p_initial[g],
@@ -123,6 +132,7 @@ class Step2_model:
             for g in self.data.generators
         }
 
+        self.start_family('ramp_down')
         # Ramp down constraint
         self.constraints.ramp_down = {
             (g, t): self.model.addConstr(self.variables.production[g, t-1] - self.variables.production[g, t],
@@ -133,6 +143,7 @@ class Step2_model:
             for t in self.data.timeSpan if t > 1
         }
 
+        self.start_family('ramp_down_initial')
         # Ramp down initial constraint
         self.constraints.ramp_down_initial = {
             g: self.model.addConstr(self.data.p_initial[g] - self.variables.production[g, 1],
@@ -146,6 +157,7 @@ class Step2_model:
         #       BATTERY CONSTRAINTS 
         # -----------------------------------------
 
+        self.start_family('battery_energy_balance')
         # Energy balance in the battery
         self.constraints.battery_energy_balance = {
             t: self.model.addConstr(self.variables.stored_energy[t],
@@ -156,15 +168,18 @@ class Step2_model:
             for t in self.data.timeSpan if t > 1
         }
 
-        # Energy balance in the battery initial
+        self.start_family('battery_energy_initial')
+        # Energy balance in the battery initial. The battery starts empty unless an initial storage is given
+        initial_storage = self.data.initial_battery_storage
         self.constraints.battery_energy_initial = self.model.addConstr(self.variables.stored_energy[1], 
                                                                        GRB.EQUAL, 
-                                                                       self.variables.battery_charging_power[1] * self.data.battery_charge_efficiency
+                                                                       (initial_storage or 0) + self.variables.battery_charging_power[1] * self.data.battery_charge_efficiency
                                                                         - self.variables.battery_discharging_power[1] /self.data.battery_discharge_efficiency, 
                                                                         name=f"StoredEnergy_1")
         
-        # Energy stored in the battery initial
-        self.model.addConstr(self.variables.stored_energy[1], GRB.EQUAL, 0, name=f"StoredEnergy_1")
+        if initial_storage is None:
+            # Energy stored in the battery initial
+            self.model.addConstr(self.variables.stored_energy[1], GRB.EQUAL, 0, name=f"StoredEnergy_1")
         
         
     def build_objective_function(self):
@@ -190,18 +205,7 @@ class Step2_model:
         self.model = gp.Model(name="Investment Optimization Model")
         self.model.setParam('OutputFlag', 1)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         # Save the results in the results attribute
@@ -243,6 +247,10 @@ class Step2_model:
             t: self.variables.battery_discharging_power[t].X
             for t in self.data.timeSpan
         }
+        self.results.stored_energy = {
+            t: self.variables.stored_energy[t].X
+            for t in self.data.timeSpan
+        }
 
         
 
@@ -280,9 +288,9 @@ class Step2_model:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
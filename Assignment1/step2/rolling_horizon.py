@@ -0,0 +1,192 @@
+import os
+import copy
+import time
+import argparse
+import pandas as pd
+from gurobipy import GRB
+from input_data import InputData, generators, bid_offers, system_demand, demand_per_load, p_initial
+from model import Step2_model, Expando
+
+# Description: Rolling-horizon (receding window) clearing of the battery market of step 2.
+# A single Step2_model with look_ahead hours is built once. Every window solves the next look_ahead hours, keeps the
+# first commit hours and moves forward commit hours: only the right-hand sides (demand, wind production, initial
+# state of charge and initial production) and the demand bids in the objective change, so the model is not rebuilt
+# and every solve starts from the basis of the previous window. The last windows, whose look-ahead would go beyond
+# the end of the horizon, are shortened to the remaining hours and solved with their own model, so the rolling
+# horizon plans for the same hours as the full-horizon solve.
+
+def window_data(input_data: InputData, start: int, length: int):
+    # Copy of the input data with the hours start + 1, ..., start + length of its time span
+    num_hours = len(input_data.timeSpan)
+    if start + length > num_hours:
+        raise ValueError(f"The window of hours {start + 1}-{start + length} goes beyond the {num_hours} hours of the horizon")
+    hours = [start + i for i in range(length)]
+    window = copy.copy(input_data)
+    window.timeSpan = [i for i in range(1, length + 1)]
+    window.demand = [input_data.demand[h] for h in hours]
+    window.demand_bid_price = [input_data.demand_bid_price[h] for h in hours]
+    window.Pmax = {
+        g: [input_data.Pmax[g][h] for h in hours] if input_data.wind[g] else input_data.Pmax[g]
+        for g in input_data.generators
+    }
+    return window
+
+class RollingHorizon:
+    """
+    Clears the market of input_data over its whole time span with a persistent model of look_ahead hours.
+
+    Args:
+        input_data (InputData): Data of the whole horizon. If initial_battery_storage is None the battery starts empty.
+        look_ahead (int): Hours of every window.
+        commit (int): Hours of every window that are kept. The next window starts after them.
+    """
+    def __init__(self, input_data: InputData, look_ahead: int = 24, commit: int = 12, verbose: bool = False):
+        if not 0 < commit <= look_ahead:
+            raise ValueError("The committed hours must be between 1 and the look-ahead")
+        self.data = input_data
+        self.look_ahead = look_ahead
+        self.commit = commit
+        self.verbose = verbose
+
+        # State at the start of the next window
+        self.initial_battery_storage = input_data.initial_battery_storage or 0
+        self.p_initial = dict(input_data.p_initial)
+
+        self.window = self.build_window(0, min(look_ahead, len(input_data.timeSpan)))
+
+    def build_window(self, start: int, length: int):
+        # Model of the window of length hours starting after hour start, from the current state
+        window = window_data(self.data, start, length)
+        window.initial_battery_storage = self.initial_battery_storage
+        window.p_initial = self.p_initial
+        model = Step2_model(window)
+        model.model.setParam('OutputFlag', 1 if self.verbose else 0)
+        return model
+
+    def set_window(self, start: int):
+        # Moves the persistent model to the window starting after hour start of the horizon
+        model, data = self.window, self.data
+        window = window_data(data, start, len(model.data.timeSpan))
+        for t in window.timeSpan:
+            for d in window.loads:
+                model.constraints.demand_upper_limit[d, t].RHS = window.demand_per_load[d] / 100 * window.demand[t - 1]
+                model.variables.demand[d, t].Obj = window.demand_bid_price[t - 1][d]
+            for g in window.generators:
+                if window.wind[g]:
+                    model.constraints.production_upper_limit[g, t].RHS = window.Pmax[g][t - 1]
+        for g in window.generators:
+            model.constraints.ramp_up_initial[g].RHS = window.RU[g] + self.p_initial[g]
+            model.constraints.ramp_down_initial[g].RHS = window.RD[g] - self.p_initial[g]
+        model.constraints.battery_energy_initial.RHS = self.initial_battery_storage
+        model.data.demand = window.demand
+        model.data.demand_bid_price = window.demand_bid_price
+
+    def run(self):
+        # Solves every window and keeps the committed hours in self.results
+        data = self.data
+        num_hours = len(data.timeSpan)
+        production, price, charging, discharging, stored = {}, {}, {}, {}, {}
+        self.results = Expando()
+        welfare = 0
+        windows = 0
+        start_time = time.perf_counter()
+
+        for start in range(0, num_hours, self.commit):
+            if start + len(self.window.data.timeSpan) <= num_hours:
+                self.set_window(start)
+                model = self.window
+            else:
+                # Shortened window at the end of the horizon
+                model = self.build_window(start, num_hours - start)
+            model.solve()
+            if model.model.status != GRB.OPTIMAL:
+                raise RuntimeError(f"The window starting at hour {start + 1} finished with status {model.model.status}")
+            windows += 1
+
+            committed = model.data.timeSpan[:self.commit]
+            for t in committed:
+                hour = start + t
+                for g in data.generators:
+                    production[g, hour] = model.variables.production[g, t].X
+                price[hour] = model.constraints.demand_equal_production[t].Pi
+                charging[hour] = model.variables.battery_charging_power[t].X
+                discharging[hour] = model.variables.battery_discharging_power[t].X
+                stored[hour] = model.variables.stored_energy[t].X
+                welfare += sum(model.data.demand_bid_price[t - 1][d] * model.variables.demand[d, t].X for d in data.loads)
+                welfare -= sum(data.bid_offers[g] * model.variables.production[g, t].X for g in data.generators)
+
+            # The last committed hour is the initial state of the next window
+            last = committed[-1]
+            self.initial_battery_storage = model.variables.stored_energy[last].X
+            self.p_initial = {g: model.variables.production[g, last].X for g in data.generators}
+            if model is not self.window:
+                model.model.dispose()
+
+        self.results.production = production
+        self.results.price = price
+        self.results.power_charging = charging
+        self.results.power_discharging = discharging
+        self.results.stored_energy = stored
+        self.results.objective = welfare
+        self.results.windows = windows
+        self.results.time = time.perf_counter() - start_time
+        return self.results
+
+def full_horizon(input_data: InputData):
+    # Solves the whole horizon at once, with the same initial state of charge as the rolling horizon
+    data = copy.copy(input_data)
+    data.initial_battery_storage = input_data.initial_battery_storage or 0
+    model = Step2_model(data)
+    model.model.setParam('OutputFlag', 0)
+    start_time = time.perf_counter()
+    model.run()
+    model.time = time.perf_counter() - start_time
+    return model
+
+def optimality_loss(input_data: InputData, windows: list):
+    """
+    Compares the rolling horizon with the full-horizon solve.
+
+    Args:
+        input_data (InputData): Data of the whole horizon.
+        windows (list): (look_ahead, commit) pairs.
+
+    Returns:
+        pd.DataFrame: Social welfare, optimality loss, largest price difference and solve time of every pair.
+    """
+    full = full_horizon(input_data)
+    report = [{
+        'look_ahead': len(input_data.timeSpan), 'commit': len(input_data.timeSpan), 'windows': 1,
+        'social_welfare': full.results.objective, 'loss': 0.0, 'loss_percent': 0.0, 'max_price_difference': 0.0,
+        'time': full.time,
+    }]
+    for look_ahead, commit in windows:
+        results = RollingHorizon(input_data, look_ahead, commit).run()
+        loss = full.results.objective - results.objective
+        report.append({
+            'look_ahead': look_ahead, 'commit': commit, 'windows': results.windows,
+            'social_welfare': results.objective, 'loss': loss,
+            'loss_percent': 100 * loss / abs(full.results.objective),
+            'max_price_difference': max(abs(results.price[t] - full.results.price[t]) for t in input_data.timeSpan),
+            'time': results.time,
+        })
+    return pd.DataFrame(report)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-horizon clearing of the battery market and its optimality loss")
+    parser.add_argument('--hours', type=int, default=24, help="Length of the horizon [h]")
+    parser.add_argument('--window', type=int, nargs=2, action='append', metavar=('LOOK_AHEAD', 'COMMIT'),
+                        help="Look-ahead and committed hours of every window (can be repeated)")
+    args = parser.parse_args()
+    windows = args.window or [(6, 3), (12, 6), (12, 12)]
+
+    input_data = InputData(generators, bid_offers, system_demand, demand_per_load, p_initial, num_hours=args.hours)
+    report = optimality_loss(input_data, windows)
+    pd.set_option('display.width', 200)
+    print(report.to_string(index=False))
+
+    script_dir = os.path.dirname(__file__)
+    output_path = os.path.join(script_dir, 'output', 'rolling_horizon.csv')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    report.to_csv(output_path, index=False)
+    print(f"Report written to {output_path}")
@@ -1,9 +1,14 @@
+import os
+import sys
 import copy
 import pandas as pd
 import numpy as np 
 import matplotlib.pyplot as plt
 from input_data import InputData, generators, bid_offers, system_demand, demand_per_load, p_initial
 from model import Step2_model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from result_cache import ResultCache
 
 def run_battery_sensitivity(
     base_input_data: InputData,
@@ -18,6 +23,7 @@ def run_battery_sensitivity(
     Returns a DataFrame with hourly market prices for each scenario.
     """
     results = []
+    cache = ResultCache()
 
     for capacity in battery_capacities:
         for charge_rate in charging_rates:
@@ -34,9 +40,8 @@ def run_battery_sensitivity(
                         modified_input.battery_charge_efficiency = charge_eff
                         modified_input.battery_discharge_efficiency = discharge_eff
 
-                        # Run the model with modified parameters
-                        model = Step2_model(modified_input)
-                        model.run()
+                        # Run the model with modified parameters, or load it if it was solved in a previous run
+                        model = cache.run(Step2_model, modified_input)
 
                         # Extract hourly market prices and store as a list
                         
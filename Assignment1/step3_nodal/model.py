@@ -1,8 +1,14 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
+from network import incidence_matrix, ptdf_matrix, lodf_matrix
 from input_data import InputData
 
 '''
@@ -16,7 +22,7 @@ class Expando(object):
     '''
     pass
 
-class Step3_model:
+class Step3_model(TimedModel):
     # Step1_model is a class that represents the optimization model. It receives an instance of the InputData class to build the optimization model and solve it.
 
     def __init__(self, input_data: InputData):
@@ -50,9 +56,8 @@ class Step3_model:
         
     def build_constraints(self):
         # Create the constraints
-        num_hours = len(self.data.timeSpan)
-        num_days = num_hours // 24
         
+        self.start_family('production_upper_limit')
         # Production upper limits limits. Makes distinction between wind and non-wind generators    
         self.constraints.production_upper_limit = {}
         for g in self.data.generators:
@@ -68,11 +73,12 @@ class Step3_model:
                     constraint = self.model.addConstr(
                         self.variables.production[g, t], 
                         GRB.LESS_EQUAL, 
-                        self.data.Pmax[g][t_index - 24 * num_days],
+                        self.data.Pmax[g][t_index],
                         name = f"ProductionMAXLimit_{g}_{t}"
                     )
                 self.constraints.production_upper_limit[g, t] = constraint
         
+        self.start_family('production_lower_limit')
         # Production lower limits
         self.constraints.production_lower_limit = {
             (g, t): self.model.addConstr(self.variables.production[g, t], 
@@ -83,6 +89,7 @@ class Step3_model:
             for t in self.data.timeSpan
         }
         
+        self.start_family('demand_upper_limit')
         # Demand upper limit
         self.constraints.demand_upper_limit = {
             (d, t): self.model.addConstr(self.variables.demand[d, t],
@@ -93,27 +100,32 @@ class Step3_model:
             for (d, n) in self.data.demand_per_load.keys()
         }
 
+        self.start_family('demand_equal_production')
+        # Generators, loads and neighbouring buses of every node, so each balance only visits its own elements
+        generators_at_node = {n: [] for n in self.data.nodes}
+        for g in self.data.generators:
+            generators_at_node[self.data.P_node[g]].append(g)
+        loads_at_node = {n: [] for n in self.data.nodes}
+        for (d, n) in self.data.demand_per_load.keys():
+            loads_at_node[n].append(d)
+        neighbours = {n: [] for n in self.data.nodes}
+        for (n, m) in self.data.bus_capacity.keys():
+            neighbours[n].append((m, self.data.bus_reactance[n, m]))
+            neighbours[m].append((n, self.data.bus_reactance[n, m]))
+
         # Defining Demand and Production Balance at Each Node for Each Time Period
         self.constraints.demand_equal_production = {}
         for t in self.data.timeSpan:
             for n in self.data.nodes:
                 # Summing the production at node n
-                generation_at_node = gp.quicksum(self.variables.production[g, t] 
-                                                for g in self.data.generators 
-                                                if self.data.P_node[g] == n)
+                generation_at_node = gp.quicksum(self.variables.production[g, t] for g in generators_at_node[n])
 
                 # Calculating net flow out of node n
-                net_flow = gp.quicksum((1/self.data.bus_reactance[n_, m]) * (self.variables.angle[n_, t] - self.variables.angle[m, t])
-                                    for (n_, m) in self.data.bus_capacity.keys() 
-                                    if n_ == n) + \
-                        gp.quicksum((1/self.data.bus_reactance[m, n_]) * (self.variables.angle[n_, t] - self.variables.angle[m, t])
-                                    for (m, n_) in self.data.bus_capacity.keys() 
-                                    if n_ == n)
+                net_flow = gp.quicksum((1/reactance) * (self.variables.angle[n, t] - self.variables.angle[m, t])
+                                       for m, reactance in neighbours[n])
 
                 # Demand at node n for time t, ensure loads are linked correctly
-                demand_at_node = gp.quicksum(self.variables.demand[d, t]
-                                            for (d, load_n) in self.data.demand_per_load.keys()
-                                            if load_n == n)
+                demand_at_node = gp.quicksum(self.variables.demand[d, t] for d in loads_at_node[n])
 
                 # Adding the balance constraint
                 self.constraints.demand_equal_production[n, t] = self.model.addConstr(
@@ -123,6 +135,7 @@ class Step3_model:
                     name=f"BusBalance_n{n}_t{t}"
                 )
         
+        self.start_family('max_bus_capacity')
         # Max bus capacity constraint
         self.constraints.max_bus_capacity = {
             (n, m, t): self.model.addConstr(
@@ -135,6 +148,7 @@ class Step3_model:
             for t in self.data.timeSpan
         }
 
+        self.start_family('min_bus_capacity')
         # Min bus capacity constraint
         self.constraints.min_bus_capacity = {
             (n, m, t): self.model.addConstr(
@@ -146,6 +160,7 @@ class Step3_model:
             for t in self.data.timeSpan
         }
 
+        self.start_family('ref_angle')
         # Reference angle constraint
         self.constraints.ref_angle = {
             t: self.model.addConstr(self.variables.angle[1, t], GRB.EQUAL, 0, name=f"Angle1_{t}")
@@ -176,18 +191,7 @@ class Step3_model:
         self.model = gp.Model(name="Investment Optimization Model")
         self.model.setParam('OutputFlag', 1)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         # Save the results in the results attribute
@@ -203,21 +207,19 @@ class Step3_model:
             (n, t): constraint.Pi for (n, t), constraint in self.constraints.demand_equal_production.items()
         }
 
-        self.results.production_data = pd.DataFrame(index=self.data.timeSpan, columns=self.data.generators)
-        self.results.profit_data = pd.DataFrame(index=self.data.timeSpan, columns=self.data.generators)
-        self.results.utility = pd.DataFrame(index=self.data.timeSpan, columns=self.data.loads)
-
-        self.results.sum_power = 0
-        for (n, t), constraint in self.constraints.demand_equal_production.items():
-            for g in self.data.generators:
-                self.results.production_data.at[t, g] = self.variables.production[g, t].X
-                self.results.sum_power += self.variables.production[g, t].X
-                self.results.profit_data.at[t, g] = self.results.nodal_price[n, t] * self.variables.production[g, t].X
-            
-        for t_index, t in enumerate(self.data.timeSpan):
-            for key in self.data.loads: 
-                for n in self.data.nodes:
-                    self.results.utility.at[t, key] = (self.data.demand_bid_price[t_index][key] - self.results.nodal_price[n, t]) * self.variables.demand[key, t].X
+        # Every producer is paid the price of its node and every load pays the price of its node
+        load_node = {d: n for (d, n) in self.data.demand_per_load.keys()}
+        production = np.array([[self.results.production[g, t] for g in self.data.generators] for t in self.data.timeSpan])
+        generator_price = np.array([[self.results.nodal_price[self.data.P_node[g], t] for g in self.data.generators]
+                                    for t in self.data.timeSpan])
+        demand = np.array([[self.variables.demand[d, t].X for d in self.data.loads] for t in self.data.timeSpan])
+        demand_price = np.array([[self.data.demand_bid_price[t_index][d] - self.results.nodal_price[load_node[d], t]
+                                  for d in self.data.loads] for t_index, t in enumerate(self.data.timeSpan)])
+
+        self.results.production_data = pd.DataFrame(production, index=self.data.timeSpan, columns=self.data.generators)
+        self.results.profit_data = pd.DataFrame(generator_price * production, index=self.data.timeSpan, columns=self.data.generators)
+        self.results.utility = pd.DataFrame(demand_price * demand, index=self.data.timeSpan, columns=self.data.loads)
+        self.results.sum_power = production.sum()
 
     def print_results(self):
         # Print the results of the optimization problem
@@ -248,12 +250,97 @@ class Step3_model:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
+    # -----------------------------------------
+    #       N-1 SECURITY
+    # -----------------------------------------
+
+    def line_flow(self, n, m, t):
+        # DC flow of the line (n, m) as a function of the angles
+        return 1/ self.data.bus_reactance[n, m] * (self.variables.angle[n, t] - self.variables.angle[m, t])
+
+    def screen_contingencies(self, rating: float = 1.0, tolerance: float = 1e-4):
+        """
+        Post-contingency flows of every single-line outage in the current solution.
+
+        Args:
+            rating (float): Post-contingency limit as a multiple of the line capacity.
+            tolerance (float): Overloads below it are ignored [MW].
+
+        Returns:
+            list: (line, outaged line, hour) of every post-contingency overload. Outages that split the network are skipped.
+        """
+        lines = self.lines
+        angle = np.array(self.model.getAttr('X', [self.variables.angle[n, t] for t in self.data.timeSpan for n in self.data.nodes]))
+        angle = angle.reshape(len(self.data.timeSpan), len(self.data.nodes))
+        flow = (angle @ self.incidence.T) * self.susceptance
+        limit = rating * self.capacity[:, None] + tolerance
+
+        violations = []
+        for t_index, t in enumerate(self.data.timeSpan):
+            # Flow of every line (rows) after the outage of every line (columns)
+            post_contingency = flow[t_index][:, None] + self.lodf * flow[t_index][None, :]
+            overloaded = np.abs(post_contingency) > limit
+            np.fill_diagonal(overloaded, False)
+            for l, k in zip(*np.nonzero(overloaded)):
+                violations.append((lines[l], lines[k], t))
+        return violations
+
+    def run_security_constrained(self, rating: float = 1.0, max_iterations: int = 50, tolerance: float = 1e-4):
+        """
+        Solves the market with N-1 security. After every solve all single-line contingencies are screened with the
+        LODF matrix and only the violated post-contingency limits are added to the model, which is solved again
+        until there are no overloads.
+
+        Args:
+            rating (float): Post-contingency limit as a multiple of the line capacity.
+            max_iterations (int): Maximum number of solves.
+        """
+        self.lines = list(self.data.bus_reactance.keys())
+        self.incidence = incidence_matrix(self.data.nodes, self.lines)
+        self.susceptance = 1 / np.array([self.data.bus_reactance[line] for line in self.lines])
+        self.capacity = np.array([self.data.bus_capacity[line] for line in self.lines])
+        with self.timed('lodf'):
+            ptdf = ptdf_matrix(self.data.nodes, self.lines, self.data.bus_reactance, reference=1)
+            # Outages that split the network cannot be screened with the LODF, they are skipped
+            self.lodf = np.nan_to_num(lodf_matrix(ptdf, self.data.nodes, self.lines), nan=0.0)
+        position = {line: l for l, line in enumerate(self.lines)}
+
+        self.constraints.contingency_limits = {}
+        self.results.security_iterations = 0
+        for iteration in range(max_iterations):
+            self.solve()
+            if self.model.status != GRB.OPTIMAL:
+                raise RuntimeError(f"\nOptimization of {self.model.ModelName} with N-1 security was not successful")
+            self.results.security_iterations = iteration + 1
+
+            with self.timed('screening'):
+                violations = [key for key in self.screen_contingencies(rating, tolerance) if key not in self.constraints.contingency_limits]
+            if not violations:
+                break
+
+            # Adds both limits of every overloaded line for the outage and hour of the violation
+            with self.timed('contingency_limits'):
+                for (line, outage, t) in violations:
+                    post_contingency_flow = self.line_flow(*line, t) + self.lodf[position[line], position[outage]] * self.line_flow(*outage, t)
+                    limit = rating * self.data.bus_capacity[line]
+                    self.constraints.contingency_limits[line, outage, t] = (
+                        self.model.addConstr(post_contingency_flow, GRB.LESS_EQUAL, limit,
+                                             name=f"MaxContingencyPower_{line[0]}_{line[1]}_{outage[0]}_{outage[1]}_{t}"),
+                        self.model.addConstr(post_contingency_flow, GRB.GREATER_EQUAL, -limit,
+                                             name=f"MinContingencyPower_{line[0]}_{line[1]}_{outage[0]}_{outage[1]}_{t}"),
+                    )
+        else:
+            raise RuntimeError(f"N-1 security not reached after {max_iterations} iterations")
+
+        self.extract()
+        self.results.contingency_constraints = len(self.constraints.contingency_limits)
+
 
 
     
@@ -1,9 +1,23 @@
+import os
+import sys
 import copy
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from input_data import InputData, generators, bid_offers, system_demand, demand_per_load, bus_reactance, bus_capacity
-from main import run_model  # Ensure this returns meaningful data
+from model import Step3_model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from result_cache import ResultCache
+
+# Configurations solved in a previous run with the same data and code are loaded from the cache
+cache = ResultCache()
+
+def run_model(input_data):
+    # Solves the model (or loads it from the cache) and returns the nodal prices
+    model = cache.run(Step3_model, input_data)
+    model.print_results()
+    return model.results.nodal_price
 
 def modify_capacity_all_buses(factor):
     # Create a new modified version of bus capacity by modifying all values by a factor
@@ -1,7 +1,14 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
+from zonal_parameters import zonal_parameters
 from input_data import InputData
 
 '''
@@ -15,14 +22,25 @@ class Expando(object):
     '''
     pass
 
-class Step3_zonal:
+class Step3_zonal(TimedModel):
     # Step3_zonal1 is a class that represents the optimization model for zonal pricing. It receives an instance of the InputData class to build the optimization model and solve it.
 
-    def __init__(self, input_data: InputData):
+    # Market coupling of the zones: ATC of the input data, ATC derived from the nodal network or flow-based
+    MODES = ('atc', 'derived_atc', 'flow_based')
+
+    def __init__(self, input_data: InputData, mode: str = 'atc', gsk: str = 'generation', critical_branches: str = 'all',
+                 reliability_margin: float = 0.0):
         # Initialize model attributes
 
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', use one of {self.MODES}")
         self.data = input_data
+        self.mode = mode
         self.zone_mapping = self.data.zone_mapping  # Define zone mapping 
+        # Zonal PTDF and ATCs of the nodal network (see zonal_parameters.py)
+        self.parameters = None
+        if mode != 'atc':
+            self.parameters = zonal_parameters(input_data, gsk, critical_branches, reliability_margin)
         self.variables = Expando()
         self.constraints = Expando()
         self.results = Expando()
@@ -43,20 +61,26 @@ class Step3_zonal:
             for d in self.data.loads
         }
         
-        # Create the flow variables
+        # Create the flow variables. Their bounds are the ATCs, the flow-based limits are constraints
         self.variables.flow = {
-            (a, b, t) : self.model.addVar(lb =-self.data.atc , ub =self.data.atc, name=f"flow_{a}_{b}_{t}")
+            (a, b, t) : self.model.addVar(lb =-self.atc(b, a, t) , ub =self.atc(a, b, t), name=f"flow_{a}_{b}_{t}")
             for t in self.data.timeSpan   
             for a in self.data.zones
             for b in self.data.zones if b != a  
         }
+
+    def atc(self, a, b, t):
+        # Transfer capacity from zone a to zone b in hour t
+        if self.mode == 'flow_based':
+            return GRB.INFINITY
+        atc = self.parameters['atc'] if self.mode == 'derived_atc' else self.data.atc
+        return min(atc[a, b, t], GRB.INFINITY) if isinstance(atc, dict) else atc
         
     def build_constraints(self):
         # Create the constraints for zonal limits 
 
-        num_hours = len(self.data.timeSpan)
-        num_days = num_hours // 24
         
+        self.start_family('production_upper_limit')
         # Production upper limits limits. Makes distinction between wind and non-wind generators
         self.constraints.production_upper_limit = {}
         for g in self.data.generators:
@@ -72,11 +96,12 @@ class Step3_zonal:
                     constraint = self.model.addConstr(
                         self.variables.production[g, t], 
                         GRB.LESS_EQUAL, 
-                        self.data.Pmax[g][t_index - 24 * num_days],
+                        self.data.Pmax[g][t_index],
                         name = f"ProductionMAXLimit_{g}_{t}"
                     )
                 self.constraints.production_upper_limit[g, t] = constraint
         
+        self.start_family('production_lower_limit')
         # Production lower limits
         self.constraints.production_lower_limit = {
             (g, t): self.model.addConstr(self.variables.production[g, t], 
@@ -87,6 +112,7 @@ class Step3_zonal:
             for t in self.data.timeSpan
         }
         
+        self.start_family('demand_upper_limit')
         # Demand upper limit
         self.constraints.demand_upper_limit = {
             (d, t): self.model.addConstr(self.variables.demand[d, t],
@@ -97,6 +123,7 @@ class Step3_zonal:
             for (d, n) in self.data.demand_per_load.keys()
         }
 
+        self.start_family('demand_equal_production')
         # Zonal balance constraint. Dual variable is the zonal price
         self.constraints.demand_equal_production = { 
             (a, t): self.model.addConstr(
@@ -113,6 +140,7 @@ class Step3_zonal:
             for t in self.data.timeSpan
         }
 
+        self.start_family('flow_limits')
         # Flow limits between zones
         self.constraints.flow_limits = {
             (a, b, t): self.model.addConstr(
@@ -123,6 +151,23 @@ class Step3_zonal:
             for a in self.data.zones
             for b in self.data.zones if b != a
         }
+
+        if self.mode == 'flow_based':
+            self.start_family('flow_based_limits')
+            # Change of the flow of every critical branch from the base case, as a function of the net positions
+            # (exports) of the zones
+            zonal_ptdf = self.parameters['zonal_ptdf']
+            ram_positive, ram_negative = self.parameters['ram_positive'], self.parameters['ram_negative']
+            self.constraints.flow_based_limits = {}
+            for t_index, t in enumerate(self.data.timeSpan):
+                net_position = [gp.quicksum(self.variables.flow[a, b, t] for b in self.data.zones if b != a) for a in self.data.zones]
+                for l, line in enumerate(self.parameters['critical_branches']):
+                    branch_flow = gp.quicksum(zonal_ptdf[t_index, l, z] * net_position[z]
+                                              for z in range(len(self.data.zones)) if abs(zonal_ptdf[t_index, l, z]) > 1e-9)
+                    self.constraints.flow_based_limits[line, t] = (
+                        self.model.addConstr(branch_flow, GRB.LESS_EQUAL, ram_positive[t_index, l], name=f"MaxBranchFlow_{line[0]}_{line[1]}_{t}"),
+                        self.model.addConstr(branch_flow, GRB.GREATER_EQUAL, -ram_negative[t_index, l], name=f"MinBranchFlow_{line[0]}_{line[1]}_{t}"),
+                    )
         
     def build_objective_function(self):
         # Create the objective function
@@ -147,18 +192,7 @@ class Step3_zonal:
         self.model = gp.Model(name="Investment Optimization Model")
         self.model.setParam('OutputFlag', 1)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         # Save the results in the results attribute
@@ -174,20 +208,19 @@ class Step3_zonal:
             (a, t): constraint.Pi for (a, t), constraint in self.constraints.demand_equal_production.items()
         }
 
-        self.results.production_data = pd.DataFrame(index=self.data.timeSpan, columns=self.data.generators)
-        self.results.profit_data = pd.DataFrame(index=self.data.timeSpan, columns=self.data.generators)
-        self.results.utility = pd.DataFrame(index=self.data.timeSpan, columns=self.data.loads)
-        
-        self.results.sum_power = 0
-        for (a, t), constraint in self.constraints.demand_equal_production.items():
-            for g in self.data.generators:
-                self.results.production_data.at[t, g] = self.variables.production[g, t].X
-                self.results.sum_power += self.variables.production[g, t].X
-                self.results.profit_data.at[t, g] = self.results.zonal_price[a, t] * self.variables.production[g, t].X
-            
-        for t_index, t in enumerate(self.data.timeSpan):
-            for key in self.data.loads: 
-                self.results.utility.at[t, key] = (self.data.demand_bid_price[t_index][key] - self.results.zonal_price[a, t]) * self.variables.demand[key, t].X
+        # Every producer is paid the price of its zone and every load pays the price of its zone
+        load_zone = {d: self.data.zone_mapping[n] for (d, n) in self.data.demand_per_load.keys()}
+        production = np.array([[self.results.production[g, t] for g in self.data.generators] for t in self.data.timeSpan])
+        generator_price = np.array([[self.results.zonal_price[self.data.zone_mapping[self.data.P_node[g]], t] for g in self.data.generators]
+                                    for t in self.data.timeSpan])
+        demand = np.array([[self.variables.demand[d, t].X for d in self.data.loads] for t in self.data.timeSpan])
+        demand_price = np.array([[self.data.demand_bid_price[t_index][d] - self.results.zonal_price[load_zone[d], t]
+                                  for d in self.data.loads] for t_index, t in enumerate(self.data.timeSpan)])
+
+        self.results.production_data = pd.DataFrame(production, index=self.data.timeSpan, columns=self.data.generators)
+        self.results.profit_data = pd.DataFrame(generator_price * production, index=self.data.timeSpan, columns=self.data.generators)
+        self.results.utility = pd.DataFrame(demand_price * demand, index=self.data.timeSpan, columns=self.data.loads)
+        self.results.sum_power = production.sum()
         
         self.results.flows = {
             (a, b, t): self.variables.flow[a, b, t].X
@@ -313,9 +346,9 @@ class Step3_zonal:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
@@ -1,9 +1,14 @@
+import os
+import sys
 import copy
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from input_data import InputData, generators, bid_offers, system_demand, demand_per_load, bus_reactance, bus_capacity, zone_mapping
 from model import Step3_zonal
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from result_cache import ResultCache
 
 def modify_atc(value):
     """Modify Available Transfer Capacity (ATC) and return updated input data."""
@@ -15,10 +20,12 @@ def modify_capacity(factor):
     modified_bus_capacity = {bus: cap * factor for bus, cap in bus_capacity.items()}
     return InputData(generators, bid_offers, system_demand, demand_per_load, bus_reactance, modified_bus_capacity, zone_mapping)
 
+# Configurations solved in a previous run with the same data and code are loaded from the cache
+cache = ResultCache()
+
 def run_model(input_data):
-    """Runs the zonal model and returns results."""
-    model = Step3_zonal(input_data)
-    model.run()
+    """Runs the zonal model (or loads it from the cache) and returns results."""
+    model = cache.run(Step3_zonal, input_data)
     return model.results
 
 def sensitivity_analysis():
@@ -1,8 +1,13 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from input_data_day_ahead import InputDataDayAhead
 
 '''
@@ -15,7 +20,7 @@ class Expando(object):
     '''
     pass
 
-class DayAheadModel:
+class DayAheadModel(TimedModel):
     # DayAhead_model is a class that represents the optimization model. It receives an instance of the InputData class to build the optimization model and solve it.
 
     def __init__(self, input_data: InputDataDayAhead):
@@ -43,9 +48,8 @@ class DayAheadModel:
        
     def build_constraints(self):
         # Create the constraints
-        num_hours = len(self.data.timeSpan)
-        num_days = num_hours // 24
         
+        self.start_family('production_upper_limit')
         # Production upper limits limits. Makes distinction between wind and non-wind generators
         self.constraints.production_upper_limit = {}
         for g in self.data.generators:
@@ -61,11 +65,12 @@ class DayAheadModel:
                     constraint = self.model.addConstr(
                         self.variables.production[g, t], #* self.variables.on[g, t], 
                         GRB.LESS_EQUAL, 
-                        self.data.Pmax[g][t_index - 24 * num_days],
+                        self.data.Pmax[g][t_index],
                         name = f"ProductionMAXLimit_{g}_{t}"
                     )
                 self.constraints.production_upper_limit[g, t] = constraint
         
+        self.start_family('production_lower_limit')
         # Production lower limits
         self.constraints.production_lower_limit = {
             (g, t): self.model.addConstr(self.variables.production[g, t], 
@@ -76,6 +81,7 @@ class DayAheadModel:
             for t in self.data.timeSpan
         }
         
+        self.start_family('demand_upper_limit')
         # Demand upper limit
         self.constraints.demand_upper_limit = {
             (d, t): self.model.addConstr(self.variables.demand[d, t],
@@ -86,6 +92,7 @@ class DayAheadModel:
             for d in self.data.loads
         }
 
+        self.start_family('demand_equal_production')
         # System balance constraint. Dual variable is the market clearing price
         self.constraints.demand_equal_production = {
             t:  self.model.addConstr( - gp.quicksum(self.variables.production[g, t] for g in self.data.generators), 
@@ -118,18 +125,7 @@ class DayAheadModel:
         self.model = gp.Model(name="Investment Optimization Model")
         self.model.setParam('OutputFlag', 1)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         # Save the results in the results attribute
@@ -206,9 +202,9 @@ class DayAheadModel:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
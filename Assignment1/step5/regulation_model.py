@@ -1,8 +1,13 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from input_data_day_ahead import InputDataDayAhead
 from input_data_regulation import InputDataRegulation
 
@@ -12,7 +17,7 @@ class Expando(object):
     '''
     pass
 
-class RegulationModel:
+class RegulationModel(TimedModel):
     # RegulationModel is a class that represents the regulation market after the day ahead market. It receives an instance of the InputData class to build the optimization model and solve it.
 
     def __init__(self, input_data_da: object, input_data_regulation: InputDataRegulation):
@@ -48,6 +53,7 @@ class RegulationModel:
         }
           
     def build_constraints(self):
+        self.start_family('upward_regulation_max')
         # Create the constraints
         # Upward and downward regulation limits based on day ahead market results
         self.constraints.upward_regulation_max = {
@@ -61,6 +67,7 @@ class RegulationModel:
             for t in self.data_da.data.timeSpan
         }
 
+        self.start_family('downward_regulation_max')
         self.constraints.downward_regulation_max = {
             (g, t): self.model.addConstr(
                 self.variables.downward_regulation[g, t],
@@ -72,6 +79,7 @@ class RegulationModel:
             for t in self.data_da.data.timeSpan
         }
 
+        self.start_family('curtailment_max')
         self.constraints.curtailment_max = {
             (d, t): self.model.addConstr(
                 self.variables.demand_curtailment[d, t],
@@ -83,6 +91,7 @@ class RegulationModel:
             for t in self.data_da.data.timeSpan
         }
 
+        self.start_family('sum_equal_balance')
         # Balance constraint. Dual variable is the balance price
         self.constraints.sum_equal_balance = {
             t: self.model.addConstr(
@@ -119,18 +128,7 @@ class RegulationModel:
         self.model = gp.Model(name="Optimization Model")
         self.model.setParam('OutputFlag', 0)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         print("\nSaving results")
@@ -223,9 +221,9 @@ class RegulationModel:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
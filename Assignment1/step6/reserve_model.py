@@ -1,8 +1,13 @@
+import os
+import sys
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from input_data import InputData
 
 '''
@@ -16,7 +21,7 @@ class Expando(object):
     '''
     pass
 
-class ReserveModel:
+class ReserveModel(TimedModel):
     # Reserve_model is a class that represents the optimization model. It receives an instance of the InputData class to build the optimization model and solve it.
 
     def __init__(self, input_data: InputData):
@@ -44,9 +49,8 @@ class ReserveModel:
 
     def build_constraints(self):
         # Create the constraints
-        num_hours = len(self.data.timeSpan)
-        num_days = num_hours // 24
 
+        self.start_family('reserve_up_limit')
         # Reserve up limit
         self.constraints.reserve_up_limit = {
             (g, t): self.model.addConstr(
@@ -59,6 +63,7 @@ class ReserveModel:
             for t in self.data.timeSpan
         }
 
+        self.start_family('reserve_down_limit')
         # Reserve down limit
         self.constraints.reserve_down_limit = {
             (g, t): self.model.addConstr(
@@ -71,6 +76,7 @@ class ReserveModel:
             for t in self.data.timeSpan
         }
 
+        self.start_family('reserve_limit')
         # Reserve up and down have to be less than the maximum capacity of the generator. Distinction between wind and non-wind generators
         self.constraints.reserve_limit = {}
         for g in self.data.generators:
@@ -79,7 +85,7 @@ class ReserveModel:
                     self.constraints.reserve_limit[g, t] = self.model.addConstr(
                         self.variables.reserve_up[g, t] + self.variables.reserve_down[g, t],
                         GRB.LESS_EQUAL,
-                        self.data.Pmax[g][t_index - 24 * num_days],
+                        self.data.Pmax[g][t_index],
                         name = f"Reserve_limit_{g}_{t}"
                     )
                 else:
@@ -90,6 +96,7 @@ class ReserveModel:
                         name = f"Reserve_limit_{g}_{t}"
                     )
 
+        self.start_family('reserve_up_requirements')
         # Reserve up has to be equal to the reserve up requirements of the system
         self.constraints.reserve_up_requirements = {
             t: self.model.addConstr(
@@ -101,6 +108,7 @@ class ReserveModel:
             for t in self.data.timeSpan
         }
         
+        self.start_family('reserve_down_requirements')
         # Reserve down has to be equal to the reserve down requirements of the system
         self.constraints.reserve_down_requirements = {
             t: self.model.addConstr(
@@ -128,18 +136,7 @@ class ReserveModel:
         self.model = gp.Model(name="Investment Optimization Model")
         self.model.setParam('OutputFlag', 1)
 
-        print("\nBuilding variables")
-        self.build_variables()
-
-        print("\nBuilding constraints")
-        self.build_constraints()
-        
-        print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        print(f"Number of variables: {self.model.NumVars}")
-        print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components()
 
     def save_results(self):
         # Save the results in the results attribute
@@ -199,9 +196,9 @@ class ReserveModel:
     def run(self):
         # Makes sure the model is solved and saves the results
         
-        self.model.optimize()
+        self.solve()
         if self.model.status == GRB.OPTIMAL:
-            self.save_results()
+            self.extract()
         else:
             raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
 
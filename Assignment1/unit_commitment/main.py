@@ -0,0 +1,21 @@
+import argparse
+from input_data import *
+from model import UnitCommitment_model
+
+
+if __name__ == "__main__":
+    # Solves the unit commitment with the data provided in the input_data.py file
+
+    parser = argparse.ArgumentParser(description="Multi-day unit commitment of the copper plate market")
+    parser.add_argument('--days', type=int, default=1, help="Length of the time span [days]")
+    parser.add_argument('--no-mip-start', action='store_true', help="Solve without the merit order MIP start")
+    parser.add_argument('--time-limit', type=float, default=None, help="Time limit of the MIP [s]")
+    args = parser.parse_args()
+
+    # Load data and run model
+    input_data = InputData(generators, bid_offers, system_demand, demand_per_load, p_initial, num_hours=24 * args.days)
+    model = UnitCommitment_model(input_data, mip_start=not args.no_mip_start, time_limit=args.time_limit)
+    model.run()
+    model.print_results()
+
+    print("End of main.py")
@@ -0,0 +1,341 @@
+import os
+import sys
+import gurobipy as gp
+from gurobipy import GRB
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
+from input_data import InputData
+
+'''
+Multi-day unit commitment of the copper plate market. Thermal units have on/off, startup and shutdown binaries with the
+tight (turn-on/turn-off) minimum up and down time formulation, startup costs, minimum stable generation and ramping
+limits that allow starting up and shutting down. Wind farms are not committed.
+
+The MIP starts from a heuristic commitment built from the LP relaxation (the merit order dispatch) and the prices are
+the duals of the system balance in the LP with the commitment fixed.
+'''
+
+class Expando(object):
+    '''
+        A small class which can have attributes set
+    '''
+    pass
+
+class UnitCommitment_model(TimedModel):
+    # UnitCommitment_model is a class that represents the optimization model. It receives an instance of the InputData class to build the optimization model and solve it.
+
+    def __init__(self, input_data: InputData, mip_start: bool = True, mip_gap: float = 1e-4, time_limit: float = None):
+        # Initialize model attributes
+
+        self.data = input_data
+        self.mip_start = mip_start
+        self.variables = Expando()
+        self.constraints = Expando()
+        self.results = Expando()
+        self.thermal = [g for g in input_data.generators if not input_data.wind[g]]
+        self.build_model()
+        self.model.setParam('MIPGap', mip_gap)
+        if time_limit is not None:
+            self.model.setParam('TimeLimit', time_limit)
+
+    def build_variables(self):
+        # Create the variables
+
+        self.variables.production = {
+            (g, t): self.model.addVar(lb = 0, name=f"Production_{g}_{t}")
+            for g in self.data.generators
+            for t in self.data.timeSpan
+        }
+        self.variables.demand = {
+            (d, t): self.model.addVar(lb = 0, name=f"Demand_{d}_{t}")
+            for t in self.data.timeSpan
+            for d in self.data.loads
+        }
+        self.variables.on = {
+            (g, t): self.model.addVar(vtype=GRB.BINARY, name=f"On_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+        self.variables.startup = {
+            (g, t): self.model.addVar(vtype=GRB.BINARY, name=f"Startup_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+        self.variables.shutdown = {
+            (g, t): self.model.addVar(vtype=GRB.BINARY, name=f"Shutdown_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+
+    def on(self, g, t):
+        # Commitment of a thermal unit, the initial state before the first hour
+        return self.variables.on[g, t] if t >= 1 else self.data.initial_on[g]
+
+    def build_constraints(self):
+        # Create the constraints
+
+        self.start_family('production_upper_limit')
+        # Production upper limits. Thermal units produce only when they are on
+        self.constraints.production_upper_limit = {}
+        for g in self.data.generators:
+            for t_index, t in enumerate(self.data.timeSpan):
+                if not self.data.wind[g]:
+                    constraint = self.model.addConstr(
+                        self.variables.production[g, t],
+                        GRB.LESS_EQUAL,
+                        self.data.Pmax[g] * self.variables.on[g, t],
+                        name = f"ProductionMAXLimit_{g}_{t}"
+                    )
+                else:
+                    constraint = self.model.addConstr(
+                        self.variables.production[g, t],
+                        GRB.LESS_EQUAL,
+                        self.data.Pmax[g][t_index],
+                        name = f"ProductionMAXLimit_{g}_{t}"
+                    )
+                self.constraints.production_upper_limit[g, t] = constraint
+
+        self.start_family('production_lower_limit')
+        # Minimum stable generation of the units that are on
+        self.constraints.production_lower_limit = {
+            (g, t): self.model.addConstr(self.variables.production[g, t],
+                                         GRB.GREATER_EQUAL,
+                                         self.data.Pmin[g] * self.variables.on[g, t],
+                                         name=f"ProductionMINLimit_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+
+        self.start_family('demand_upper_limit')
+        # Demand upper limit
+        self.constraints.demand_upper_limit = {
+            (d, t): self.model.addConstr(self.variables.demand[d, t],
+                                        GRB.LESS_EQUAL,
+                                        self.data.demand_per_load[d]/100 * self.data.demand[t-1],
+                                        name=f"DemandUpperLimit_{d}_{t}")
+            for t in self.data.timeSpan
+            for d in self.data.loads
+        }
+
+        self.start_family('demand_equal_production')
+        # System balance constraint. The dual value of the constraint in the fixed LP is the market clearing price
+        self.constraints.demand_equal_production = {
+            t: self.model.addConstr( - gp.quicksum(self.variables.production[g, t] for g in self.data.generators),
+                                    GRB.EQUAL,
+                                    - gp.quicksum(self.variables.demand[d, t] for d in self.data.loads),
+                                    name=f"SystemDemandEqualProductionHour_{t}")
+            for t in self.data.timeSpan
+        }
+
+        self.start_family('commitment_logic')
+        # A unit turns on with a startup and turns off with a shutdown
+        self.constraints.commitment_logic = {
+            (g, t): self.model.addConstr(self.variables.on[g, t] - self.on(g, t - 1),
+                                         GRB.EQUAL,
+                                         self.variables.startup[g, t] - self.variables.shutdown[g, t],
+                                         name=f"CommitmentLogic_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+
+        self.start_family('min_up_time')
+        # Minimum up time: a unit that started up in the last UT hours is on
+        self.constraints.min_up_time = {
+            (g, t): self.model.addConstr(gp.quicksum(self.variables.startup[g, tau] for tau in range(max(1, t - self.data.UT[g] + 1), t + 1)),
+                                         GRB.LESS_EQUAL,
+                                         self.variables.on[g, t],
+                                         name=f"MinUpTime_{g}_{t}")
+            for g in self.thermal if self.data.UT[g] > 1
+            for t in self.data.timeSpan
+        }
+
+        self.start_family('min_down_time')
+        # Minimum down time: a unit that shut down in the last DT hours is off
+        self.constraints.min_down_time = {
+            (g, t): self.model.addConstr(gp.quicksum(self.variables.shutdown[g, tau] for tau in range(max(1, t - self.data.DT[g] + 1), t + 1)),
+                                         GRB.LESS_EQUAL,
+                                         1 - self.variables.on[g, t],
+                                         name=f"MinDownTime_{g}_{t}")
+            for g in self.thermal if self.data.DT[g] > 1
+            for t in self.data.timeSpan
+        }
+
+        self.start_family('ramp_up')
+        # Ramp up constraint. A unit that starts up can reach its minimum stable generation in the first hour
+        self.constraints.ramp_up = {
+            (g, t): self.model.addConstr(self.variables.production[g, t] - (self.variables.production[g, t-1] if t > 1 else self.data.p_initial[g]),
+                                         GRB.LESS_EQUAL,
+                                         self.data.RU[g] * self.on(g, t - 1) + max(self.data.RU[g], self.data.Pmin[g]) * self.variables.startup[g, t],
+                                         name=f"RampUp_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+
+        self.start_family('ramp_down')
+        # Ramp down constraint. A unit that shuts down can leave its minimum stable generation in the last hour
+        self.constraints.ramp_down = {
+            (g, t): self.model.addConstr((self.variables.production[g, t-1] if t > 1 else self.data.p_initial[g]) - self.variables.production[g, t],
+                                         GRB.LESS_EQUAL,
+                                         self.data.RD[g] * self.variables.on[g, t] + max(self.data.RD[g], self.data.Pmin[g]) * self.variables.shutdown[g, t],
+                                         name=f"RampDown_{g}_{t}")
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+
+    def build_objective_function(self):
+        # Create the objective function
+
+        self.data.demand_cost = 0
+        for index, t in enumerate(self.data.timeSpan):
+            self.data.demand_cost += gp.quicksum(self.data.demand_bid_price[index][d] * self.variables.demand[d, t]
+                for d in self.data.loads
+            )
+
+        self.data.producers_cost = 0
+        for t in self.data.timeSpan:
+            self.data.producers_cost += gp.quicksum(self.data.bid_offers[g] * self.variables.production[g, t] for g in self.data.generators)
+            self.data.producers_cost += gp.quicksum(self.data.startup_cost[g] * self.variables.startup[g, t] for g in self.thermal)
+
+        # Maximize social welfare
+        self.model.setObjective(self.data.demand_cost - self.data.producers_cost, GRB.MAXIMIZE)
+
+    def build_model(self):
+        # Creates the model and calls the functions to build the variables, constraints, and objective function
+
+        print("\nBuilding model")
+        self.model = gp.Model(name="Unit Commitment Model")
+        self.model.setParam('OutputFlag', 1)
+
+        self.build_components()
+
+    def merit_order_commitment(self):
+        """
+        Heuristic commitment from the LP relaxation. A unit is on in the hours it produces in the relaxation, then
+        every run is extended to the minimum up time and off periods shorter than the minimum down time are filled.
+
+        Returns:
+            dict: Commitment (0 or 1) of every thermal unit and hour.
+        """
+        relaxed = self.model.relax()
+        relaxed.setParam('OutputFlag', 0)
+        relaxed.optimize()
+        hours = self.data.timeSpan
+        commitment = {}
+        if relaxed.status != GRB.OPTIMAL:
+            relaxed.dispose()
+            return commitment
+
+        for g in self.thermal:
+            on = [int(relaxed.getVarByName(f"Production_{g}_{t}").X > 1e-6) for t in hours]
+            # Extend every run that starts in the time span to the minimum up time
+            previous = self.data.initial_on[g]
+            for i in range(len(hours)):
+                if on[i] and not previous:
+                    for j in range(i, min(i + self.data.UT[g], len(hours))):
+                        on[j] = 1
+                previous = on[i]
+            # Keep the unit on through off periods shorter than the minimum down time
+            i = 0
+            while i < len(hours):
+                if on[i]:
+                    i += 1
+                    continue
+                j = i
+                while j < len(hours) and not on[j]:
+                    j += 1
+                was_on = on[i - 1] if i > 0 else self.data.initial_on[g]
+                if was_on and j < len(hours) and j - i < self.data.DT[g]:
+                    for k in range(i, j):
+                        on[k] = 1
+                i = j
+            for t, value in zip(hours, on):
+                commitment[g, t] = value
+        relaxed.dispose()
+        return commitment
+
+    def set_mip_start(self, commitment):
+        # Uses the commitment as the MIP start, Gurobi completes the continuous variables
+        previous = dict(self.data.initial_on)
+        for (g, t), value in commitment.items():
+            self.variables.on[g, t].Start = value
+            self.variables.startup[g, t].Start = int(value and not previous[g])
+            self.variables.shutdown[g, t].Start = int(previous[g] and not value)
+            previous[g] = value
+
+    def solve(self):
+        # Solves the MIP from the heuristic commitment
+        if self.mip_start:
+            with self.timed('mip_start'):
+                self.set_mip_start(self.merit_order_commitment())
+        super().solve()
+
+    def save_results(self):
+        # Save the results in the results attribute
+
+        print("\nSaving results")
+        self.results.production = {
+            (g, t): self.variables.production[g, t].X
+            for g in self.data.generators
+            for t in self.data.timeSpan
+        }
+        self.results.objective = self.model.objVal
+        self.results.mip_gap = self.model.MIPGap
+        self.results.commitment = {
+            (g, t): round(self.variables.on[g, t].X)
+            for g in self.thermal
+            for t in self.data.timeSpan
+        }
+        self.results.startup_cost = sum(self.data.startup_cost[g] * round(self.variables.startup[g, t].X)
+                                        for g in self.thermal for t in self.data.timeSpan)
+
+        # Prices of the LP with the commitment fixed
+        fixed = self.model.fixed()
+        fixed.setParam('OutputFlag', 0)
+        fixed.optimize()
+        self.results.price = {
+            t: fixed.getConstrByName(f"SystemDemandEqualProductionHour_{t}").Pi for t in self.data.timeSpan
+        }
+        fixed.dispose()
+
+        self.results.production_data = pd.DataFrame(
+            [[self.results.production[g, t] for g in self.data.generators] for t in self.data.timeSpan],
+            index=self.data.timeSpan, columns=self.data.generators
+        )
+        self.results.commitment_data = pd.DataFrame(
+            [[self.results.commitment[g, t] for g in self.thermal] for t in self.data.timeSpan],
+            index=self.data.timeSpan, columns=self.thermal
+        )
+        self.results.sum_power = self.results.production_data.values.sum()
+
+    def print_results(self):
+        # Print the results of the optimization problem
+        print("\nPrinting results")
+
+        print("\n1.-The market clearing price for each hour:")
+        for t, price in self.results.price.items():
+            print(f"Hour {t}: {price} $/MWh")
+
+        print(f"\n2.-Social welfare of the system: {self.results.objective}")
+        print(f"Startup costs: {self.results.startup_cost} $")
+        print(f"MIP gap: {self.results.mip_gap:.4%}")
+
+        print("\n3.-Commitment of the thermal units")
+        pd.set_option('display.max_columns', None)
+        print(self.results.commitment_data)
+
+        print("\nProduction for each generator")
+        print(self.results.production_data)
+        print("Sum of all generations: ",self.results.sum_power, "MW")
+        pd.reset_option('display.max_columns')
+
+    def run(self):
+        # Makes sure the model is solved and saves the results
+
+        self.solve()
+        if self.model.SolCount > 0 and self.model.status in (GRB.OPTIMAL, GRB.TIME_LIMIT):
+            self.extract()
+        else:
+            raise RuntimeError(f"\nOptimization of {self.model.ModelName} was not successful")
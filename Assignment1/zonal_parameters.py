@@ -0,0 +1,156 @@
+"""
+Zonal network parameters derived from the nodal network, for the ATC and flow-based modes of step3_zonal.
+
+The nodal PTDF of every line (network.py) is aggregated to the zones with a generation shift key (GSK), the share of
+the net position of a zone that is injected at each of its buses. In the base case every zone covers its own demand,
+dispatched to its buses with the GSK, so the net positions are zero but the lines already carry the base-case flows
+(loop flows when the GSK and the loads are located at different buses). A change of the net positions of the zones
+changes the flow of every critical branch linearly:
+
+    flow_l = base_flow[t, l] + sum_z zonal_ptdf[t, l, z] * net_position[z, t]
+    -ram_negative[t, l] <= sum_z zonal_ptdf[t, l, z] * net_position[z, t] <= ram_positive[t, l]
+
+where the remaining available margins (RAM) are the capacity of the branch, minus the reliability margin, minus
+(plus) the base-case flow. The ATC from zone a to zone b is the largest transfer a -> b that keeps every critical
+branch within its RAM in the direction in which the transfer loads it, so ATC a -> b and b -> a differ. Every quantity
+is computed for all the hours of the time span at once:
+
+    parameters = zonal_parameters(input_data, gsk='generation')
+    parameters['zonal_ptdf']        # hours x critical branches x zones
+    parameters['atc'][a, b, t]      # MW
+
+    python zonal_parameters.py --hours 24 --gsk generation
+"""
+import argparse
+
+import numpy as np
+
+from network import ptdf_matrix
+
+# Shift keys: weight of every bus in the net position of its zone
+GSK_TYPES = ('flat', 'generation', 'load')
+
+def bus_weights(input_data, gsk):
+    # hours x buses weights of the shift key
+    nodes, hours = input_data.nodes, input_data.timeSpan
+    index = {n: i for i, n in enumerate(nodes)}
+    weights = np.zeros((len(hours), len(nodes)))
+    if gsk == 'flat':
+        weights[:] = 1
+    elif gsk == 'generation':
+        # Available capacity of the units at every bus, hourly for the wind farms
+        for g in input_data.generators:
+            capacity = input_data.Pmax[g] if input_data.wind[g] else [input_data.Pmax[g]] * len(hours)
+            weights[:, index[input_data.P_node[g]]] += capacity
+    elif gsk == 'load':
+        for (d, n), share in input_data.demand_per_load.items():
+            weights[:, index[n]] += share
+    else:
+        raise ValueError(f"Unknown generation shift key '{gsk}', use one of {GSK_TYPES}")
+    return weights
+
+def generation_shift_keys(input_data, gsk='generation'):
+    """
+    Returns:
+        np.ndarray: hours x buses x zones shift keys. The keys of every zone and hour add up to 1. A zone whose buses
+            have no weight in an hour is shifted evenly among its buses.
+    """
+    zones = input_data.zones
+    membership = np.array([[input_data.zone_mapping[n] == z for z in zones] for n in input_data.nodes], dtype=float)
+    weights = bus_weights(input_data, gsk)[:, :, None] * membership[None, :, :]
+    totals = weights.sum(axis=1, keepdims=True)
+    flat = membership / membership.sum(axis=0)
+    return np.where(totals > 0, weights / np.where(totals > 0, totals, 1), flat[None, :, :])
+
+def nodal_demand(input_data):
+    # hours x buses demand
+    index = {n: i for i, n in enumerate(input_data.nodes)}
+    shares = np.zeros(len(input_data.nodes))
+    for (d, n), share in input_data.demand_per_load.items():
+        shares[index[n]] += share / 100
+    return np.array(input_data.demand, dtype=float)[:, None] * shares[None, :]
+
+def zonal_parameters(input_data, gsk='generation', critical_branches='all', reliability_margin=0.0, tolerance=1e-6):
+    """
+    Zonal PTDF, base-case flows, remaining available margins and ATCs of the zonal model.
+
+    Args:
+        input_data (InputData): Data of step3_zonal (nodes, zones, zone_mapping, bus_reactance, bus_capacity).
+        gsk (str): Generation shift key, 'flat', 'generation' (available capacity) or 'load' (load shares).
+        critical_branches (str): 'all' lines or the 'cross_border' lines between zones.
+        reliability_margin (float): Share of the capacity of every line kept as a margin.
+        tolerance (float): Smallest zone-to-zone PTDF that limits an ATC.
+
+    Returns:
+        dict: critical_branches (list of lines), gsk (hours x buses x zones), zonal_ptdf (hours x branches x zones),
+            base_flow, ram_positive and ram_negative (hours x branches, the RAM in the direction of the line and in
+            the opposite one) and atc {(a, b, t): MW from zone a to zone b}.
+    """
+    all_lines = list(input_data.bus_reactance.keys())
+    lines = all_lines
+    if critical_branches == 'cross_border':
+        lines = [(n, m) for n, m in lines if input_data.zone_mapping[n] != input_data.zone_mapping[m]]
+    elif critical_branches != 'all':
+        raise ValueError("critical_branches must be 'all' or 'cross_border'")
+
+    ptdf = ptdf_matrix(input_data.nodes, all_lines, input_data.bus_reactance, reference=input_data.nodes[0])
+    ptdf = ptdf[[all_lines.index(line) for line in lines]]
+    keys = generation_shift_keys(input_data, gsk)
+    zonal_ptdf = np.einsum('ln,tnz->tlz', ptdf, keys)
+
+    # Base case: the demand of every zone is produced at its buses in the proportions of the GSK
+    demand = nodal_demand(input_data)
+    membership = np.array([[input_data.zone_mapping[n] == z for z in input_data.zones] for n in input_data.nodes], dtype=float)
+    injection = np.einsum('tnz,tz->tn', keys, demand @ membership) - demand
+    base_flow = injection @ ptdf.T
+
+    capacity = (1 - reliability_margin) * np.array([input_data.bus_capacity[line] for line in lines])
+    ram_positive = capacity[None, :] - base_flow
+    ram_negative = capacity[None, :] + base_flow
+
+    # Flow of every branch per MW transferred from zone a to zone b: hours x branches x zones (a) x zones (b).
+    # A positive transfer uses the RAM in the direction of the line, a negative one the RAM in the opposite direction
+    transfer = zonal_ptdf[:, :, :, None] - zonal_ptdf[:, :, None, :]
+    ram = np.where(transfer > 0, ram_positive[:, :, None, None], ram_negative[:, :, None, None])
+    limited = np.abs(transfer) > tolerance
+    limit = np.where(limited, np.maximum(ram, 0) / np.where(limited, np.abs(transfer), 1), np.inf)
+    atc = limit.min(axis=1)
+
+    zones = input_data.zones
+    return {
+        'critical_branches': lines,
+        'gsk': keys,
+        'zonal_ptdf': zonal_ptdf,
+        'base_flow': base_flow,
+        'ram_positive': ram_positive,
+        'ram_negative': ram_negative,
+        'atc': {
+            (a, b, t): float(atc[t_index, i, j])
+            for t_index, t in enumerate(input_data.timeSpan)
+            for i, a in enumerate(zones)
+            for j, b in enumerate(zones) if a != b
+        },
+    }
+
+if __name__ == "__main__":
+    from chronological import load_step
+    from scaled_instance import load_dataset, model_inputs
+
+    parser = argparse.ArgumentParser(description="Zonal market with the ATC of the input data, derived ATCs or flow-based limits")
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--gsk', choices=GSK_TYPES, default='generation')
+    parser.add_argument('--critical-branches', choices=['all', 'cross_border'], default='all')
+    parser.add_argument('--reliability-margin', type=float, default=0.0)
+    args = parser.parse_args()
+
+    inputs = model_inputs(load_dataset())
+    InputData, Model = load_step('zonal')
+    input_data = InputData(inputs['generators'], inputs['bid_offers'], inputs['system_demand'], inputs['demand_per_load'],
+                           inputs['bus_reactance'], inputs['bus_capacity'], inputs['zone_mapping'], num_hours=args.hours)
+    for mode in Model.MODES:
+        model = Model(input_data, mode, args.gsk, args.critical_branches, args.reliability_margin)
+        model.model.setParam('OutputFlag', 0)
+        model.run()
+        phases = model.profile['phases']
+        print(f"{mode:>12}: social welfare {model.model.ObjVal:.2f}, constraints {model.model.NumConstrs}, "
+              f"solve {phases['solve']:.3f} s")
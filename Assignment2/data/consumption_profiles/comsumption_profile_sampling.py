@@ -1,3 +1,4 @@
+import argparse
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -11,43 +12,106 @@ max_kw = 600
 max_change = 35
 
 # Profile generation function
-def generate_profile():
-    profile = np.zeros(profile_length)
-    profile[0] = np.random.uniform(min_kw, max_kw)
+def generate_profiles(n_profiles, rng=None):
+    """
+    Generates n_profiles bounded random walks at once. Every minute all the profiles
+    take a uniform step within [-max_change, max_change], clipped to [min_kw, max_kw].
+
+    Args:
+        n_profiles (int): Number of profiles to generate.
+        rng: Seed or np.random.Generator used to draw the steps.
+    """
+    rng = np.random.default_rng(rng)
+    profiles = np.empty((n_profiles, profile_length))
+    profiles[:, 0] = rng.uniform(min_kw, max_kw, size=n_profiles)
     for i in range(1, profile_length):
-        lower = max(min_kw, profile[i - 1] - max_change)
-        upper = min(max_kw, profile[i - 1] + max_change)
-        profile[i] = np.random.uniform(lower, upper)
-    return profile
+        lower = np.maximum(min_kw, profiles[:, i - 1] - max_change)
+        upper = np.minimum(max_kw, profiles[:, i - 1] + max_change)
+        profiles[:, i] = rng.uniform(lower, upper)
+    return profiles
+
+def generate_legacy_profiles(n_profiles):
+    # Profiles drawn one at a time from the global np.random state, as the committed in_sample_profiles2.csv
+    # and out_sample_profiles2.csv were generated
+    profiles = np.zeros((n_profiles, profile_length))
+    for p in range(n_profiles):
+        profiles[p, 0] = np.random.uniform(min_kw, max_kw)
+        for i in range(1, profile_length):
+            lower = max(min_kw, profiles[p, i - 1] - max_change)
+            upper = min(max_kw, profiles[p, i - 1] + max_change)
+            profiles[p, i] = np.random.uniform(lower, upper)
+    return profiles
+
+def legacy_split(seed=2):
+    # Reproduces the committed in-sample profiles and their out-of-sample complement
+    np.random.seed(seed)
+    all_profiles = generate_legacy_profiles(num_profiles)
+    in_sample_indices = np.random.choice(num_profiles, in_sample_count, replace=False)
+    return all_profiles, all_profiles[in_sample_indices], np.delete(all_profiles, in_sample_indices, axis=0)
 
-# Generate profiles
-np.random.seed(2)
-all_profiles = np.array([generate_profile() for _ in range(num_profiles)])
-in_sample_indices = np.random.choice(num_profiles, in_sample_count, replace=False)
-in_sample_profiles = all_profiles[in_sample_indices]
-out_sample_profiles = np.delete(all_profiles, in_sample_indices, axis=0)
+def iter_profile_chunks(n_profiles, chunk_size=10000, seed=None):
+    """
+    Yields the profiles in chunks of at most chunk_size rows, so that the whole bank
+    never has to be held in memory. The output is reproducible for a given seed and chunk_size.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_profiles, chunk_size):
+        yield generate_profiles(min(chunk_size, n_profiles - start), rng)
 
-# Save profiles to CSV
-df_in_sample = pd.DataFrame(in_sample_profiles)
-df_in_sample.to_csv("data/consumption_profiles/in_sample_profiles2.csv", index=False)
+def generate_profiles_to_npy(path, n_profiles, chunk_size=10000, seed=None):
+    # Streams the profiles into a memory-mapped .npy file of shape (n_profiles, profile_length)
+    profiles = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(n_profiles, profile_length))
+    start = 0
+    for chunk in iter_profile_chunks(n_profiles, chunk_size, seed):
+        profiles[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    profiles.flush()
+    return profiles
 
-df_out_sample = pd.DataFrame(out_sample_profiles)
-df_out_sample.to_csv("data/consumption_profiles/out_sample_profiles2.csv", index=False)
+def generate_profiles_to_csv(path, n_profiles, chunk_size=10000, seed=None):
+    # Streams the profiles into a CSV file with the same layout as in_sample_profiles.csv
+    header = True
+    for chunk in iter_profile_chunks(n_profiles, chunk_size, seed):
+        pd.DataFrame(chunk).to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+# Heatmap accumulation function
+def accumulate_heatmap_counts(profiles, bins, counts=None):
+    """
+    Adds the (power bin x minute) counts of a block of profiles to counts in a single
+    digitize + bincount pass. Bins follow np.histogram: half-open except the last one,
+    and values outside [bins[0], bins[-1]] are dropped.
+    """
+    n_bins = len(bins) - 1
+    if counts is None:
+        counts = np.zeros((n_bins, profile_length), dtype=np.int64)
+    bin_idx = np.searchsorted(bins, profiles, side='right') - 1
+    bin_idx[profiles == bins[-1]] = n_bins - 1
+    valid = (bin_idx >= 0) & (bin_idx < n_bins)
+    minute_idx = np.broadcast_to(np.arange(profiles.shape[1]), profiles.shape)
+    flat_idx = bin_idx[valid] * profile_length + minute_idx[valid]
+    counts += np.bincount(flat_idx, minlength=n_bins * profile_length).reshape(n_bins, profile_length)
+    return counts
 
 # Generate heatmap data function
-def create_heatmap_data(profiles, resolution_kw=10):
+def create_heatmap_data(profiles, resolution_kw=10, chunk_size=10000):
+    # profiles can be a 2D array (also a memory-mapped bank, read chunk_size rows at a time) or an iterable of 2D chunks
     bins = np.arange(min_kw, max_kw + resolution_kw, resolution_kw)
     bin_centers = 0.5 * (bins[:-1] + bins[1:])
-    heatmap = np.zeros((len(bin_centers), profile_length))
-    for t in range(profile_length):
-        hist, _ = np.histogram(profiles[:, t], bins=bins)
-        heatmap[:, t] = hist / profiles.shape[0]
+    if isinstance(profiles, np.ndarray):
+        chunks = (profiles[i:i + chunk_size] for i in range(0, len(profiles), chunk_size))
+    else:
+        chunks = profiles
+    counts = None
+    n_profiles = 0
+    for chunk in chunks:
+        counts = accumulate_heatmap_counts(np.asarray(chunk), bins, counts)
+        n_profiles += len(chunk)
+    if n_profiles == 0:
+        raise ValueError("No profiles to build the heatmap from")
+    heatmap = counts / n_profiles
     return heatmap, bin_centers
 
-# Generate heatmap data
-heatmap_all, bin_centers = create_heatmap_data(all_profiles)
-heatmap_in_sample, _ = create_heatmap_data(in_sample_profiles)
-
 # X axis labels
 time_labels = np.linspace(0, 24, 9)
 time_ticks = (time_labels * 60).astype(int)
@@ -69,6 +133,38 @@ def plot_heatmap(heatmap, bin_centers, title):
     plt.tight_layout()
     plt.show()
 
-# Show plots
-# plot_heatmap(heatmap_all, bin_centers, "All scenarios")
-# plot_heatmap(heatmap_in_sample, bin_centers, "In-sample scenarios")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates the in-sample and out-of-sample consumption profiles")
+    parser.add_argument('--legacy', action='store_true',
+                        help="Reproduce the committed in_sample_profiles2.csv and out_sample_profiles2.csv")
+    args = parser.parse_args()
+
+    # Generate profiles. The new generator writes to its own files, so the committed data is never replaced
+    if args.legacy:
+        all_profiles, in_sample_profiles, out_sample_profiles = legacy_split(seed=2)
+        suffix = '2'
+    else:
+        rng = np.random.default_rng(2)
+        all_profiles = generate_profiles(num_profiles, rng)
+        in_sample_indices = rng.choice(num_profiles, in_sample_count, replace=False)
+        in_sample_profiles = all_profiles[in_sample_indices]
+        out_sample_profiles = np.delete(all_profiles, in_sample_indices, axis=0)
+        suffix = '3'
+
+    # Save profiles to CSV
+    df_in_sample = pd.DataFrame(in_sample_profiles)
+    df_in_sample.to_csv(f"data/consumption_profiles/in_sample_profiles{suffix}.csv", index=False)
+
+    df_out_sample = pd.DataFrame(out_sample_profiles)
+    df_out_sample.to_csv(f"data/consumption_profiles/out_sample_profiles{suffix}.csv", index=False)
+
+    # Large scenario banks are streamed to disk instead, e.g.:
+    # generate_profiles_to_npy("data/consumption_profiles/profile_bank.npy", 1_000_000, seed=2)
+
+    # Generate heatmap data
+    heatmap_all, bin_centers = create_heatmap_data(all_profiles)
+    heatmap_in_sample, _ = create_heatmap_data(in_sample_profiles)
+
+    # Show plots
+    # plot_heatmap(heatmap_all, bin_centers, "All scenarios")
+    # plot_heatmap(heatmap_in_sample, bin_centers, "In-sample scenarios")
@@ -0,0 +1,224 @@
+import time
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+
+from .input_data import InputData
+
+class Expando(object):
+    '''
+        A small class which can have attributes set
+    '''
+    pass
+
+class BendersBiddingModel():
+    """
+    L-shaped (Benders) decomposition of the wind farm bidding problem.
+
+    The master problem only keeps the 24 day-ahead bids plus one variable per aggregated cut family.
+    For fixed bids the imbalance of every scenario is known, and the optimal split into up and down
+    imbalance is the cheapest one, so the recourse profit of scenario w and hour t is
+        Q[w,t] = min(up_price[w,t] * imbalance[w,t], down_price[w,t] * imbalance[w,t])
+    with up_price = down_price for the one price scheme. The subproblems are therefore evaluated in
+    batches with array operations, which also give the supergradients used in the cuts.
+
+    With beta > 0 the objective is (1 - beta) * expected profit + beta * CVaR, as in RiskAverseExPostAnalysis.
+    """
+
+    def __init__(self, input_data: InputData, beta: float = 0, alpha: float = 0.9, verbose: bool = True,
+                 tolerance: float = 1e-6, max_iterations: int = 500, batch_size: int = 10000, env=None):
+        if verbose:
+            print()
+            print('-' * 50)
+            print(f'{"BENDERS DECOMPOSITION OF THE OFFERING STRATEGY":^30}')
+            print('-' * 50)
+        # Initialize model attributes
+        self.data = input_data
+        self.beta = beta
+        self.alpha = alpha
+        self.verbose = verbose
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.batch_size = batch_size
+        self.env = env
+        self.variables = Expando()
+        self.constraints = Expando()
+        self.results = Expando()
+        self.build_scenario_arrays()
+        self.build_model()
+
+    def build_scenario_arrays(self):
+        # Scenario data as (scenarios x hours) arrays
+        arrays = self.data.scenario_arrays()
+        self.rp, self.eprice, sc, self.prob = arrays['rp'], arrays['eprice'], arrays['sc'], arrays['prob']
+
+        # Price of a positive (up) and negative (down) imbalance
+        if self.data.model_type == 'one_price':
+            self.up_price = self.eprice * (self.data.positiveBalancePriceFactor * sc + self.data.negativeBalancePriceFactor * (1 - sc))
+            self.down_price = self.up_price
+        elif self.data.model_type == 'two_price':
+            self.up_price = self.eprice * (sc + self.data.negativeBalancePriceFactor * (1 - sc))
+            self.down_price = self.eprice * (self.data.positiveBalancePriceFactor * sc + (1 - sc))
+        else:
+            raise ValueError("Invalid model type. Use 'one_price' or 'two_price'.")
+
+    def evaluate_scenarios(self, production):
+        """
+        Evaluates every scenario for the given bids, batch_size scenarios at a time.
+
+        Returns:
+            profit (np.array): Profit per scenario.
+            gradient (np.array): Supergradient of the profit of every scenario with respect to the bids (scenarios x hours).
+        """
+        profit = np.empty(len(self.data.W))
+        gradient = np.empty(self.rp.shape)
+        for start in range(0, len(self.data.W), self.batch_size):
+            batch = slice(start, start + self.batch_size)
+            imbalance = self.rp[batch] * self.data.p_nom - production
+            imbalance_price = np.where(imbalance > 0, self.up_price[batch], self.down_price[batch])
+            profit[batch] = (self.eprice[batch] * production + imbalance_price * imbalance).sum(axis=1)
+            gradient[batch] = self.eprice[batch] - imbalance_price
+        return profit, gradient
+
+    def compute_cvar(self, profit, prob=None):
+        # Exact CVaR of the discrete profit distribution: max over VaR >= 0 of VaR - E[(VaR - profit)^+] / (1 - alpha)
+        prob = self.prob if prob is None else prob
+        # The maximum is attained at VaR = 0 or at one of the scenario profits
+        values = np.concatenate((profit, [0.0]))
+        order = np.argsort(values)
+        sorted_profit = values[order]
+        sorted_prob = np.concatenate((prob, [0.0]))[order]
+        shortfall = np.cumsum(sorted_prob) * sorted_profit - np.cumsum(sorted_prob * sorted_profit)
+        candidates = sorted_profit - shortfall / (1 - self.alpha)
+        best = np.argmax(np.where(sorted_profit >= 0, candidates, -np.inf))
+        return candidates[best], sorted_profit[best]
+
+    def build_variables(self):
+        # Create the variables
+
+        # Bidded production
+        self.variables.production = {
+            t: self.model.addVar(lb=0, ub=self.data.p_nom, name=f"Production_{t}")
+            for t in self.data.T
+        }
+
+        # Expected profit, bounded from above by the optimality cuts
+        self.variables.expected_profit = self.model.addVar(lb=-GRB.INFINITY, name="ExpectedProfit")
+
+        if self.beta > 0:
+            # Value at risk and expected shortfall below it
+            self.variables.value_at_risk = self.model.addVar(lb=0, name="ValueAtRisk")
+            self.variables.shortfall = self.model.addVar(lb=0, name="Shortfall")
+
+    def build_objective_function(self):
+        # Create the objective function
+        objective = (1 - self.beta) * self.variables.expected_profit
+        if self.beta > 0:
+            objective += self.beta * (self.variables.value_at_risk - 1 / (1 - self.alpha) * self.variables.shortfall)
+        self.model.setObjective(objective, GRB.MAXIMIZE)
+
+    def build_model(self):
+        # Creates the master problem
+        if self.verbose:
+            print("\nBuilding master problem")
+
+        self.model = gp.Model(name="BendersMasterProblem", env=self.env)
+        self.model.setParam('OutputFlag', 0)
+        self.build_variables()
+        self.build_objective_function()
+        self.constraints.optimality_cuts = []
+        self.constraints.cvar_cuts = []
+
+        # Initial cuts at zero production keep the master problem bounded
+        self.add_cuts(np.zeros(len(self.data.T)), value_at_risk=np.inf)
+        self.model.update()
+
+    def add_cuts(self, production, value_at_risk=None):
+        """
+        Adds the aggregated optimality cut and, if beta > 0, the aggregated CVaR cut at the given bids.
+
+        Every scenario profit is concave in the bids, so profit[w] + gradient[w] * (x - production)
+        is an upper bound of it. Averaging these bounds gives the optimality cut, and summing
+        VaR - bound over the scenarios below value_at_risk gives a valid lower bound of the shortfall.
+        Returns the profit per scenario at the given bids.
+        """
+        profit, gradient = self.evaluate_scenarios(production)
+        expected_gradient = self.prob @ gradient
+        linearization = gp.quicksum(
+            expected_gradient[i] * (self.variables.production[t] - production[i])
+            for i, t in enumerate(self.data.T)
+        )
+        self.constraints.optimality_cuts.append(self.model.addConstr(
+            self.variables.expected_profit,
+            GRB.LESS_EQUAL,
+            self.prob @ profit + linearization,
+            name=f"OptimalityCut_{len(self.constraints.optimality_cuts)}"
+        ))
+
+        if self.beta > 0 and value_at_risk is not None:
+            below = profit < value_at_risk
+            prob_below = self.prob[below].sum()
+            if prob_below > 0:
+                tail_gradient = self.prob[below] @ gradient[below]
+                self.constraints.cvar_cuts.append(self.model.addConstr(
+                    self.variables.shortfall,
+                    GRB.GREATER_EQUAL,
+                    prob_below * self.variables.value_at_risk
+                    - self.prob[below] @ profit[below]
+                    - gp.quicksum(tail_gradient[i] * (self.variables.production[t] - production[i]) for i, t in enumerate(self.data.T)),
+                    name=f"CVaRCut_{len(self.constraints.cvar_cuts)}"
+                ))
+        return profit
+
+    def run(self):
+        # Iterates between the master problem and the scenario subproblems until the bounds meet
+        start_time = time.time()
+        self.results.log = []
+        best_objective = -np.inf
+
+        for it in range(1, self.max_iterations + 1):
+            self.model.optimize()
+            if self.model.status != GRB.OPTIMAL:
+                raise RuntimeError(f"Benders master problem was not solved to optimality (status {self.model.status})")
+            upper_bound = self.model.ObjVal
+            production = np.array([self.variables.production[t].X for t in self.data.T])
+            value_at_risk = self.variables.value_at_risk.X if self.beta > 0 else None
+
+            # Evaluate the bids exactly and add the cuts
+            profit = self.add_cuts(production, value_at_risk)
+            expected_profit = self.prob @ profit
+            cvar, _ = self.compute_cvar(profit) if self.beta > 0 else (0, 0)
+            objective = (1 - self.beta) * expected_profit + self.beta * cvar
+            if objective > best_objective:
+                best_objective = objective
+                self.save_results(production, profit, cvar)
+
+            gap = (upper_bound - best_objective) / max(1, abs(upper_bound))
+            self.results.log.append({
+                'iteration': it,
+                'lower_bound': best_objective,
+                'upper_bound': upper_bound,
+                'gap': gap,
+                'time': time.time() - start_time,
+            })
+            if self.verbose:
+                print(f"Iteration {it:>4}: LB {best_objective:.2f}  UB {upper_bound:.2f}  gap {gap:.2e}")
+            if gap <= self.tolerance:
+                break
+            self.model.update()
+        else:
+            print(f"Benders did not converge in {self.max_iterations} iterations (gap {gap:.2e})")
+
+        self.results.iterations = len(self.results.log)
+        self.results.runtime = time.time() - start_time
+        if self.verbose:
+            print(f"Solved in {self.results.iterations} iterations and {self.results.runtime:.2f} seconds")
+
+    def save_results(self, production, profit, cvar):
+        # Saves the results of the best bids found so far
+        self.results.production = {t: production[i] for i, t in enumerate(self.data.T)}
+        self.results.profit_per_scenario = {w: profit[i] for i, w in enumerate(self.data.W)}
+        self.results.total_expected_profit = self.prob @ profit
+        self.results.cvar = cvar
+        self.results.objective = (1 - self.beta) * self.results.total_expected_profit + self.beta * cvar
+        self.results.avg_bid = production.mean()
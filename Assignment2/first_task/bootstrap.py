@@ -0,0 +1,127 @@
+import numpy as np
+from multiprocessing import Pool
+
+from .results import ProfitDistribution
+
+def resample_statistics(profit, n_resamples, alpha, seed=None):
+    """
+    Expected profit and CVaR of n_resamples bootstrap resamples of the scenario profits, in one array operation.
+    A resample is a vector of multinomial counts over the scenarios, so the profits are only sorted once.
+
+    Returns:
+        expected_profit (np.array), cvar (np.array): One value per resample.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(profit)
+    sorted_profit = np.sort(profit)
+    weights = rng.multinomial(n, np.full(n, 1/n), size=n_resamples) / n
+    cum_prob = np.cumsum(weights, axis=1)
+    cum_weighted = np.cumsum(weights * sorted_profit, axis=1)
+    expected_profit = cum_weighted[:, -1]
+
+    # VaR is the first sorted profit where the cumulative probability reaches 1 - alpha
+    index = np.minimum((cum_prob < 1 - alpha - 1e-12).sum(axis=1), n - 1)
+    rows = np.arange(n_resamples)
+    value_at_risk = sorted_profit[index]
+    cvar = value_at_risk - (cum_prob[rows, index] * value_at_risk - cum_weighted[rows, index]) / (1 - alpha)
+    return expected_profit, cvar
+
+def resample_chunk(args):
+    # Pool worker
+    return resample_statistics(*args)
+
+class Bootstrap:
+    """
+    Bootstrap confidence intervals for the out-of-sample profit of a bidding strategy and its gap
+    to the in-sample profit. The in-sample profit is the optimal value of the in-sample problem and is kept fixed.
+    """
+
+    def __init__(self, n_resamples: int = 10000, confidence: float = 0.95, alpha: float = 0.9,
+                 chunk_size: int = 1000, n_workers: int = 1, seed=None):
+        self.n_resamples = n_resamples
+        self.confidence = confidence
+        self.alpha = alpha
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+        self.seed = seed
+
+    def resample(self, profit):
+        # Statistics of all the resamples, chunk_size resamples at a time, on n_workers processes
+        profit = np.asarray(profit, dtype=float)
+        chunks = [min(self.chunk_size, self.n_resamples - start) for start in range(0, self.n_resamples, self.chunk_size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunks))
+        tasks = [(profit, size, self.alpha, seed) for size, seed in zip(chunks, seeds)]
+        if self.n_workers > 1:
+            with Pool(self.n_workers) as pool:
+                results = pool.map(resample_chunk, tasks)
+        else:
+            results = [resample_chunk(task) for task in tasks]
+        return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+    def interval(self, values):
+        # Percentile confidence interval
+        tail = (1 - self.confidence) / 2 * 100
+        low, high = np.percentile(values, [tail, 100 - tail])
+        return low, high
+
+    def summarize(self, name, values, estimate):
+        low, high = self.interval(values)
+        return {name: estimate, f'{name}_low': low, f'{name}_high': high}
+
+    def statistics(self, insample_profit, expected_profit, cvar):
+        # Gap statistics of the sample or of every resample
+        return {
+            'expected_profit': expected_profit,
+            'cvar': cvar,
+            'gap': insample_profit - expected_profit,
+            'relative_gap': (insample_profit - expected_profit) / insample_profit * 100,
+        }
+
+    def bootstrap(self, insample_profit, outsample_profit):
+        # Point estimates, resampled statistics and their confidence intervals
+        outsample_profit = np.asarray(outsample_profit, dtype=float)
+        distribution = ProfitDistribution(outsample_profit, np.full(len(outsample_profit), 1/len(outsample_profit)))
+        point = self.statistics(insample_profit, distribution.expected(), float(distribution.cvar(self.alpha)))
+        resampled = self.statistics(insample_profit, *self.resample(outsample_profit))
+        result = {}
+        for name in point:
+            result.update(self.summarize(name, resampled[name], point[name]))
+        return result, point, resampled
+
+    def analyse(self, insample_profit, outsample_profit):
+        """
+        Args:
+            insample_profit (float): In-sample expected profit.
+            outsample_profit (np.array): Out-of-sample profit of every scenario.
+
+        Returns:
+            dict: Point estimate and confidence interval (name_low, name_high) of the out-of-sample expected profit,
+                CVaR, profit gap and relative gap (%).
+        """
+        return self.bootstrap(insample_profit, outsample_profit)[0]
+
+    def analyse_folds(self, cv_results):
+        """
+        Confidence intervals of every fold of ExPostAnalysis.cross_validation and of their average,
+        which is computed resample by resample over the folds. The average relative gap is the gap of the
+        averages over the average in-sample profit, as in sensitivity_expost.
+
+        Returns:
+            list: Result of analyse for every fold.
+            dict: Same statistics for the average over the folds.
+        """
+        fold_results, points, resampled = [], [], []
+        for fold in cv_results:
+            result, point, samples = self.bootstrap(fold['insample_expected_profit'], fold['outsample_profit_per_scenario'])
+            fold_results.append({'fold': fold['fold'], **result})
+            points.append(point)
+            resampled.append(samples)
+
+        average_insample_profit = np.mean([fold['insample_expected_profit'] for fold in cv_results])
+        average = {}
+        for name in ['expected_profit', 'cvar', 'gap']:
+            values = np.mean([samples[name] for samples in resampled], axis=0)
+            average.update(self.summarize(name, values, np.mean([point[name] for point in points])))
+        gap_values = np.mean([samples['gap'] for samples in resampled], axis=0)
+        average.update(self.summarize('relative_gap', gap_values / average_insample_profit * 100, average['gap'] / average_insample_profit * 100))
+        return fold_results, average
@@ -6,6 +6,8 @@ from sklearn.model_selection import KFold
 from .input_data import InputData
 from .model_one_price import OnePriceBiddingModel
 from .model_two_price import TwoPriceBiddingModel
+from .perfect_information import PerfectInformationAnalysis
+from .results import hourly_profit
 
 class ExPostAnalysis:
     def __init__(self, scenarios: list, timeSpan: list, model_type: str, verbose: bool = True):
@@ -135,6 +137,16 @@ class ExPostAnalysis:
             outofsample_expected_profit = outsample_profit_da + outsample_expected_profit_imbalance
             profit_difference = insample_expected_profit - outofsample_expected_profit
 
+            # Step 4: value of perfect information and of the stochastic solution
+            outsample_data = InputData(T = self.T, W = list(out_indices), scenario = out_scenarios, prob_scenario = 1/len(out_scenarios), model_type = self.model_type)
+            value_analysis = PerfectInformationAnalysis(model.data).analyse(
+                insample_expected_profit,
+                outsample_data=outsample_data,
+                stochastic_production=model.results.production
+            )
+            production = np.array([model.results.production[t] for t in self.T])
+            outsample_profit_per_scenario = hourly_profit(outsample_data, production).sum(axis=1)
+
             # Print logs
             if self.verbose:
                 print(f"In-sample profit DA: {round(sum(profit_da.values()), 1)}")
@@ -146,6 +158,8 @@ class ExPostAnalysis:
                 print(f"In-sample expected profit: {round(insample_expected_profit, 1)}")
                 print(f"Out-sample expected profit: {round(outofsample_expected_profit, 1)}")
                 print(f"Profit difference: {round(profit_difference, 1)}")
+                print(f"In-sample EVPI: {round(value_analysis['evpi'], 1)} | VSS: {round(value_analysis['vss'], 1)}")
+                print(f"Out-sample EVPI: {round(value_analysis['outsample_evpi'], 1)} | VSS: {round(value_analysis['outsample_vss'], 1)}")
                 #print(f"Relative difference: {round(profit_difference / insample_expected_profit * 100, 1)}%")
                 print(f"="*8)
 
@@ -156,6 +170,12 @@ class ExPostAnalysis:
                 "outofsample_expected_profit": outofsample_expected_profit,
                 "expected_profit_difference": profit_difference,
                 "expected_relative_difference": profit_difference / insample_expected_profit * 100,
+                "wait_and_see": value_analysis['wait_and_see'],
+                "evpi": value_analysis['evpi'],
+                "vss": value_analysis['vss'],
+                "outsample_evpi": value_analysis['outsample_evpi'],
+                "outsample_vss": value_analysis['outsample_vss'],
+                "outsample_profit_per_scenario": outsample_profit_per_scenario,
             })
         
         # Print summary of results
@@ -177,6 +197,8 @@ class ExPostAnalysis:
             #print(f"Average relative difference: {round(avg_relative_difference, 1)}%")
             print(f"Difference of the average between in-sample and out-of-sample expected profit: {round(avg_insample_profit - avg_outofsample_profit, 1)}")
             print(f"Relative difference of the average between in-sample and out-of-sample expected profit: {round((avg_insample_profit - avg_outofsample_profit) / avg_insample_profit * 100, 1)}%")
+            print(f"Average in-sample EVPI: {round(np.mean([result['evpi'] for result in results]), 1)} | VSS: {round(np.mean([result['vss'] for result in results]), 1)}")
+            print(f"Average out-of-sample EVPI: {round(np.mean([result['outsample_evpi'] for result in results]), 1)} | VSS: {round(np.mean([result['outsample_vss'] for result in results]), 1)}")
             print(f"{'='*30}")
         return results
 
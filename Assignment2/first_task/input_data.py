@@ -1,14 +1,15 @@
 import numpy as np
 import pandas as pd
-import os
-import glob
-import itertools
 import random
+from collections.abc import Mapping, Sequence
 import matplotlib.pyplot as plt
+
+from . import scenario_store
+
 random.seed(2) #Used seed for results shown in report: 5
 
 class InputData:
-    def __init__(self, T:list, W:list, scenario:dict, prob_scenario:float, model_type:str = 'one_price'):  
+    def __init__(self, T:list, W:list, scenario:dict, prob_scenario, model_type:str = 'one_price'):  
         # SETS
         self.T = T
         self.W = W
@@ -17,10 +18,30 @@ class InputData:
         self.scenario = scenario
         self.p_nom = 500 # MW
         self.prob_scenario = prob_scenario
+        # Probability of every scenario. prob_scenario is either the probability shared by all
+        # the scenarios or a dict {w: probability}, e.g. for a reduced scenario set
+        if isinstance(prob_scenario, dict):
+            self.probability = {w: prob_scenario[w] for w in W}
+        else:
+            self.probability = {w: prob_scenario for w in W}
         self.positiveBalancePriceFactor = 1.25
         self.negativeBalancePriceFactor = 0.85
 
         self.model_type = model_type
+        self._scenario_arrays = None
+
+    def scenario_arrays(self):
+        """
+        Scenario data as (scenarios x hours) numpy arrays 'rp', 'eprice' and 'sc', and the scenario
+        probabilities 'prob', in the order of W. Built on the first call and reused afterwards.
+        """
+        if self._scenario_arrays is None:
+            self._scenario_arrays = {
+                key: np.array([[self.scenario[w][key][t] for t in self.T] for w in self.W], dtype=float)
+                for key in ['rp', 'eprice', 'sc']
+            }
+            self._scenario_arrays['prob'] = np.array([self.probability[w] for w in self.W])
+        return self._scenario_arrays
     
 # --------------------------------------------------------------------------------
 #       DEFINITION OF SETS
@@ -36,102 +57,147 @@ W = [i for i in range(1,num_samples+1)]
 #       LOAD DATA FROM FILES AND CREATE SCENARIOS
 # --------------------------------------------------------------------------------
 
-# Helper function to load files
-def load_files(directory):
-    """Loads all files from a given directory."""
-    return glob.glob(os.path.join(directory, '*'))
+# The scenario libraries are read from the binary store (python -m first_task.scenario_store)
+# if it exists and is up to date with the CSV files, otherwise the CSV files are parsed
+scenario_arrays = scenario_store.load()
+if scenario_arrays is None:
+    scenario_arrays = scenario_store.read_sources()
+
+class HourlyProfile(Mapping):
+    """
+    Read-only {t: value} view of one row of a scenario library (t = 1..24). The values are read from the
+    (memory-mapped) array when they are accessed, so the libraries are not copied into every process.
 
-# PATHS
-script_dir = os.path.dirname(__file__)
-data_dir = os.path.join(script_dir, '../data')
+    Args:
+        row (np.ndarray): Values of the hours.
+        lower (float): Values below lower are replaced by lower when they are read.
+    """
 
-# Define paths for different scenarios
-path_rp_29_march = os.path.join(data_dir, 'rate_of_production_scenarios/29march')
-path_rp_30_march = os.path.join(data_dir, 'rate_of_production_scenarios/30march')
-files_rp_29 = load_files(path_rp_29_march)
-files_rp_30 = load_files(path_rp_30_march)
+    def __init__(self, row, lower=None):
+        self.row = row
+        self.lower = lower
 
-path_eprice = os.path.join(data_dir, 'eprice_scenarios')
-files_eprice = load_files(path_eprice)
-path_system_cond = os.path.join(data_dir, 'ps_condition/ps_condition_scenarios.csv')
+    def __getitem__(self, t):
+        if not 1 <= t <= len(self.row):
+            raise KeyError(t)
+        value = self.row[t-1].item()
+        return value if self.lower is None else max(value, self.lower)
 
+    def __iter__(self):
+        return iter(range(1, len(self.row)+1))
+
+    def __len__(self):
+        return len(self.row)
+
+def scenario_library(array, lower=None):
+    # {w: HourlyProfile} of every row of array, w = 1..number of rows
+    return {w+1: HourlyProfile(array[w], lower) for w in range(len(array))}
 
 # SCENARIOS
 # Rate of production scenarios
-rp_scenarios = {}
-w_count = 1
-for file in files_rp_29:
-    data = pd.read_csv(file, sep=';')
-    data = dict(zip(T[:], data.iloc[:,4]))
-    rp_scenarios[w_count] = data
-    w_count += 1
-for file in files_rp_30:
-    data = pd.read_csv(file, sep=';')
-    data = dict(zip(T[:], data.iloc[:,4]))
-    rp_scenarios[w_count] = data
-
-    w_count += 1
-
-sc_scenarios = {}
-system_condition_scenarios = pd.read_csv(path_system_cond, sep=',')
-num_rows = system_condition_scenarios.shape[0]
-
-for i in range(num_rows):
-    sc_scenarios[i+1] = {j+1: int(system_condition_scenarios.iloc[i, j]) for j in range(system_condition_scenarios.shape[1])}
+rp_scenarios = scenario_library(scenario_arrays['rp'])
+
+# System condition scenarios
+sc_scenarios = scenario_library(scenario_arrays['ps_condition'])
 
 # Electricity price scenarios
-w_count = 1
-eprice_scenarios = {}
-for file in files_eprice:
-    data = pd.read_csv(os.path.join(path_eprice, file), sep=',', header=None)
-    data = dict(zip(T[:], data.iloc[:,1]))
-    eprice_scenarios[w_count] = data
-    w_count += 1
 # We don't want negative prices, so we set them to 0, if they exist
-for scenario in eprice_scenarios.values():
-    for t in scenario:
-        if scenario[t] < 0:
-            scenario[t] = 0
+eprice_scenarios = scenario_library(scenario_arrays['eprice'], lower=0.0)
 
 rp_keys = list(rp_scenarios.keys())
 sc_keys = list(sc_scenarios.keys())
 eprice_keys = list(eprice_scenarios.keys())
-combinations = itertools.product(rp_keys, sc_keys, eprice_keys)
 
-# List of all combinations
-all_combinations = list(itertools.product(rp_keys, sc_keys, eprice_keys))
+class ScenarioIndexSpace(Sequence):
+    """
+    All the (rp, sc, eprice) combinations, in the order of itertools.product(rp_keys, sc_keys, eprice_keys),
+    without materializing them. Index i maps arithmetically to its combination, so sampling is done on
+    integers and scenarios are only built for the indices that are requested.
+    """
+
+    def __init__(self, rp_keys, sc_keys, eprice_keys):
+        self.rp_keys = rp_keys
+        self.sc_keys = sc_keys
+        self.eprice_keys = eprice_keys
+
+    def __len__(self):
+        return len(self.rp_keys) * len(self.sc_keys) * len(self.eprice_keys)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("Combination index out of range")
+        index %= len(self)
+        rp_sc_index, eprice_index = divmod(index, len(self.eprice_keys))
+        rp_index, sc_index = divmod(rp_sc_index, len(self.sc_keys))
+        return self.rp_keys[rp_index], self.sc_keys[sc_index], self.eprice_keys[eprice_index]
+
+    def sample(self, k):
+        # Draws k distinct indices with the module random generator. Same draws as random.sample on the materialized list
+        return random.sample(range(len(self)), k)
+
+    def complement(self, indices):
+        # Sorted indices that are not in indices, using a boolean mask over the whole space
+        mask = np.ones(len(self), dtype=bool)
+        mask[np.asarray(indices, dtype=np.int64)] = False
+        return np.flatnonzero(mask)
+
+    def scenario(self, index):
+        rp_index, sc_index, eprice_index = self[index]
+        return {
+            'rp': rp_scenarios[rp_index],
+            'sc': sc_scenarios[sc_index],
+            'eprice': eprice_scenarios[eprice_index]
+        }
+
+    def materialize(self, indices):
+        # Scenario dict {1..len(indices)} for the given combination indices
+        return {i+1: self.scenario(int(index)) for i, index in enumerate(indices)}
+
+    def view(self, indices):
+        # Same as materialize, but each scenario is only built when it is accessed
+        return ScenarioView(self, indices)
+
+class ScenarioView(Mapping):
+    # Read-only scenario dict {1..len(indices)} built on access
+    def __init__(self, space, indices):
+        self.space = space
+        self.indices = indices
+
+    def __getitem__(self, w):
+        if not 1 <= w <= len(self.indices):
+            raise KeyError(w)
+        return self.space.scenario(int(self.indices[w-1]))
+
+    def __iter__(self):
+        return iter(range(1, len(self.indices)+1))
+
+    def __len__(self):
+        return len(self.indices)
+
+# All the combinations, indexed lazily
+all_combinations = ScenarioIndexSpace(rp_keys, sc_keys, eprice_keys)
 
 # Randomly sample num_samples combinations from all_combinations
-sampled_combinations = random.sample(all_combinations, num_samples)
+sampled_indices = all_combinations.sample(num_samples)
+sampled_combinations = [all_combinations[index] for index in sampled_indices]
 
 # Randomly sample combinations for cross-validation
-cv_combinations = random.sample(all_combinations, cv_nsamples)
+cv_indices = all_combinations.sample(cv_nsamples)
+cv_combinations = [all_combinations[index] for index in cv_indices]
 
 # Obtain a random set of num_samples scenarios
-scenarios = {i+1: {
-    'rp': rp_scenarios[rp_index],
-    'sc': sc_scenarios[sc_index],
-    'eprice': eprice_scenarios[eprice_index]
-} for i, (rp_index, sc_index, eprice_index) in enumerate(sampled_combinations)}
+scenarios = all_combinations.materialize(sampled_indices)
 
 # Obtain all the scenarios used for the cross validation analysis
-cv_scenarios = {i+1: {
-    'rp': rp_scenarios[rp_index],
-    'sc': sc_scenarios[sc_index],
-    'eprice': eprice_scenarios[eprice_index]
-} for i, (rp_index, sc_index, eprice_index) in enumerate(cv_combinations)}
+cv_scenarios = all_combinations.materialize(cv_indices)
 
 prob_scenario = 1/len(scenarios)  # Probability of each scenario
 
-# Ex-post analysis scenarios
-expost_combinations = [index for index in all_combinations if index not in sampled_combinations]
+# Ex-post analysis scenarios: every combination that is not in the sample
+expost_indices = all_combinations.complement(sampled_indices)
 
-# Create a dictionary with the scenarios for the ex-post analysis
-expost_scenarios = {i+1: {
-    'rp': rp_scenarios[rp_index],
-    'sc': sc_scenarios[sc_index],
-    'eprice': eprice_scenarios[eprice_index]
-} for i, (rp_index, sc_index, eprice_index) in enumerate(expost_combinations)}
+# Scenarios for the ex-post analysis, built when they are accessed
+expost_scenarios = all_combinations.view(expost_indices)
 
 W_expost = list(expost_scenarios.keys())
 
@@ -0,0 +1,45 @@
+import sys
+import time
+import numpy as np
+
+from .input_data import *
+from .benders import BendersBiddingModel
+from .model_risk_averse import RiskAverseExPostAnalysis
+
+# Compares the Benders decomposition against the extensive form of the same problem
+# Usage: python -m first_task.main_benders [one_price|two_price] [beta]
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        raise ValueError("Usage: python -m first_task.main_benders [one_price|two_price] [beta]")
+
+    model_type = sys.argv[1].lower()
+    beta = float(sys.argv[2]) if len(sys.argv) == 3 else 0
+    alpha = 0.90
+
+    input_data = InputData(T=T, W=W, scenario=scenarios, prob_scenario=prob_scenario, model_type=model_type)
+
+    # Benders decomposition
+    benders = BendersBiddingModel(input_data, beta=beta, alpha=alpha)
+    benders.run()
+
+    # Extensive form
+    start_time = time.time()
+    extensive = RiskAverseExPostAnalysis(input_data=input_data, beta=beta, alpha=alpha, verbose=False)
+    extensive.run()
+    extensive_time = time.time() - start_time
+
+    bids_benders = np.array([benders.results.production[t] for t in T])
+    bids_extensive = np.array([extensive.results.production[t] for t in T])
+
+    print()
+    print('-' * 50)
+    print(f'{"BENDERS VS EXTENSIVE FORM":^50}')
+    print('-' * 50)
+    print(f"{'':<25}{'Benders':>12}{'Extensive':>12}")
+    print(f"{'Objective':<25}{benders.results.objective:>12.2f}{extensive.model.ObjVal:>12.2f}")
+    print(f"{'Expected profit':<25}{benders.results.total_expected_profit:>12.2f}{extensive.results.total_expected_profit:>12.2f}")
+    print(f"{'CVaR':<25}{benders.results.cvar:>12.2f}{extensive.results.cvar:>12.2f}")
+    print(f"{'Time [s]':<25}{benders.results.runtime:>12.2f}{extensive_time:>12.2f}")
+    print(f"Benders iterations: {benders.results.iterations}")
+    print(f"Maximum bid difference: {np.abs(bids_benders - bids_extensive).max():.4f} MW")
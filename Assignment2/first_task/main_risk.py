@@ -3,6 +3,9 @@ import sys
 import numpy as np
 from .input_data import *
 from .model_risk_averse import RiskAverseExPostAnalysis
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from result_cache import ResultCache
 import time
 
 import matplotlib as mpl
@@ -10,6 +13,23 @@ mpl.rcParams.update(mpl.rcParamsDefault)
 plt.rcParams['font.family'] = 'serif' 
 
 
+def frontier_steps(frontier):
+    # The optimum only changes at the betas where the objectives of two consecutive frontier solutions
+    # intersect, so the expected profit is a step function of beta that switches at these betas
+    betas, profits = [frontier[0]['beta']], [frontier[0]['expected_profit']]
+    for point_a, point_b in zip(frontier[:-1], frontier[1:]):
+        diff_profit = point_a['expected_profit'] - point_b['expected_profit']
+        diff_cvar = point_a['cvar'] - point_b['cvar']
+        if diff_profit == diff_cvar:
+            continue
+        beta_switch = min(max(diff_profit / (diff_profit - diff_cvar), point_a['beta']), point_b['beta'])
+        betas.append(beta_switch)
+        profits.append(point_b['expected_profit'])
+    betas.append(frontier[-1]['beta'])
+    profits.append(frontier[-1]['expected_profit'])
+    return betas, profits
+
+
 if __name__ == "__main__":
     start_time = time.time() # Start timer
     if len(sys.argv) != 2:
@@ -21,44 +41,32 @@ if __name__ == "__main__":
     input_data = InputData(T=T, W=W, scenario=scenarios, prob_scenario=prob_scenario, model_type=model_type)
     
     # 2. Run ExPostAnalysis for different beta values
-    # beta_values = np.array([0, 0.2, 0.4, 0.5, 0.6, 0.7, 0.8, 0.83, 0.85, 0.9, 0.93, 0.95, 0.98, 1])
-    beta_values = np.linspace(0, 1, 101)  
-    results = []
-    
-    for beta in beta_values:
-        print(f"\nRunning model with beta = {beta:.2f}")
-        
+    # The efficient frontier is traced adaptively (beta is only split where the frontier has kinks)
+    # instead of solving a fixed grid of betas. The profit distributions are only plotted for these betas
+    histogram_betas = [0, 0.5, 1]
+
+    # Frontiers solved in a previous run with the same data and code are loaded from the cache
+    cache = ResultCache()
+
+    def solve_frontiers():
+        # A single model is kept alive and only its objective weights change between betas,
+        # so every solve is warm-started from the previous basis
         model = RiskAverseExPostAnalysis(
             input_data=input_data,
-            beta=beta,
+            beta=histogram_betas[0],
             alpha=0.90,   # CVaR confidence level (as per task)
             verbose=False # Disable detailed logging for batch runs
         )
-        model.run()
-        
-        profit_per_scenario = [model.results.profit_per_scenario[w].getValue()for w in model.data.W]
-        power_bidded = [model.results.production[t] for t in model.data.T]
-        
-        # Store results
-        results.append({
-            'beta': beta,
-            'expected_profit': model.results.total_expected_profit,
-            'cvar': model.results.cvar,
-            'profit_per_scenario': profit_per_scenario,
-            'power_bidded': power_bidded,
-            'total_expected_profit': model.results.total_expected_profit,
-        })
+        frontier = model.trace_frontier()
+        results = model.solve_frontier(histogram_betas)
+        return results, frontier
+
+    results, frontier = cache.memoize('risk_frontiers', solve_frontiers, input_data, histogram_betas, 0.90)
+    print(f"\nEfficient frontier: {len(frontier)} solves")
     
     # 3. Plot Expected Profit vs. CVaR
     plt.figure(figsize=(5, 4))
-    plt.plot([res['cvar'] for res in results], [res['expected_profit'] for res in results], '-', markersize=6)
-
-    indices_to_label = [0, len(beta_values)//2, len(beta_values)-1]
-    for i in indices_to_label:
-        x = results[i]['cvar']
-        y = results[i]['expected_profit']
-        beta = beta_values[i]
-        # plt.text(x, y, f"$\\beta = {beta:.2f}$", fontsize=9, ha='left', va='bottom', alpha=0.8)
+    plt.plot([res['cvar'] for res in frontier], [res['expected_profit'] for res in frontier], '-', markersize=6)
 
     plt.xlabel('Conditional Value at Risk (CVaR)', fontsize=9)
     plt.ylabel('Expected Profit (€)', fontsize=9)
@@ -69,9 +77,14 @@ if __name__ == "__main__":
     plt.show()
 
     # 4. Plot Profit Volatility vs. Beta
+    # Expected profit as a step function of beta, with the betas solved by the traced frontier as markers
+    step_betas, step_profits = frontier_steps(frontier)
+    frontier_betas = [res['beta'] for res in frontier]
+    frontier_profits = [res['total_expected_profit'] for res in frontier]
 
     plt.figure(figsize=(8, 6))
-    plt.plot(beta_values, [res['total_expected_profit'] for res in results], '-')
+    plt.plot(step_betas, step_profits, '-', drawstyle='steps-post')
+    plt.plot(frontier_betas, frontier_profits, 'o', markersize=4)
     plt.xlabel('Risk Weight (Beta)')
     plt.ylabel('Total Expected Profit (€)')
     plt.grid(True)
@@ -80,18 +93,15 @@ if __name__ == "__main__":
     # 5. Plot Profit per Scenario vs Beta
     fig, ax = plt.subplots(1,2,figsize=(12, 3))
     colors = plt.get_cmap('tab10').colors  # 10 colores bien diferenciados
-    color_map = {0: colors[0], 0.8: colors[1], 1: colors[2]}
-    j = -1
-    for i, res in enumerate(results):
-        if res['beta'] == 0 or res['beta'] == 1 or res['beta'] == 0.5:
-            j += 1
-            ax[0].hist(res['profit_per_scenario'], label=f"$\\beta = {res['beta']:.2f}$",
-                    bins=30, alpha=0.3, color=colors[j], edgecolor='black')
+    for j, res in enumerate(results):
+        ax[0].hist(res['profit_per_scenario'], label=f"$\\beta = {res['beta']:.2f}$",
+                bins=30, alpha=0.3, color=colors[j], edgecolor='black')
     ax[0].legend()
     ax[0].grid()
     ax[0].set_xlabel('Profit per Scenario (€)')
     ax[0].set_ylabel('Frequency')
-    ax[1].plot(beta_values, [res['total_expected_profit'] for res in results], '-')
+    ax[1].plot(step_betas, step_profits, '-', drawstyle='steps-post')
+    ax[1].plot(frontier_betas, frontier_profits, 'o', markersize=4)
     ax[1].set_xlabel('Risk Weight (Beta)')
     ax[1].set_ylabel('Total Expected Profit (€)')
     ax[1].grid()
@@ -103,26 +113,33 @@ if __name__ == "__main__":
     
     beta = 0.5
     sample_sizes = [100, 200, 300, 400, 500]
-    bids_dict = {}
-
-    for n in sample_sizes:
-        sampled_combinations = random.sample(all_combinations, n)
-        scenarios = {i+1: {
-            'rp': rp_scenarios[rp_index],
-            'sc': sc_scenarios[sc_index],
-            'eprice': eprice_scenarios[eprice_index]
-        } for i, (rp_index, sc_index, eprice_index) in enumerate(sampled_combinations)}
-        
-        input_data = InputData(T, list(range(1, n+1)), scenarios, prob_scenario, model_type=model_type)
+
+    # Nested samples: every in-sample set extends the previous one, so the model is built once
+    # and only the scenarios of each increment are appended before the warm-started re-solve
+    indices = all_combinations.sample(max(sample_sizes))
+
+    def solve_sample_sizes():
+        scenarios = all_combinations.materialize(indices[:sample_sizes[0]])
+        input_data = InputData(T, list(scenarios), scenarios, 1/sample_sizes[0], model_type=model_type)
         model = RiskAverseExPostAnalysis(
             input_data=input_data,
             beta=beta,
             alpha=0.90,   # CVaR confidence level (as per task)
             verbose=False # Disable detailed logging for batch runs
         )
-        model.run() 
-        bids = [model.results.production[t] for t in model.data.T]       
-        bids_dict[n] = bids
+        bids_dict = {}
+        previous = sample_sizes[0]
+        for n in sample_sizes:
+            if n > previous:
+                model.add_scenarios([all_combinations.scenario(int(index)) for index in indices[previous:n]])
+                previous = n
+            model.run() 
+            bids = [model.results.production[t] for t in model.data.T]       
+            bids_dict[n] = bids
+        return bids_dict
+
+    bids_dict = cache.memoize('risk_sample_sizes', solve_sample_sizes, all_combinations.materialize(indices),
+                              model_type, sample_sizes, beta, 0.90)
 
     plt.figure(figsize=(10,6))
     colors = plt.get_cmap('tab10').colors 
@@ -143,6 +160,7 @@ if __name__ == "__main__":
     plt.legend()
     plt.grid(True)
     plt.show()
+    print(f"\nResult cache: {cache.hits} hits, {cache.misses} misses")
     end_time = time.time()  # End timer
     elapsed_time = end_time - start_time  # Calculate elapsed time
     print(f"\nTotal execution time: {elapsed_time:.2f} seconds")
\ No newline at end of file
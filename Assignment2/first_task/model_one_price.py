@@ -7,7 +7,12 @@ import numpy as np
 plt.rcParams['font.family'] = 'serif' 
 plt.rcParams['font.size'] = 14
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from .input_data import InputData
+from .results import save_scenario_results
 
 class Expando(object):
     '''
@@ -15,7 +20,7 @@ class Expando(object):
     '''
     pass
 
-class OnePriceBiddingModel():
+class OnePriceBiddingModel(TimedModel):
     
     def __init__(self, input_data: InputData, verbose: bool = True):
         if verbose:
@@ -50,6 +55,7 @@ class OnePriceBiddingModel():
     def build_constraints(self):
         # Create the constraints
 
+        self.start_family('production_upper_limit')
         # PRODUCTION UPPER LIMIT
         # The production upper limit is defined as the maximum capacity of the generator
         self.constraints.production_upper_limit = {
@@ -61,6 +67,7 @@ class OnePriceBiddingModel():
             for t in self.data.T
         }
 
+        self.start_family('imbalance')
         # IMABALANCE EQUALITY CONSTRAINT 
         # The imbalance is defined as the difference between the real production and the bidded production
         self.constraints.imbalance = {
@@ -77,9 +84,9 @@ class OnePriceBiddingModel():
         # Create the objective function
 
         # The objective function is defined as the profit from production and the profit from imbalance
-        self.objective = self.data.prob_scenario * gp.quicksum(self.data.scenario[w]['eprice'][t] * self.variables.production[t] +                                                                            # Profit from production
+        self.objective = gp.quicksum(self.data.probability[w] * (self.data.scenario[w]['eprice'][t] * self.variables.production[t] +                                                                       # Profit from production
                                                           self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w] * self.data.scenario[w]['sc'][t] +        # Profit from imbalance in case of system requiring upward balance
-                                                          self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w] * (1 - self.data.scenario[w]['sc'][t])    # Profit from imbalance in case of system requiring downward balance
+                                                          self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w] * (1 - self.data.scenario[w]['sc'][t]))   # Profit from imbalance in case of system requiring downward balance
                                                     for t in self.data.T
                                                     for w in self.data.W
                                                     ) 
@@ -94,69 +101,12 @@ class OnePriceBiddingModel():
         self.model = gp.Model(name="OnePriceBiddingModel")
         self.model.setParam('OutputFlag', 0)
         
-        if self.verbose:
-            print("\nBuilding variables")
-        self.build_variables()
-
-        if self.verbose:
-            print("\nBuilding constraints")
-        self.build_constraints()
-        
-        if self.verbose:
-            print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        if self.verbose:
-            print(f"Number of variables: {self.model.NumVars}")
-            print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components(self.verbose)
 
     def save_results(self):
-        # Saves the results of the model
-        self.results.production = {
-            t: self.variables.production[t].X
-            for t in self.data.T
-        }
-        self.results.imbalance = {
-            (t,w): self.variables.imbalance[t,w].X
-            for t in self.data.T
-            for w in self.data.W
-        }
-        self.results.expected_imbalance = {
-            t: self.data.prob_scenario * sum(self.variables.imbalance[t, w].X for w in self.data.W)
-            for t in self.data.T
-        }
+        # Saves the results of the model. The solution is read once and post-processed with array operations
+        save_scenario_results(self.results, self.model, self.variables, self.data)
         self.results.profit = self.model.ObjVal
-        self.results.profit_da = {
-            t: self.data.prob_scenario * sum(self.data.scenario[w]['eprice'][t] * self.variables.production[t].X for w in self.data.W)
-            for t in self.data.T
-        }
-        self.results.profit_imbalance = {
-            (t,w): self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * self.data.scenario[w]['sc'][t]  +
-                self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * (1 - self.data.scenario[w]['sc'][t])
-                for t in self.data.T
-                for w in self.data.W
-        }
-        self.results.expected_profit_imbalance = {
-            t: self.data.prob_scenario * (
-                sum(self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * self.data.scenario[w]['sc'][t] for w in self.data.W) +
-                sum(self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * (1 - self.data.scenario[w]['sc'][t]) for w in self.data.W)
-            )
-            for t in self.data.T
-        }
-
-        self.results.profit_per_scenario = {
-            w: gp.quicksum(self.data.scenario[w]['eprice'][t] * self.variables.production[t].X + self.results.profit_imbalance[t,w] for t in self.data.T)
-            for w in self.data.W
-        }
-
-        self.results.expected_real_prod = {
-            t: self.data.prob_scenario * gp.quicksum(self.data.scenario[w]['rp'][t] for w in self.data.W) * self.data.p_nom
-            for t in self.data.T
-        }
-
-        total_production = sum(value for value in self.results.production.values())
-        self.results.avg_bid = total_production / len(self.results.production)
 
     def print_results(self):
         print('-' * 30)
@@ -203,7 +153,7 @@ class OnePriceBiddingModel():
         expected_profit_imbalance_values = [self.results.expected_profit_imbalance[t] for t in self.data.T]
         profit_da_values = [self.results.profit_da[t] for t in self.data.T]
         total_profit = [expected_profit_imbalance_values[i] + profit_da_values[i] for i, _ in enumerate(profit_da_values)]
-        profit_per_scenario = [self.results.profit_per_scenario[w].getValue()for w in self.data.W]
+        profit_per_scenario = list(self.results.profit_per_scenario.values())
 
         # Plot configuration
         ax.plot(self.data.T, profit_da_values, label='Profit DA', color='blue', marker = 'x', linestyle = '--')
@@ -245,7 +195,7 @@ class OnePriceBiddingModel():
     def run(self):
         # Makes sure the model is solved and saves the results
         try:
-            self.model.optimize()
+            self.solve()
             self.model.write("first_task/output/verification/one_price_model.lp")
             if self.model.status == gp.GRB.INFEASIBLE:
                 print("Model is infeasible; computing IIS")
@@ -258,7 +208,7 @@ class OnePriceBiddingModel():
             elif self.model.status == gp.GRB.OPTIMAL:
                 if self.verbose:
                     print("Optimization was successful!")
-                self.save_results()   
+                self.extract()   
                 self.model.dispose()
             else:
                 raise TimeoutError("Gurobi optimization failed")       
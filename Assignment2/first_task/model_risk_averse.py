@@ -1,3 +1,4 @@
+import warnings
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import ShuffleSplit
@@ -6,12 +7,17 @@ import gurobipy as gp
 from gurobipy import GRB
 
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from .input_data import InputData
+from .results import save_scenario_results
 from .model_one_price import OnePriceBiddingModel
 from .model_two_price import TwoPriceBiddingModel
 
 
-class RiskAverseExPostAnalysis:
+class RiskAverseExPostAnalysis(TimedModel):
     def __init__(self, input_data: InputData, beta=int, alpha=int, verbose: bool = True):
         self.data = input_data
         self.verbose = verbose # Verbose flag for detailed logging
@@ -36,41 +42,53 @@ class RiskAverseExPostAnalysis:
             for t in self.data.T
         }
 
+        # Value at risk
+        self.variables.value_at_risk = self.model.addVar(lb = 0, name=f"ValueAtRisk")
+
+        # Scenario variables, one entry per scenario
+        self.variables.imbalance = {}
+        self.variables.auxiliary_cvar = {}
+        if self.model_type == 'two_price':
+            self.variables.up_imbalance = {}
+            self.variables.down_imbalance = {}
+        self.build_scenario_variables(self.data.W)
+
+    def build_scenario_variables(self, scenarios):
+        # Create the variables of the given scenarios
+
         # Imbalance of the generator
-        self.variables.imbalance = {
+        self.variables.imbalance.update({
             (t,w): self.model.addVar(lb=-self.data.p_nom, ub=self.data.p_nom, name=f"Imbalance_hour{t}_scenario{w}")
-            for w in self.data.W
+            for w in scenarios
             for t in self.data.T
-        }
-
-        # Value at risk
-        self.variables.value_at_risk = self.model.addVar(lb = 0, name=f"ValueAtRisk")
+        })
 
         # Auxiliary CVaR variable
-        self.variables.auxiliary_cvar = {
+        self.variables.auxiliary_cvar.update({
             w: self.model.addVar(lb = 0, name=f"AuxiliaryCVaR_{w}")
-            for w in self.data.W
-        }
+            for w in scenarios
+        })
 
         if self.model_type == 'two_price':
             # Upward imbalance
-            self.variables.up_imbalance = {
+            self.variables.up_imbalance.update({
                 (t,w): self.model.addVar(lb=0, ub=self.data.p_nom, name=f"UpImbalance_hour{t}_scenario{w}")
-                for w in self.data.W
+                for w in scenarios
                 for t in self.data.T
-            }
+            })
 
             # Downward imbalance
-            self.variables.down_imbalance = {
+            self.variables.down_imbalance.update({
                 (t,w): self.model.addVar(lb=0, ub=self.data.p_nom, name=f"DownImbalance_hour{t}_scenario{w}")
-                for w in self.data.W
+                for w in scenarios
                 for t in self.data.T
-            }
+            })
     
     
     def build_constraints(self):
         # Create the constraints
 
+        self.start_family('production_upper_limit')
         # PRODUCTION UPPER LIMIT
         # The production upper limit is defined as the maximum capacity of the generator
         self.constraints.production_upper_limit = {
@@ -82,97 +100,221 @@ class RiskAverseExPostAnalysis:
             for t in self.data.T
         }
 
+        # Scenario constraints, one entry per scenario
+        self.constraints.imbalance = {}
+        self.constraints.auxiliary_cvar = {}
+        if self.model_type == 'two_price':
+            self.constraints.imbalance_definition = {}
+        self.build_scenario_constraints(self.data.W)
+
+    def scenario_profit(self, w):
+        # Profit of scenario w as a linear expression of the variables
+        if self.model_type == 'one_price':
+            return gp.quicksum(
+                self.data.scenario[w]['eprice'][t] * self.variables.production[t] +                     # Profit from production
+                self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] *
+                    self.variables.imbalance[t, w] * self.data.scenario[w]['sc'][t] +                   # Profit from imbalance in case of system requiring upward balance
+                self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] *
+                    self.variables.imbalance[t, w] * (1 - self.data.scenario[w]['sc'][t])               # Profit from imbalance in case of system requiring downward balance
+                for t in self.data.T
+            )
+        elif self.model_type == 'two_price':
+            return gp.quicksum(
+                self.data.scenario[w]['eprice'][t] * self.variables.production[t]                       # Profit from production
+                + self.data.scenario[w]['sc'][t] * (
+                    self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t, w]
+                    - self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t, w]
+                )                                                                                       # Profit from imbalance in case of system requiring upward balance
+                + (1 - self.data.scenario[w]['sc'][t]) * (
+                    self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t, w]
+                    - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t, w]
+                )                                                                                       # Profit from imbalance in case of system requiring downward balance
+                for t in self.data.T
+            )
+
+    def build_scenario_constraints(self, scenarios):
+        # Create the constraints of the given scenarios
+
+        self.start_family('imbalance')
         # IMABALANCE EQUALITY CONSTRAINT 
         # The imbalance is defined as the difference between the real production and the bidded production
-        self.constraints.imbalance = {
+        self.constraints.imbalance.update({
             (t,w): self.model.addConstr(self.variables.imbalance[t,w],
                 GRB.EQUAL,
                 self.data.scenario[w]['rp'][t] * self.data.p_nom - self.variables.production[t],
                 name=f"ImbalanceDefinition_{t}_{w}"
             )
             for t in self.data.T
-            for w in self.data.W
-        }
+            for w in scenarios
+        })
 
+        self.start_family('auxiliary_cvar')
         # CVaR CONSTRAINTS
-        if self.model_type == 'one_price':
-            self.constraints.auxiliary_cvar = {
-                w: self.model.addConstr(
-                    self.variables.value_at_risk 
-                    - sum(                                                                              # <-- Start profit calculation
-                        self.data.scenario[w]['eprice'][t] * self.variables.production[t] +
-                        self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] *
-                            self.variables.imbalance[t, w] * self.data.scenario[w]['sc'][t] +
-                        self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] *
-                            self.variables.imbalance[t, w] * (1 - self.data.scenario[w]['sc'][t])      
-                        for t in self.data.T
-                    ),                                                                                  # <-- End profit calculation
-                    GRB.LESS_EQUAL,
-                    self.variables.auxiliary_cvar[w],
-
-                    name=f"AuxiliaryCVaR_{w}"
-                )
-                for w in self.data.W
-            }
-
-        elif self.model_type == 'two_price':
-            self.constraints.auxiliary_cvar = {
-                w: self.model.addConstr(
-                    self.variables.value_at_risk -
-                    sum(                                                                                                                        # <-- Start profit calculation
-                        self.data.scenario[w]['eprice'][t] * self.variables.production[t]
-                        + self.data.scenario[w]['sc'][t] * (
-                            self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t, w]
-                            - self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t, w]
-                        )
-                        + (1 - self.data.scenario[w]['sc'][t]) * (
-                            self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t, w]
-                            - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t, w]
-                        )
-                        for t in self.data.T
-                    ),                                                                                                                          # <-- End profit calculation
-                    GRB.LESS_EQUAL,
-                    self.variables.auxiliary_cvar[w],
-                    name=f"AuxiliaryCVaR_{w}"
-                )
-                for w in self.data.W
-            }
+        self.constraints.auxiliary_cvar.update({
+            w: self.model.addConstr(
+                self.variables.value_at_risk - self.scenario_profit(w),
+                GRB.LESS_EQUAL,
+                self.variables.auxiliary_cvar[w],
+                name=f"AuxiliaryCVaR_{w}"
+            )
+            for w in scenarios
+        })
 
+        if self.model_type == 'two_price':
+            self.start_family('imbalance_definition')
             # The imabalance is defined as the difference between the up and down imbalance
-            self.constraints.imbalance_definition = {
+            self.constraints.imbalance_definition.update({
                 (t,w): self.model.addConstr(self.variables.imbalance[t,w],
                     GRB.EQUAL, 
                     self.variables.up_imbalance[t,w] - self.variables.down_imbalance[t,w],
                     name=f"ImbalanceDefinition_Hour{t}_Scenario{w}"
                 )
                 for t in self.data.T
-                for w in self.data.W
-            }
+                for w in scenarios
+            })
         
     def build_objective_function(self):
         # Create the objective function
 
         # The objective function is defined as the profit from production and the profit from imbalance plus the CVaR
-        if self.model_type == 'one_price':
-            self.objective_profit = self.data.prob_scenario * gp.quicksum(self.data.scenario[w]['eprice'][t] * self.variables.production[t] + # Profit from production
-                                                            self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w] * self.data.scenario[w]['sc'][t] +        # Profit from imbalance in case of system requiring upward balance
-                                                            self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w] * (1 - self.data.scenario[w]['sc'][t])    # Profit from imbalance in case of system requiring downward balance
-                                                        for t in self.data.T
-                                                        for w in self.data.W
-                                                        ) 
-        elif self.model_type == 'two_price':
-            self.objective_profit = self.data.prob_scenario * gp.quicksum(self.data.scenario[w]['eprice'][t] * self.variables.production[t]                                                                     # Profit from production
-                                                + self.data.scenario[w]['sc'][t] * (self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w] 
-                                                                                    - self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w])           # Profit from imbalance in case of system requiring upward balance
-                                                + (1 - self.data.scenario[w]['sc'][t]) * (self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w] 
-                                                                                    - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w])                                                  # Profit from imbalance in case of system requiring downward balance
-                                            for t in self.data.T
-                                            for w in self.data.W
-                                            ) 
-        self.objective_cvar = self.variables.value_at_risk - 1/(1-self.alpha) * sum(self.data.prob_scenario * self.variables.auxiliary_cvar[w] for w in self.data.W)
+        self.objective_profit = gp.quicksum(self.data.probability[w] * self.scenario_profit(w) for w in self.data.W)
+        self.objective_cvar = self.variables.value_at_risk - 1/(1-self.alpha) * sum(self.data.probability[w] * self.variables.auxiliary_cvar[w] for w in self.data.W)
         # The objective is to maximize profit
+        self.set_beta(self.beta)
+
+    def add_scenarios(self, new_scenarios):
+        """
+        Extends the model in place with new equiprobable scenarios, as in nested sample average approximation
+        where every sample contains the previous one. The existing scenario probabilities are rescaled to
+        n_old / n_total, the variables and constraints of the new scenarios are appended and the next solve
+        is warm-started from the current basis.
+
+        Args:
+            new_scenarios (list): Scenarios (dicts with 'rp', 'eprice' and 'sc') to add.
+
+        Returns:
+            list: Keys of the new scenarios in self.data.W.
+        """
+        n_old = len(self.data.W)
+        n_total = n_old + len(new_scenarios)
+        first = max(self.data.W) + 1
+        new_W = list(range(first, first + len(new_scenarios)))
+
+        # The scenario dict is copied, so the dict passed to InputData is not modified
+        self.data.scenario = {**self.data.scenario, **dict(zip(new_W, new_scenarios))}
+        self.data.W = list(self.data.W) + new_W
+        scale = n_old / n_total
+        self.data.probability = {
+            **{w: p * scale for w, p in self.data.probability.items()},
+            **{w: 1 / n_total for w in new_W},
+        }
+        self.data.prob_scenario = dict(self.data.probability) if isinstance(self.data.prob_scenario, dict) else 1 / n_total
+        self.data._scenario_arrays = None
+
+        self.build_scenario_variables(new_W)
+        self.build_scenario_constraints(new_W)
+
+        # Rescale the probability coefficients of the old scenarios and add the new ones
+        self.objective_profit = scale * self.objective_profit + gp.quicksum(self.data.probability[w] * self.scenario_profit(w) for w in new_W)
+        self.objective_cvar = self.variables.value_at_risk - 1/(1-self.alpha) * sum(self.data.probability[w] * self.variables.auxiliary_cvar[w] for w in self.data.W)
+        self.set_beta(self.beta)
+        self.model.update()
+        return new_W
+
+    def set_beta(self, beta):
+        # Updates the risk weight in the objective. Variables and constraints are kept, so the next solve starts from the current basis
+        self.beta = beta
         self.model.setObjective((1 - self.beta) * self.objective_profit + self.beta * self.objective_cvar, GRB.MAXIMIZE)
 
+    def solve_beta(self, beta):
+        """
+        Re-solves the model for a new risk weight, warm-started from the previous basis.
+
+        Returns:
+            dict: Frontier point with the expected profit, CVaR, objective, bids and profit per scenario.
+        """
+        self.set_beta(beta)
+        # Only the objective changes, so the previous basis stays primal feasible. The method of
+        # the other solves (run) is restored afterwards
+        method = self.model.Params.Method
+        self.model.setParam('Method', 0)
+        try:
+            self.solve()
+        finally:
+            self.model.setParam('Method', method)
+        if self.model.status != GRB.OPTIMAL:
+            raise RuntimeError(f"Optimization with beta = {beta} was not successful (status {self.model.status})")
+        self.extract()
+        return {
+            'beta': beta,
+            'expected_profit': self.results.total_expected_profit,
+            'cvar': self.results.cvar,
+            'objective': self.model.ObjVal,
+            'iterations': self.model.IterCount,
+            'profit_per_scenario': list(self.results.profit_per_scenario.values()),
+            'power_bidded': [self.results.production[t] for t in self.data.T],
+            'total_expected_profit': self.results.total_expected_profit,
+        }
+
+    def solve_frontier(self, beta_values):
+        # Solves the model for every beta in beta_values, reusing the same Gurobi model
+        return [self.solve_beta(beta) for beta in beta_values]
+
+    def trace_frontier(self, beta_low=0.0, beta_high=1.0, tolerance=1e-6, beta_tolerance=1e-4, gap_tolerance=1e-4,
+                       max_solves=200):
+        """
+        Traces the (CVaR, expected profit) efficient frontier adaptively.
+
+        The LP optimum only changes at the betas where the frontier has a kink. For two solutions A
+        and B at betas a < b the next beta is the one where both give the same objective. If the
+        solution there improves that objective by at most gap_tolerance, the vertices between A and
+        B are (nearly) collinear, the segment is kept as an edge of the frontier and it is not split
+        further. Otherwise a new vertex was found and both halves are explored.
+
+        Args:
+            beta_low (float): Lowest risk weight.
+            beta_high (float): Highest risk weight.
+            tolerance (float): Relative tolerance to consider two objective values equal.
+            beta_tolerance (float): Intervals of beta narrower than this are not split.
+            gap_tolerance (float): Largest relative distance between the traced frontier and the exact
+                one. 0 traces every vertex.
+            max_solves (int): Maximum number of solves. A warning is issued if the frontier is not
+                complete when it is reached.
+
+        Returns:
+            list: Frontier points (see solve_beta) sorted by beta.
+        """
+        # At beta = 0 (1) the CVaR (expected profit) is not part of the objective and can take any value
+        # among the tied optima, so the extremes are evaluated slightly inside the interval
+        beta_low = max(beta_low, beta_tolerance)
+        beta_high = min(beta_high, 1 - beta_tolerance)
+        points = {beta_low: self.solve_beta(beta_low), beta_high: self.solve_beta(beta_high)}
+        intervals = [(beta_low, beta_high)]
+        while intervals and len(points) < max_solves:
+            a, b = intervals.pop()
+            point_a, point_b = points[a], points[b]
+            diff_profit = point_a['expected_profit'] - point_b['expected_profit']
+            diff_cvar = point_a['cvar'] - point_b['cvar']
+            scale = max(1, abs(point_a['objective']), abs(point_b['objective']))
+            if (abs(diff_profit) <= tolerance * scale and abs(diff_cvar) <= tolerance * scale) or b - a <= beta_tolerance:
+                continue
+
+            # Beta at which the objectives of both solutions intersect
+            beta_mid = diff_profit / (diff_profit - diff_cvar) if diff_profit != diff_cvar else (a + b) / 2
+            if not a < beta_mid < b:
+                beta_mid = (a + b) / 2
+
+            point_mid = self.solve_beta(beta_mid)
+            points[beta_mid] = point_mid
+            value_a = (1 - beta_mid) * point_a['expected_profit'] + beta_mid * point_a['cvar']
+            if point_mid['objective'] > value_a + max(tolerance, gap_tolerance) * scale:
+                intervals += [(a, beta_mid), (beta_mid, b)]
+
+        if intervals:
+            warnings.warn(f"trace_frontier reached max_solves = {max_solves} with {len(intervals)} segments of the "
+                          "frontier left to refine", RuntimeWarning)
+        return [points[beta] for beta in sorted(points)]
+
     def build_model(self):
         # Creates the model and calls the functions to build the variables, constraints, and objective function
         if self.verbose:
@@ -181,91 +323,15 @@ class RiskAverseExPostAnalysis:
         self.model = gp.Model(name="RiskAverseAnalysis")
         self.model.setParam('OutputFlag', 1 if self.verbose else 0)
         
-        if self.verbose:
-            print("\nBuilding variables")
-        self.build_variables()  
-
-        if self.verbose:
-            print("\nBuilding constraints")
-        self.build_constraints()
-        
-        if self.verbose:
-            print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        if self.verbose:
-            print(f"Number of variables: {self.model.NumVars}")
-            print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components(self.verbose)
 
     def save_results(self):
-        # Saves the results of the model
-        self.results.production = {
-            t: self.variables.production[t].X
-            for t in self.data.T
-        }
-        self.results.imbalance = {
-            (t,w): self.variables.imbalance[t,w].X
-            for t in self.data.T
-            for w in self.data.W
-        }
-        self.results.expected_imbalance = {
-            t: self.data.prob_scenario * sum(self.variables.imbalance[t, w].X for w in self.data.W)
-            for t in self.data.T
-        }
-        self.results.profit_da = {
-            t: self.data.prob_scenario * sum(self.data.scenario[w]['eprice'][t] * self.variables.production[t].X for w in self.data.W)
-            for t in self.data.T
-        }
-
-        if self.data.model_type == 'one_price': 
-            self.results.profit_imbalance = {
-                (t,w): self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * self.data.scenario[w]['sc'][t]  +
-                    self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * (1 - self.data.scenario[w]['sc'][t])
-                    for t in self.data.T
-                    for w in self.data.W
-            }
-            self.results.expected_profit_imbalance = {
-                t: self.data.prob_scenario * (sum(self.results.profit_imbalance[t,w] for w in self.data.W))
-                for t in self.data.T    
-            }
-
-        elif self.data.model_type == 'two_price':
-            self.results.profit_imbalance = {
-                (t,w): self.data.scenario[w]['sc'][t] * (self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w].X 
-                        - self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w].X)                                         # Profit from imbalance in case of system requiring upward balance
-                        + (1 - self.data.scenario[w]['sc'][t]) * (self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w].X 
-                        - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w].X)                                                                                # Profit from imbalance in case of system requiring downward balance
-                    for t in self.data.T
-                    for w in self.data.W
-            }
-            self.results.expected_profit_imbalance = {
-                t: self.data.prob_scenario * (sum(self.results.profit_imbalance[t,w] for w in self.data.W))
-                for t in self.data.T
-            }
-
-        self.results.expected_profit = {
-            t: self.results.profit_da[t] + self.results.expected_profit_imbalance[t]
-            for t in self.data.T
-        }
-        self.results.total_expected_profit = sum(self.results.expected_profit.values())
-
-        self.results.profit_per_scenario = {
-            w: gp.quicksum(self.data.scenario[w]['eprice'][t] * self.variables.production[t].X + self.results.profit_imbalance[t,w] for t in self.data.T)
-            for w in self.data.W
-        }
-
-        self.results.expected_real_prod = {
-            t: self.data.prob_scenario * gp.quicksum(self.data.scenario[w]['rp'][t] for w in self.data.W) * self.data.p_nom
-            for t in self.data.T
-        }
-
-        total_production = sum(value for value in self.results.production.values())
-        self.results.avg_bid = total_production / len(self.results.production)
+        # Saves the results of the model. The solution is read once and post-processed with array operations
+        save_scenario_results(self.results, self.model, self.variables, self.data)
 
         # Save CVaR results
-        self.results.cvar = self.variables.value_at_risk.X - 1/(1-self.alpha) * sum(self.data.prob_scenario * self.variables.auxiliary_cvar[w].X for w in self.data.W)
-
+        auxiliary_cvar = np.array(self.model.getAttr('X', [self.variables.auxiliary_cvar[w] for w in self.data.W]))
+        self.results.cvar = self.variables.value_at_risk.X - 1/(1-self.alpha) * (self.data.scenario_arrays()['prob'] @ auxiliary_cvar)
 
     def print_results(self):
         print('-' * 30)
@@ -312,7 +378,7 @@ class RiskAverseExPostAnalysis:
         expected_profit_imbalance_values = [self.results.expected_profit_imbalance[t] for t in self.data.T]
         profit_da_values = [self.results.profit_da[t] for t in self.data.T]
         total_profit = [expected_profit_imbalance_values[i] + profit_da_values[i] for i, _ in enumerate(profit_da_values)]
-        profit_per_scenario = [self.results.profit_per_scenario[w].getValue()for w in self.data.W]
+        profit_per_scenario = list(self.results.profit_per_scenario.values())
 
         # Plot configuration
         ax.plot(self.data.T, profit_da_values, label='Profit from DA', color='blue', marker = 'x', linestyle = '--')
@@ -349,7 +415,7 @@ class RiskAverseExPostAnalysis:
         # Makes sure the model is solved and saves the results
         try:
             # self.model.setParam(gp.GRB.Param.DualReductions, 0)
-            self.model.optimize()
+            self.solve()
             print(f"Model status code: {self.model.status}")
 
             self.model.write("first_task/output/verification/risk_analysis/model.lp")
@@ -365,7 +431,7 @@ class RiskAverseExPostAnalysis:
             elif self.model.status == gp.GRB.OPTIMAL:
                 if self.verbose:
                     print("Optimization was successful!")
-                self.save_results()     
+                self.extract()     
             else:
                 raise TimeoutError("Gurobi optimization failed")       
         except gp.GurobiError as e:
@@ -3,7 +3,12 @@ from gurobipy import GRB
 import matplotlib.pyplot as plt
 import numpy as np
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from .input_data import InputData
+from .results import save_scenario_results
 
 class Expando(object):
     '''
@@ -11,7 +16,7 @@ class Expando(object):
     '''
     pass
 
-class TwoPriceBiddingModel():
+class TwoPriceBiddingModel(TimedModel):
     
     def __init__(self, input_data: InputData, verbose: bool = True):
         if verbose:
@@ -56,6 +61,7 @@ class TwoPriceBiddingModel():
     def build_constraints(self):
         # Create the constraints
 
+        self.start_family('production_upper_limit')
         # PRODUCTION UPPER LIMIT
         # The production upper limit is defined as the maximum capacity of the generator
         self.constraints.production_upper_limit = {
@@ -67,6 +73,7 @@ class TwoPriceBiddingModel():
             for t in self.data.T
         }
 
+        self.start_family('imbalance')
         # IMABALANCE EQUALITY CONSTRAINTS
         # The imbalance is defined as the difference between the real production and the bidded production
         self.constraints.imbalance = {
@@ -78,6 +85,7 @@ class TwoPriceBiddingModel():
             for t in self.data.T
             for w in self.data.W
         }
+        self.start_family('imbalance_up_down')
         # The imabalance is defined as the difference between the up and down imbalance
         self.constraints.imbalance_up_down = {
             (t,w): self.model.addConstr(self.variables.imbalance[t,w],
@@ -94,11 +102,11 @@ class TwoPriceBiddingModel():
         # Create the objective function
 
         # The objective function is defined as the profit from production and the profit from imbalance
-        self.objective = self.data.prob_scenario * sum(self.data.scenario[w]['eprice'][t] * self.variables.production[t] # Profit from production
+        self.objective = sum(self.data.probability[w] * (self.data.scenario[w]['eprice'][t] * self.variables.production[t] # Profit from production
                                                         + self.data.scenario[w]['sc'][t] * (self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w] 
                                                                                             - self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w]) # Profit from imbalance in case of system requiring upward balance
                                                         + (1 - self.data.scenario[w]['sc'][t]) * (self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w] 
-                                                                                            - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w])    # Profit from imbalance in case of system requiring downward balance
+                                                                                            - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w]))   # Profit from imbalance in case of system requiring downward balance
                                                     for t in self.data.T
                                                     for w in self.data.W
                                                     ) 
@@ -113,87 +121,13 @@ class TwoPriceBiddingModel():
         self.model = gp.Model(name="OnePriceBiddingModel")
         self.model.setParam('OutputFlag', 0)
         
-        if self.verbose:
-            print("\nBuilding variables")
-        self.build_variables()
-
-        if self.verbose:
-            print("\nBuilding constraints")
-        self.build_constraints()
-        
-        if self.verbose:
-            print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        if self.verbose:
-            print(f"Number of variables: {self.model.NumVars}")
-            print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components(self.verbose)
 
     def save_results(self):
-        # Saves the results of the model
-        self.results.production = {
-            t: self.variables.production[t].X
-            for t in self.data.T
-        }
-        self.results.imbalance = {
-            (t,w): self.variables.imbalance[t,w].X
-            for t in self.data.T
-            for w in self.data.W
-        }
-        self.results.up_imbalance = {
-            (t,w): self.variables.up_imbalance[t,w].X
-            for t in self.data.T
-            for w in self.data.W
-        }
-        self.results.down_imbalance = {
-            (t,w): self.variables.down_imbalance[t,w].X
-            for t in self.data.T
-            for w in self.data.W
-        }
-
-        self.results.expected_imbalance = {
-            t: self.data.prob_scenario * sum(self.variables.imbalance[t, w].X for w in self.data.W)
-            for t in self.data.T
-        }
-
+        # Saves the results of the model. The solution is read once and post-processed with array operations
+        save_scenario_results(self.results, self.model, self.variables, self.data)
         self.results.profit = self.model.ObjVal
 
-        self.results.profit_da = {
-            t: self.data.prob_scenario * sum(self.data.scenario[w]['eprice'][t] * self.variables.production[t].X for w in self.data.W)
-            for t in self.data.T
-        }
-
-        self.results.profit_imbalance = {
-            (t,w): self.data.scenario[w]['sc'][t] * (self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w].X 
-                    - self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w].X)                                         # Profit from imbalance in case of system requiring upward balance
-                    + (1 - self.data.scenario[w]['sc'][t]) * (self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.up_imbalance[t,w].X 
-                    - self.data.scenario[w]['eprice'][t] * self.variables.down_imbalance[t,w].X)                                                                                # Profit from imbalance in case of system requiring downward balance
-                for t in self.data.T
-                for w in self.data.W
-        }
-        self.results.expected_profit_imbalance = {
-            t: self.data.prob_scenario * (
-                sum(self.data.positiveBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * self.data.scenario[w]['sc'][t] for w in self.data.W) +
-                sum(self.data.negativeBalancePriceFactor * self.data.scenario[w]['eprice'][t] * self.variables.imbalance[t,w].X * (1 - self.data.scenario[w]['sc'][t]) for w in self.data.W)
-            )
-            for t in self.data.T
-        }
-
-        self.results.profit_per_scenario = {
-            w: sum(self.data.scenario[w]['eprice'][t] * self.variables.production[t].X + self.results.profit_imbalance[t,w] for t in self.data.T)
-            for w in self.data.W
-        }
-
-        self.results.expected_real_prod = {
-            t: self.data.prob_scenario * gp.quicksum(self.data.scenario[w]['rp'][t] for w in self.data.W) * self.data.p_nom
-            for t in self.data.T
-        }
-
-        total_production = sum(value for value in self.results.production.values())
-        self.results.avg_bid = total_production / len(self.results.production)
-
-
     def print_results(self):
         print('-' * 30)
         print(f'{"Results Summary":^30}')
@@ -280,7 +214,7 @@ class TwoPriceBiddingModel():
     def run(self):
         # Makes sure the model is solved and saves the results
         try:
-            self.model.optimize()
+            self.solve()
             self.model.write("first_task/output/verification/two_price_model.lp")
             if self.model.status == gp.GRB.INFEASIBLE:
                 print("Model is infeasible; computing IIS")
@@ -293,7 +227,7 @@ class TwoPriceBiddingModel():
             elif self.model.status == gp.GRB.OPTIMAL:
                 if self.verbose:
                     print("Optimization was successful!")
-                self.save_results()     
+                self.extract()     
             else:
                 raise TimeoutError("Gurobi optimization failed")       
         except gp.GurobiError as e:
@@ -0,0 +1,82 @@
+import numpy as np
+
+from .input_data import InputData
+from .results import hourly_profit
+
+class PerfectInformationAnalysis:
+    """
+    Value of the stochastic solution of the bidding problem.
+
+    With perfect information the profit of every scenario and hour is piecewise linear in the bid, with
+    breakpoints at 0, the real production and p_nom, so the wait-and-see bid is the best of these three.
+    The expected value problem (a single scenario with the expected rp, eprice and sc) is solved the same way.
+
+        WS   = E[wait-and-see profit]
+        EVPI = WS - RP, with RP the expected profit of the stochastic solution
+        EEV  = expected profit of the expected value bids
+        VSS  = RP - EEV
+    """
+
+    def __init__(self, input_data: InputData):
+        self.data = input_data
+
+    def wait_and_see(self, input_data=None):
+        """
+        Returns:
+            production (np.array): Optimal bid of every scenario and hour (scenarios x hours).
+            profit (np.array): Optimal profit of every scenario and hour (scenarios x hours).
+        """
+        input_data = self.data if input_data is None else input_data
+        real_production = input_data.scenario_arrays()['rp'] * input_data.p_nom
+        candidates = np.stack([np.zeros_like(real_production), real_production, np.full_like(real_production, input_data.p_nom)])
+        profits = np.stack([hourly_profit(input_data, candidate) for candidate in candidates])
+        best = profits.argmax(axis=0)[None]
+        return np.take_along_axis(candidates, best, axis=0)[0], np.take_along_axis(profits, best, axis=0)[0]
+
+    def expected_value_bids(self):
+        # Bids of the expected value problem
+        arrays = self.data.scenario_arrays()
+        mean_scenario = {
+            key: dict(zip(self.data.T, (arrays['prob'] @ arrays[key]).tolist()))
+            for key in ['rp', 'eprice', 'sc']
+        }
+        ev_data = InputData(self.data.T, [1], {1: mean_scenario}, 1, model_type=self.data.model_type)
+        production, _ = self.wait_and_see(ev_data)
+        return production[0]
+
+    def expected_profit(self, production, input_data=None):
+        # Expected profit of the given hourly bids on the scenarios of input_data
+        input_data = self.data if input_data is None else input_data
+        return input_data.scenario_arrays()['prob'] @ hourly_profit(input_data, production).sum(axis=1)
+
+    def analyse(self, stochastic_profit, outsample_data=None, stochastic_production=None):
+        """
+        Args:
+            stochastic_profit (float): In-sample expected profit of the stochastic solution (RP).
+            outsample_data (InputData): Scenarios where the expected value bids are also evaluated.
+            stochastic_production (dict): Bids of the stochastic solution, evaluated on outsample_data.
+
+        Returns:
+            dict: WS, EVPI, EEV and VSS, and their out-of-sample counterparts if outsample_data is given.
+        """
+        _, ws_profit = self.wait_and_see()
+        wait_and_see = self.data.scenario_arrays()['prob'] @ ws_profit.sum(axis=1)
+        ev_production = self.expected_value_bids()
+        eev = self.expected_profit(ev_production)
+        result = {
+            'wait_and_see': wait_and_see,
+            'evpi': wait_and_see - stochastic_profit,
+            'eev': eev,
+            'vss': stochastic_profit - eev,
+            'ev_production': dict(zip(self.data.T, ev_production.tolist())),
+        }
+        if outsample_data is not None:
+            _, outsample_ws_profit = self.wait_and_see(outsample_data)
+            result['outsample_wait_and_see'] = outsample_data.scenario_arrays()['prob'] @ outsample_ws_profit.sum(axis=1)
+            result['outsample_eev'] = self.expected_profit(ev_production, outsample_data)
+            if stochastic_production is not None:
+                production = np.array([stochastic_production[t] for t in self.data.T])
+                outsample_rp = self.expected_profit(production, outsample_data)
+                result['outsample_evpi'] = result['outsample_wait_and_see'] - outsample_rp
+                result['outsample_vss'] = outsample_rp - result['outsample_eev']
+        return result
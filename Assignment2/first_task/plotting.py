@@ -16,8 +16,8 @@ def plot_comparison_bids(one_price_model, two_price_model):
     # Define arrays to be plotted
     p_one_price = [one_price_model.results.production[t] for t in one_price_model.data.T]
     p_two_price = [two_price_model.results.production[t] for t in two_price_model.data.T]
-    real_prod_one_price = [one_price_model.results.expected_real_prod[t].getValue() for t in one_price_model.data.T]
-    real_prod_two_price = [two_price_model.results.expected_real_prod[t].getValue() for t in two_price_model.data.T] 
+    real_prod_one_price = [one_price_model.results.expected_real_prod[t] for t in one_price_model.data.T]
+    real_prod_two_price = [two_price_model.results.expected_real_prod[t] for t in two_price_model.data.T] 
 
     # Plot configuration
     ax.plot(one_price_model.data.T, p_one_price, label='One Price Scheme', color='blue', marker = 'x', linestyle = '--')
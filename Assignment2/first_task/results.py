@@ -0,0 +1,117 @@
+import numpy as np
+
+class ProfitDistribution:
+    """
+    Discrete profit distribution of a bidding strategy over the scenarios.
+
+    Only holds numpy arrays, so it can be used after the Gurobi model has been disposed.
+    alpha and q can be floats or arrays.
+    """
+
+    def __init__(self, profit, prob):
+        order = np.argsort(profit)
+        self.profit = np.asarray(profit, dtype=float)
+        self.prob = np.asarray(prob, dtype=float)
+        self.sorted_profit = self.profit[order]
+        self.sorted_prob = self.prob[order]
+        self.cum_prob = np.cumsum(self.sorted_prob)
+        self.cum_weighted = np.cumsum(self.sorted_prob * self.sorted_profit)
+
+    def expected(self):
+        return self.prob @ self.profit
+
+    def std(self):
+        return np.sqrt(self.prob @ (self.profit - self.expected()) ** 2)
+
+    def quantile(self, q):
+        # Smallest profit x with P(profit <= x) >= q
+        index = np.searchsorted(self.cum_prob, np.asarray(q) - 1e-12, side='left')
+        return self.sorted_profit[np.minimum(index, len(self.sorted_profit) - 1)]
+
+    def var(self, alpha):
+        # Value at risk at confidence level alpha, i.e. the (1 - alpha) quantile of the profit
+        return self.quantile(1 - np.asarray(alpha))
+
+    def cvar(self, alpha):
+        # Expected profit in the worst (1 - alpha) tail: VaR - E[(VaR - profit)^+] / (1 - alpha)
+        alpha = np.asarray(alpha)
+        index = np.minimum(np.searchsorted(self.cum_prob, 1 - alpha - 1e-12, side='left'), len(self.sorted_profit) - 1)
+        value_at_risk = self.sorted_profit[index]
+        shortfall = self.cum_prob[index] * value_at_risk - self.cum_weighted[index]
+        return value_at_risk - shortfall / (1 - alpha)
+
+    def histogram(self, bins=100):
+        # Probability of every profit bin
+        return np.histogram(self.profit, bins=bins, weights=self.prob)
+
+def imbalance_profit(input_data, imbalance, up_imbalance=None, down_imbalance=None):
+    """
+    Profit from imbalance of every scenario and hour (scenarios x hours) under the scheme of input_data.
+    The two price scheme needs the up and down imbalances.
+    """
+    arrays = input_data.scenario_arrays()
+    eprice, sc = arrays['eprice'], arrays['sc']
+    if input_data.model_type == 'one_price':
+        return eprice * imbalance * (input_data.positiveBalancePriceFactor * sc + input_data.negativeBalancePriceFactor * (1 - sc))
+    elif input_data.model_type == 'two_price':
+        return (sc * (eprice * up_imbalance - input_data.positiveBalancePriceFactor * eprice * down_imbalance)
+                + (1 - sc) * (input_data.negativeBalancePriceFactor * eprice * up_imbalance - eprice * down_imbalance))
+    raise ValueError("Invalid model type. Use 'one_price' or 'two_price'.")
+
+def hourly_profit(input_data, production):
+    """
+    Profit of every scenario and hour (scenarios x hours) for the given bids, with the imbalance
+    settled optimally. production can be a vector of hourly bids or a (scenarios x hours) array.
+    """
+    arrays = input_data.scenario_arrays()
+    imbalance = arrays['rp'] * input_data.p_nom - production
+    return arrays['eprice'] * production + imbalance_profit(input_data, imbalance, np.maximum(imbalance, 0), np.maximum(-imbalance, 0))
+
+def variable_values(model, variables, input_data):
+    # Solution of a (t, w) indexed variable dict as a (scenarios x hours) array, read in a single call
+    values = model.getAttr('X', [variables[t, w] for w in input_data.W for t in input_data.T])
+    return np.array(values).reshape(len(input_data.W), len(input_data.T))
+
+def hour_scenario_dict(values, input_data):
+    # (scenarios x hours) array as a dict keyed by (t, w)
+    keys = [(t, w) for t in input_data.T for w in input_data.W]
+    return dict(zip(keys, values.T.ravel().tolist()))
+
+def save_scenario_results(results, model, variables, input_data):
+    """
+    Fills results with the solution of a bidding model, computed with array operations.
+
+    The dict results (production, imbalance, profit_da, ...) keep their previous keys, and
+    results.profit_distribution holds the profit of every scenario for the distribution statistics.
+    """
+    T, W = input_data.T, input_data.W
+    arrays = input_data.scenario_arrays()
+    prob = arrays['prob']
+
+    production = np.array(model.getAttr('X', [variables.production[t] for t in T]))
+    imbalance = variable_values(model, variables.imbalance, input_data)
+    if input_data.model_type == 'two_price':
+        up_imbalance = variable_values(model, variables.up_imbalance, input_data)
+        down_imbalance = variable_values(model, variables.down_imbalance, input_data)
+        results.up_imbalance = hour_scenario_dict(up_imbalance, input_data)
+        results.down_imbalance = hour_scenario_dict(down_imbalance, input_data)
+        profit_imbalance = imbalance_profit(input_data, imbalance, up_imbalance, down_imbalance)
+    else:
+        profit_imbalance = imbalance_profit(input_data, imbalance)
+
+    profit_da = (prob @ arrays['eprice']) * production
+    expected_profit_imbalance = prob @ profit_imbalance
+    profit_per_scenario = arrays['eprice'] @ production + profit_imbalance.sum(axis=1)
+
+    results.production = dict(zip(T, production.tolist()))
+    results.imbalance = hour_scenario_dict(imbalance, input_data)
+    results.expected_imbalance = dict(zip(T, (prob @ imbalance).tolist()))
+    results.profit_da = dict(zip(T, profit_da.tolist()))
+    results.profit_imbalance = hour_scenario_dict(profit_imbalance, input_data)
+    results.expected_profit_imbalance = dict(zip(T, expected_profit_imbalance.tolist()))
+    results.expected_profit = dict(zip(T, (profit_da + expected_profit_imbalance).tolist()))
+    results.total_expected_profit = float(profit_da.sum() + expected_profit_imbalance.sum())
+    results.profit_per_scenario = dict(zip(W, profit_per_scenario.tolist()))
+    results.profit_distribution = ProfitDistribution(profit_per_scenario, prob)
+    results.expected_real_prod = dict(zip(T, (prob @ arrays['rp'] * input_data.p_nom).tolist()))
+    results.avg_bid = production.mean()
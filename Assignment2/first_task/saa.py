@@ -0,0 +1,179 @@
+import sys
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+import gurobipy as gp
+
+from .input_data import *
+from .benders import BendersBiddingModel
+
+class SampleAverageApproximation:
+    """
+    Sample average approximation (SAA) of the wind farm bidding problem with statistical optimality bounds.
+
+    M replications with N i.i.d. scenarios each are solved with the Benders decomposition. The mean of
+    their optimal values estimates an upper bound of the true optimum, as the problem is a maximization.
+    The best replication bids are then evaluated on a large independent sample, split into batches,
+    and the mean batch objective estimates a lower bound. Confidence intervals use the normal approximation.
+
+    The scenarios are drawn from a finite set of combinations, so the bids are evaluated once on every
+    combination and an evaluation sample is just the number of times each combination is drawn. This makes
+    the size of the evaluation sample free, and n_evaluation=None evaluates the bids exactly.
+    """
+
+    def __init__(self, model_type: str = 'two_price', beta: float = 0, alpha: float = 0.9, n_replications: int = 10,
+                 n_evaluation: int = 1000000, n_batches: int = 20, confidence: float = 0.95, n_workers: int = 1,
+                 tolerance: float = 1e-5, seed=None, verbose: bool = True):
+        self.model_type = model_type
+        self.beta = beta
+        self.alpha = alpha
+        self.n_replications = n_replications
+        self.n_evaluation = n_evaluation
+        self.n_batches = n_batches
+        self.confidence = confidence
+        self.n_workers = n_workers
+        self.tolerance = tolerance
+        self.verbose = verbose
+        self.rng = np.random.default_rng(seed)
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+        # Evaluates any bids on all the combinations at once
+        combinations = all_combinations.materialize(range(len(all_combinations)))
+        combination_data = InputData(T, list(combinations.keys()), combinations, 1/len(combinations), model_type=model_type)
+        self.evaluator = BendersBiddingModel(combination_data, beta=beta, alpha=alpha, verbose=False)
+
+    def sample_input_data(self, n_samples):
+        # Draws n_samples i.i.d. scenarios from all the (rp, sc, eprice) combinations
+        sampled = all_combinations.materialize(self.rng.integers(len(all_combinations), size=n_samples))
+        return InputData(T, list(sampled.keys()), sampled, 1/n_samples, model_type=self.model_type)
+
+    def solve_replication(self, input_data, env=None):
+        # Solves one SAA problem and returns its optimal value and bids
+        model = BendersBiddingModel(input_data, beta=self.beta, alpha=self.alpha, verbose=False,
+                                    tolerance=self.tolerance, max_iterations=1000, env=env)
+        model.run()
+        production = np.array([model.results.production[t] for t in T])
+        # The Benders upper bound keeps the estimate valid even if the bounds have not fully met
+        objective = model.results.log[-1]['upper_bound']
+        model.model.dispose()
+        return objective, production
+
+    def solve_replications(self, n_samples):
+        # Solves the M replications, n_workers at a time, each worker with its own Gurobi environment
+        samples = [self.sample_input_data(n_samples) for _ in range(self.n_replications)]
+        if self.n_workers <= 1:
+            return [self.solve_replication(input_data) for input_data in samples]
+
+        envs = queue.Queue()
+        for _ in range(self.n_workers):
+            env = gp.Env(empty=True)
+            env.setParam('OutputFlag', 0)
+            env.start()
+            envs.put(env)
+
+        def solve_with_pooled_env(input_data):
+            env = envs.get()
+            try:
+                return self.solve_replication(input_data, env=env)
+            finally:
+                envs.put(env)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                return list(executor.map(solve_with_pooled_env, samples))
+        finally:
+            while not envs.empty():
+                envs.get().dispose()
+
+    def sample_weights(self, n_samples):
+        # Probabilities that n_samples i.i.d. draws give to every combination
+        return self.rng.multinomial(n_samples, np.full(len(all_combinations), 1/len(all_combinations))) / n_samples
+
+    def batch_objectives(self, profit, n_evaluation):
+        """
+        Objective of the bids with the given profit per combination on n_batches independent batches
+        of n_evaluation / n_batches scenarios. If n_evaluation is None the objective is computed exactly
+        over all the combinations.
+        """
+        if n_evaluation is None:
+            weights = [np.full(len(all_combinations), 1/len(all_combinations))]
+        else:
+            weights = [self.sample_weights(n_evaluation // self.n_batches) for _ in range(self.n_batches)]
+        objectives = []
+        for prob in weights:
+            cvar = self.evaluator.compute_cvar(profit, prob)[0] if self.beta > 0 else 0
+            objectives.append((1 - self.beta) * prob @ profit + self.beta * cvar)
+        return np.array(objectives)
+
+    def confidence_interval(self, values):
+        # Mean and half width of the confidence interval of the mean
+        if len(values) == 1:
+            return values[0], 0.0
+        return values.mean(), self.z * values.std(ddof=1) / np.sqrt(len(values))
+
+    def run(self, n_samples):
+        """
+        Computes the SAA bounds for in-sample size n_samples.
+
+        Returns:
+            dict: Bound estimates with their confidence interval half widths, the optimality gap and the candidate bids.
+        """
+        replications = self.solve_replications(n_samples)
+        upper_bound, upper_half_width = self.confidence_interval(np.array([objective for objective, _ in replications]))
+
+        # The candidate is chosen on one evaluation sample and its lower bound estimated on an independent one,
+        # so that the selection does not bias the estimate
+        profits = [self.evaluator.evaluate_scenarios(production)[0] for _, production in replications]
+        selection = [self.batch_objectives(profit, self.n_evaluation).mean() for profit in profits]
+        best = int(np.argmax(selection))
+        candidate = replications[best][1]
+        lower_bound, lower_half_width = self.confidence_interval(self.batch_objectives(profits[best], self.n_evaluation))
+
+        gap = upper_bound - lower_bound
+        result = {
+            'n_samples': n_samples,
+            'upper_bound': upper_bound,
+            'upper_half_width': upper_half_width,
+            'lower_bound': lower_bound,
+            'lower_half_width': lower_half_width,
+            'gap': gap,
+            'gap_ci': gap + upper_half_width + lower_half_width,   # Conservative upper limit of the gap
+            'relative_gap': gap / abs(upper_bound),
+            'production': candidate,
+        }
+        if self.verbose:
+            print(f"N = {n_samples:>5}: UB {upper_bound:.2f} ± {upper_half_width:.2f}  "
+                  f"LB {lower_bound:.2f} ± {lower_half_width:.2f}  gap {gap:.2f} ({result['relative_gap']:.2%})")
+        return result
+
+    def grow(self, n_initial=50, target_gap=0.01, max_samples=6400, growth=2):
+        """
+        Increases the in-sample size by a factor growth until the conservative relative gap
+        (gap_ci / |UB|) falls below target_gap or max_samples is reached.
+
+        Returns:
+            list: Result of run for every in-sample size tried.
+        """
+        results = []
+        n_samples = n_initial
+        while n_samples <= max_samples:
+            result = self.run(n_samples)
+            results.append(result)
+            if result['gap_ci'] / abs(result['upper_bound']) <= target_gap:
+                break
+            n_samples *= growth
+        return results
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        raise ValueError("Usage: python -m first_task.saa [one_price|two_price] [beta]")
+
+    model_type = sys.argv[1].lower()
+    beta = float(sys.argv[2]) if len(sys.argv) == 3 else 0
+
+    saa = SampleAverageApproximation(model_type=model_type, beta=beta, n_workers=4, seed=2)
+    results = saa.grow(n_initial=50, target_gap=0.01)
+    df_results = pd.DataFrame(results).drop(columns='production')
+    print(df_results.to_string(index=False))
@@ -0,0 +1,161 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from .input_data import *
+from .model_one_price import OnePriceBiddingModel
+from .model_two_price import TwoPriceBiddingModel
+from .expost_analysis import ExPostAnalysis
+
+class ScenarioReduction:
+    """
+    Reduces a scenario set to K weighted representatives.
+
+    Every scenario is a point of the (W x 3T) tensor with its rp, sc and eprice profiles, each block scaled
+    by its standard deviation so that the prices do not dominate the distance. The probability of every
+    removed scenario is moved to its closest representative, and the reduction error is the resulting
+    Kantorovich distance sum_w p_w * min_k ||x_w - x_k||.
+    """
+
+    def __init__(self, scenarios: dict, timeSpan: list, verbose: bool = True):
+        self.scenarios = scenarios
+        self.W = list(scenarios.keys())
+        self.T = timeSpan
+        self.verbose = verbose
+        self.prob = np.full(len(self.W), 1/len(self.W))
+        self.build_features()
+
+    def build_features(self):
+        # Scaled (W x 3T) tensor and matrix of pairwise distances
+        blocks = []
+        for key in ['rp', 'sc', 'eprice']:
+            block = np.array([[self.scenarios[w][key][t] for t in self.T] for w in self.W], dtype=float)
+            std = block.std()
+            blocks.append(block / std if std > 0 else block)
+        self.features = np.hstack(blocks)
+        squared_norms = (self.features ** 2).sum(axis=1)
+        squared_distances = squared_norms[:, None] + squared_norms[None, :] - 2 * self.features @ self.features.T
+        self.distances = np.sqrt(np.maximum(squared_distances, 0))
+
+    def fast_forward_selection(self, K):
+        """
+        Fast forward selection: adds the scenario that reduces the Kantorovich distance the most, K times.
+
+        Returns:
+            list: Positions of the selected scenarios.
+        """
+        selected = []
+        # Distance of every scenario to its closest selected scenario
+        closest = np.full(len(self.W), np.inf)
+        for _ in range(K):
+            # Reduction error if every candidate u was added
+            errors = self.prob @ np.minimum(closest[:, None], self.distances)
+            errors[selected] = np.inf
+            u = int(np.argmin(errors))
+            selected.append(u)
+            closest = np.minimum(closest, self.distances[:, u])
+        return selected
+
+    def k_medoids(self, K, max_iterations=100):
+        """
+        k-medoids started from the fast forward selection: scenarios are assigned to their closest medoid
+        and every medoid is moved to the scenario of its cluster with the smallest weighted distance to the rest.
+
+        Returns:
+            list: Positions of the medoids.
+        """
+        medoids = np.array(self.fast_forward_selection(K))
+        for _ in range(max_iterations):
+            assignment = np.argmin(self.distances[:, medoids], axis=1)
+            new_medoids = medoids.copy()
+            for k in range(K):
+                members = np.flatnonzero(assignment == k)
+                if members.size == 0:
+                    # Scenarios identical to another medoid are assigned to the first one and can leave a
+                    # medoid without members, which is kept where it is
+                    continue
+                costs = self.prob[members] @ self.distances[np.ix_(members, members)]
+                new_medoids[k] = members[np.argmin(costs)]
+            if np.array_equal(new_medoids, medoids):
+                break
+            medoids = new_medoids
+        return list(medoids)
+
+    def reduce(self, K, method='fast_forward'):
+        """
+        Reduces the scenario set to K scenarios.
+
+        Returns:
+            reduced_scenarios (dict): Representatives, renumbered from 1 to K.
+            probability (dict): Probability of every representative.
+            error (float): Kantorovich distance between the original and the reduced distributions.
+        """
+        if method == 'fast_forward':
+            selected = self.fast_forward_selection(K)
+        elif method == 'k_medoids':
+            selected = self.k_medoids(K)
+        else:
+            raise ValueError("Invalid reduction method. Use 'fast_forward' or 'k_medoids'.")
+
+        # Redistribute the probability of every scenario to its closest representative
+        assignment = np.argmin(self.distances[:, selected], axis=1)
+        weights = np.bincount(assignment, weights=self.prob, minlength=K)
+        error = self.prob @ self.distances[np.arange(len(self.W)), np.array(selected)[assignment]]
+
+        reduced_scenarios = {k+1: self.scenarios[self.W[u]] for k, u in enumerate(selected)}
+        probability = {k+1: weights[k] for k in range(K)}
+        return reduced_scenarios, probability, error
+
+    def profit_error(self, K_values, model_type, methods=('fast_forward', 'k_medoids')):
+        """
+        Solves the bidding model on the full set and on every reduced set, and evaluates the bids
+        of the reduced sets on the full set.
+
+        Returns:
+            list: Reduction error, in-sample objective, full-set profit of the bids and solve time for every K and method.
+        """
+        model_class = OnePriceBiddingModel if model_type == 'one_price' else TwoPriceBiddingModel
+        expost = ExPostAnalysis(scenarios=self.scenarios, timeSpan=self.T, model_type=model_type, verbose=False)
+
+        start_time = time.time()
+        full_model = model_class(InputData(self.T, self.W, self.scenarios, 1/len(self.W), model_type=model_type), verbose=False)
+        full_model.run()
+        full_time = time.time() - start_time
+        full_profit = full_model.results.profit
+
+        results = [{
+            'method': 'full', 'K': len(self.W), 'reduction_error': 0.0,
+            'insample_profit': full_profit, 'full_set_profit': full_profit,
+            'profit_error': 0.0, 'solve_time': full_time,
+        }]
+        for method in methods:
+            for K in K_values:
+                reduced_scenarios, probability, error = self.reduce(K, method)
+                start_time = time.time()
+                model = model_class(InputData(self.T, list(reduced_scenarios.keys()), reduced_scenarios, probability, model_type=model_type), verbose=False)
+                model.run()
+                solve_time = time.time() - start_time
+
+                _, expected_profit_imbalance, profit_da = expost.outsample_analysis(model, self.scenarios)
+                full_set_profit = profit_da + expected_profit_imbalance
+                results.append({
+                    'method': method, 'K': K, 'reduction_error': error,
+                    'insample_profit': model.results.profit, 'full_set_profit': full_set_profit,
+                    'profit_error': full_profit - full_set_profit, 'solve_time': solve_time,
+                })
+                model.model.dispose()
+                if self.verbose:
+                    print(f"{method} K = {K}: reduction error {error:.3f}, profit error {full_profit - full_set_profit:.2f}")
+        full_model.model.dispose()
+        return results
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise ValueError("Usage: python -m first_task.scenario_reduction [one_price|two_price]")
+
+    model_type = sys.argv[1].lower()
+    reduction = ScenarioReduction(scenarios, T)
+    results = reduction.profit_error([5, 10, 20, 50, 100], model_type)
+    df_results = pd.DataFrame(results)
+    print(df_results.to_string(index=False))
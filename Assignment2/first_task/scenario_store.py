@@ -0,0 +1,102 @@
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Binary scenario store: one memory-mapped .npy array per scenario library plus a JSON index
+# with the source CSV files of every array, in the order in which they were stacked
+STORE_VERSION = 2
+NUM_HOURS = 24
+
+script_dir = os.path.dirname(__file__)
+default_data_dir = os.path.join(script_dir, '../data')
+default_store_dir = os.path.join(default_data_dir, 'scenario_store')
+
+def load_files(directory):
+    """Loads all files from a given directory."""
+    return glob.glob(os.path.join(directory, '*'))
+
+def source_files(data_dir=default_data_dir):
+    # CSV files behind every array, in the same order as the CSV loader in input_data
+    return {
+        'rp': load_files(os.path.join(data_dir, 'rate_of_production_scenarios/29march'))
+            + load_files(os.path.join(data_dir, 'rate_of_production_scenarios/30march')),
+        'eprice': load_files(os.path.join(data_dir, 'eprice_scenarios')),
+        'ps_condition': [os.path.join(data_dir, 'ps_condition/ps_condition_scenarios.csv')],
+    }
+
+def read_sources(data_dir=default_data_dir, files=None):
+    """
+    Parses the scenario CSV files.
+
+    Returns:
+        dict: 'rp' (rate of production scenarios x hours), 'eprice' (price scenarios x hours, negative prices
+            are kept) and 'ps_condition' (system condition scenarios x hours) arrays.
+    """
+    files = source_files(data_dir) if files is None else files
+    rp = np.array([pd.read_csv(file, sep=';').iloc[:NUM_HOURS, 4].to_numpy(dtype=np.float64) for file in files['rp']])
+    eprice = np.array([pd.read_csv(file, sep=',', header=None).iloc[:NUM_HOURS, 1].to_numpy(dtype=np.float64) for file in files['eprice']])
+    ps_condition = pd.read_csv(files['ps_condition'][0], sep=',').iloc[:, :NUM_HOURS].to_numpy(dtype=np.int8)
+    return {'rp': rp, 'eprice': eprice, 'ps_condition': ps_condition}
+
+def describe_sources(files, data_dir):
+    # Relative path, size and SHA-1 of the content of every source file, used to detect a stale store
+    sources = []
+    for file in files:
+        with open(file, 'rb') as f:
+            sha1 = hashlib.sha1(f.read()).hexdigest()
+        sources.append({'path': os.path.relpath(file, data_dir), 'size': os.path.getsize(file), 'sha1': sha1})
+    return sources
+
+def source_keys(sources):
+    return {(source['path'], source['size'], source['sha1']) for source in sources}
+
+def convert(data_dir=default_data_dir, store_dir=default_store_dir):
+    # Packs the scenario CSV files into the binary store
+    os.makedirs(store_dir, exist_ok=True)
+    files = source_files(data_dir)
+    arrays = read_sources(data_dir, files)
+    index = {'version': STORE_VERSION, 'hours': NUM_HOURS, 'arrays': {}}
+    for name, array in arrays.items():
+        np.save(os.path.join(store_dir, f'{name}.npy'), array)
+        index['arrays'][name] = {
+            'file': f'{name}.npy',
+            'shape': list(array.shape),
+            'dtype': str(array.dtype),
+            'sources': describe_sources(files[name], data_dir),
+        }
+    with open(os.path.join(store_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+def load(store_dir=default_store_dir, data_dir=default_data_dir):
+    """
+    Opens the binary store as read-only memory maps, so processes that load it share the same pages.
+
+    Returns:
+        dict: Same arrays as read_sources, or None if there is no store or its source files have changed.
+    """
+    index_path = os.path.join(store_dir, 'index.json')
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        index = json.load(f)
+    if index.get('version') != STORE_VERSION:
+        return None
+
+    files = source_files(data_dir)
+    arrays = {}
+    for name, entry in index['arrays'].items():
+        # The stored order is kept, but the set of source files and their contents must match
+        if source_keys(describe_sources(files[name], data_dir)) != source_keys(entry['sources']):
+            return None
+        arrays[name] = np.load(os.path.join(store_dir, entry['file']), mmap_mode='r')
+    return arrays
+
+if __name__ == "__main__":
+    index = convert()
+    for name, entry in index['arrays'].items():
+        print(f"{name}: {entry['shape']} {entry['dtype']} from {len(entry['sources'])} files")
+    print(f"Scenario store written to {os.path.normpath(default_store_dir)}")
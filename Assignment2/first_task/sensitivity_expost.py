@@ -7,6 +7,10 @@ from .input_data import *
 from .model_one_price import OnePriceBiddingModel
 from .model_two_price import TwoPriceBiddingModel
 from .expost_analysis import ExPostAnalysis
+from .bootstrap import Bootstrap
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from result_cache import ResultCache
 
 if __name__ == "__main__":
     start_time = time.time() # Start timer
@@ -27,6 +31,12 @@ if __name__ == "__main__":
     K = [3, 4, 5, 6, 7, 8, 9, 10]
     insample_sizes = [len(cv_scenarios)//k for k in K] 
 
+    # Bootstrap of the out-of-sample profits of every fold, for the error bars
+    bootstrap = Bootstrap(n_resamples=10000, confidence=0.95, alpha=0.9, seed=2)
+
+    # Folds solved in a previous run with the same data and code are loaded from the cache
+    cache = ResultCache()
+
     # Store results in array of dictionaries
     sensitivity_results = []
     for i, k in enumerate(K):
@@ -35,7 +45,7 @@ if __name__ == "__main__":
         # Define the model
         model_expost = ExPostAnalysis(timeSpan=T, scenarios=cv_scenarios, model_type=model_type, verbose=False)
         
-        cv_results = model_expost.cross_validation(k)
+        cv_results = cache.memoize('cross_validation', lambda: model_expost.cross_validation(k), cv_scenarios, T, model_type, k)
 
         # Calculate average profit difference
         avg_insample_profit = np.mean([r["insample_expected_profit"] for r in cv_results])
@@ -43,16 +53,25 @@ if __name__ == "__main__":
         diff_of_averages = avg_insample_profit - avg_outofsample_profit
         relative_diff_of_averages = (diff_of_averages / avg_insample_profit) * 100
         
+        _, average_ci = bootstrap.analyse_folds(cv_results)
+
         # Log results
         print(f"Difference of the average profits: {round(diff_of_averages, 3)}")
-        print(f"Relative difference of the average profits: {round(relative_diff_of_averages, 3)}")
+        print(f"Relative difference of the average profits: {round(relative_diff_of_averages, 3)} "
+              f"(95% CI {round(average_ci['relative_gap_low'], 3)} to {round(average_ci['relative_gap_high'], 3)})")
 
         # Save results
         sensitivity_results.append({
             "insample_size": insample_sizes[i],
             "outsample_size": len(cv_scenarios) - insample_sizes[i],
             "diff_of_averages": np.abs(diff_of_averages),
-            "relative_diff_of_averages": np.abs(relative_diff_of_averages)
+            "relative_diff_of_averages": np.abs(relative_diff_of_averages),
+            "relative_gap": average_ci['relative_gap'],
+            "relative_gap_low": average_ci['relative_gap_low'],
+            "relative_gap_high": average_ci['relative_gap_high'],
+            "outsample_cvar": average_ci['cvar'],
+            "outsample_cvar_low": average_ci['cvar_low'],
+            "outsample_cvar_high": average_ci['cvar_high'],
         })
     df_sensitivity = pd.DataFrame(sensitivity_results)
 
@@ -66,13 +85,18 @@ if __name__ == "__main__":
     # plt.tight_layout()
 
     plt.figure(figsize=(9, 6))
-    plt.plot(df_sensitivity["insample_size"], df_sensitivity["relative_diff_of_averages"], marker="o", color="orange")
+    plt.errorbar(
+        df_sensitivity["insample_size"], df_sensitivity["relative_gap"],
+        yerr=[df_sensitivity["relative_gap"] - df_sensitivity["relative_gap_low"], df_sensitivity["relative_gap_high"] - df_sensitivity["relative_gap"]],
+        marker="o", color="orange", capsize=4
+    )
     plt.xlabel("In-sample size")
     plt.ylabel("Relative difference of in-/out-sample avg. expected profit (%)")
     # plt.title("Sensitivity analysis: in-sample size vs relative profit difference")
     plt.grid(True)
     plt.tight_layout()
     plt.show()
+    print(f"\nResult cache: {cache.hits} hits, {cache.misses} misses")
     end_time = time.time()  # End timer
     elapsed_time = end_time - start_time  # Calculate elapsed time
     print(f"\nTotal execution time: {elapsed_time:.2f} seconds")
\ No newline at end of file
@@ -0,0 +1,71 @@
+import time
+import pandas as pd
+import gurobipy as gp
+from gurobipy import GRB
+
+from .input_data import *
+from .model_ancilliary import AncilliaryServiceBiddingModel
+
+# Number of in-sample profiles used in each run and formulations to compare
+profile_counts = [10, 25, 50, 100]
+formulations = ['big_m', 'tight_big_m', 'indicator']
+hour = 0
+
+def subsample_input_data(n_profiles):
+    # Keeps the first n_profiles in-sample profiles
+    scenarios = {(m, w): value for (m, w), value in insample_scenarios.items() if w < n_profiles}
+    return InputData(
+        scenarios,
+        out_of_sample_scenarios,
+        prob_scenarios_insample=[1 / n_profiles for _ in range(n_profiles)],
+        prob_scenarios_outsample=prob_scenarios_outsample,
+        epsilon_requirement=0.1,
+        num_hours=1,
+    )
+
+def root_bound_callback(model, where):
+    # Stores the bound at the end of the root node (after cuts)
+    if where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0:
+        model._root_bound = model.cbGet(GRB.Callback.MIPNODE_OBJBND)
+
+def benchmark(n_profiles, formulation):
+    input_data = subsample_input_data(n_profiles)
+    bidding_model = AncilliaryServiceBiddingModel(input_data, verbose=False, formulation=formulation)
+
+    start_time = time.time()
+    model, bid_capacity, _ = bidding_model.build_hourly_model(hour)
+    build_time = time.time() - start_time
+
+    # LP relaxation bound. Indicator constraints have no LP relaxation, Gurobi drops them
+    lp_bound = float('nan')
+    if formulation != 'indicator':
+        relaxed_model = model.relax()
+        relaxed_model.optimize()
+        lp_bound = relaxed_model.ObjVal
+        relaxed_model.dispose()
+
+    model._root_bound = GRB.INFINITY
+    model.optimize(root_bound_callback)
+    result = {
+        "profiles": n_profiles,
+        "formulation": formulation,
+        "bid": bid_capacity.X,
+        "nodes": model.NodeCount,
+        "lp_gap_%": (lp_bound - model.ObjVal) / model.ObjVal * 100,
+        "root_gap_%": (min(model._root_bound, model.ObjBound) - model.ObjVal) / model.ObjVal * 100,
+        "build_time": build_time,
+        "solve_time": model.Runtime,
+    }
+    model.dispose()
+    bidding_model.model.dispose()
+    return result
+
+if __name__ == "__main__":
+    results = [
+        benchmark(n, formulation)
+        for n in profile_counts
+        for formulation in formulations
+    ]
+    df_results = pd.DataFrame(results)
+    pd.set_option('display.max_columns', None)
+    print(df_results.to_string(index=False))
@@ -2,11 +2,17 @@ import gurobipy as gp
 from gurobipy import GRB
 import matplotlib.pyplot as plt
 import numpy as np
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
 # Plotting parameters: 
 plt.rcParams['font.family'] = 'serif' 
 plt.rcParams['font.size'] = 14
 
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from .input_data import InputData
 
 class Expando(object):
@@ -15,9 +21,20 @@ class Expando(object):
     '''
     pass
 
-class AncilliaryServiceBiddingModel():
+class AncilliaryServiceBiddingModel(TimedModel):
     
-    def __init__(self, input_data: InputData, verbose: bool = True):
+    def __init__(self, input_data: InputData, verbose: bool = True, formulation: str = 'big_m', big_m: float = 1e3):
+        """
+        Args:
+            input_data (InputData): Scenario data and P90 requirement.
+            verbose (bool): Print the building and solving steps.
+            formulation (str): How the violation binaries are linked to the capacity limits:
+                'big_m' uses the constant big_m, 'tight_big_m' uses the tightest valid M per (h, m, w)
+                computed from the profiles and 'indicator' uses Gurobi indicator constraints.
+            big_m (float): Constant used by the 'big_m' formulation.
+        """
+        if formulation not in ('big_m', 'tight_big_m', 'indicator'):
+            raise ValueError("Invalid formulation. Use 'big_m', 'tight_big_m' or 'indicator'.")
         if verbose:
             print()
             print('-' * 50)
@@ -29,7 +46,58 @@ class AncilliaryServiceBiddingModel():
         self.constraints = Expando()
         self.results = Expando()
         self.verbose = verbose
+        self.formulation = formulation
+        self.big_m = big_m
         self.build_model()
+
+    def compute_big_m(self, h):
+        """
+        Computes the tightest valid big-M of every capacity limit in hour h.
+
+        A pair (m, w) is violated when the bid exceeds its consumption. At most max_violated_scenarios
+        pairs can be violated, so the bid can never exceed the (max_violated_scenarios + 1)-th smallest
+        consumption of the hour. Each capacity limit only has to be relaxed by the distance between
+        its consumption and that bound.
+
+        Returns:
+            bid_upper_bound (float): Upper bound of the bid in hour h.
+            big_m (dict): Big-M per (m, w).
+        """
+        consumption = np.array([
+            [self.data.insample_scenarios[h * 60 + m, w] for w in self.data.W]
+            for m in self.data.M
+        ])
+        q = int(np.floor(self.data.max_violated_scenarios + 1e-9))
+        if q >= consumption.size:
+            # Every pair may be violated, so the data gives no bound on the bid
+            return None, {(m, w): self.big_m for m in self.data.M for w in self.data.W}
+        bid_upper_bound = np.sort(consumption, axis=None)[q]
+        big_m = np.maximum(bid_upper_bound - consumption, 0)
+        return bid_upper_bound, {
+            (m, w): big_m[i, j]
+            for i, m in enumerate(self.data.M)
+            for j, w in enumerate(self.data.W)
+        }
+
+    def add_capacity_limit(self, model, bid_capacity, violation_binary, consumption, big_m, name):
+        # Links the violation binary to the capacity limit bid <= consumption with the chosen formulation
+        if self.formulation == 'indicator':
+            return model.addGenConstrIndicator(violation_binary, False, bid_capacity <= consumption, name=name)
+        return model.addConstr(
+            bid_capacity - consumption,
+            GRB.LESS_EQUAL,
+            big_m * violation_binary,
+            name=name
+        )
+
+    def hourly_big_m(self, h, bid_capacity):
+        # Big-M values for hour h. With data-driven formulations the bid upper bound is also tightened
+        if self.formulation == 'big_m':
+            return {(m, w): self.big_m for m in self.data.M for w in self.data.W}
+        bid_upper_bound, big_m = self.compute_big_m(h)
+        if bid_upper_bound is not None:
+            bid_capacity.ub = bid_upper_bound
+        return big_m
     
     def build_variables(self):
         # Create the variables
@@ -47,13 +115,16 @@ class AncilliaryServiceBiddingModel():
         
     def build_constraints(self):
         # Create the constraints
-        bigM = 1e3  # A large number to use as a big-M constant
+        big_m = {h: self.hourly_big_m(h, self.variables.bid_capacity[h]) for h in self.data.H}
 
+        self.start_family('capacity_limit')
         self.constraints.capacity_limit = {
-            (h, m, w): self.model.addConstr(
-                self.variables.bid_capacity[h] - self.data.insample_scenarios[h * 60 + m, w],
-                GRB.LESS_EQUAL,
-                bigM * self.variables.violation_binary[h, m, w], 
+            (h, m, w): self.add_capacity_limit(
+                self.model,
+                self.variables.bid_capacity[h],
+                self.variables.violation_binary[h, m, w],
+                self.data.insample_scenarios[h * 60 + m, w],
+                big_m[h][m, w],
                 name=f"capacity_limit_Hour{h}_Minute{m}_Scenario{w}"
             )
             for h in self.data.H
@@ -61,6 +132,7 @@ class AncilliaryServiceBiddingModel():
             for w in self.data.W
         }
 
+        self.start_family('violation_limit')
         self.constraints.violation_limit = {
             h: self.model.addConstr(sum(self.variables.violation_binary[h, m, w] for m in self.data.M for w in self.data.W),
                 GRB.LESS_EQUAL,
@@ -83,22 +155,7 @@ class AncilliaryServiceBiddingModel():
         self.model = gp.Model(name="AncilliaryServiceBiddingModel")
         self.model.setParam('OutputFlag', 0)
         
-        if self.verbose:
-            print("\nBuilding variables")
-        self.build_variables()
-
-        if self.verbose:
-            print("\nBuilding constraints")
-        self.build_constraints()
-        
-        if self.verbose:
-            print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        if self.verbose:
-            print(f"Number of variables: {self.model.NumVars}")
-            print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components(self.verbose)
 
     def save_results(self):
         self.results.bid_capacity = {
@@ -180,6 +237,12 @@ class AncilliaryServiceBiddingModel():
         # Initialize q as a zero vector to store the midpoint values for each hour
         q = np.zeros(len(self.data.H))
 
+        if self.formulation == 'indicator':
+            raise ValueError("ALSO-X relaxes the violation binaries, which indicator constraints do not allow. Use a big-M formulation.")
+        if self.formulation == 'tight_big_m':
+            # The tight M and the bid bound only hold for max_violated_scenarios violations, ALSO-X moves that limit
+            raise ValueError("ALSO-X changes the violation limit, for which the tight big-M values are not valid. Use formulation='big_m'.")
+
         # Relax the integrality of the binary variables
         for (h, m, w), var in self.variables.violation_binary.items():
             var.vtype = GRB.CONTINUOUS
@@ -200,7 +263,7 @@ class AncilliaryServiceBiddingModel():
             self.model.update()
 
             # Step 4: Solve the relaxed problem
-            self.model.optimize()
+            self.solve()
 
             if self.model.status != GRB.OPTIMAL:
                 raise RuntimeError("Optimization failed during ALSO-X execution.")
@@ -219,85 +282,146 @@ class AncilliaryServiceBiddingModel():
                 else:
                     q_up[h] = q[h]
         self.model.write("second_task/output/verification/ancilliary_model.lp")
-        self.save_results() 
+        self.extract() 
         # print(self.variables.violation_binary[0,0,5].X)
         print(f"\nSolved in {it} iterations") 
         print(f"Final q: {q}")
 
-    def run_hourly(self):
+    def build_hourly_model(self, h, env=None):
         """
-        Solves the model independently for each hour.
+        Builds the MILP of a single hour.
+
+        Returns:
+            model (gp.Model): Model of hour h.
+            bid_capacity (gp.Var): Bid variable of hour h.
+            violation_binary (dict): Violation binaries per (m, w).
         """
-        bids = {}
-        violations = {}
-        violation_count = {}
+        model = gp.Model(name=f"AncilliaryServiceBiddingModel_Hour{h}", env=env)
+        model.setParam('OutputFlag', 0)
 
-        for h in self.data.H:
-            if self.verbose:
-                print(f"\nSolving for hour h = {h+1}")
-
-            # Create a new model for each hour
-            model = gp.Model(name=f"AncilliaryServiceBiddingModel_Hour{h}")
-            model.setParam('OutputFlag', 0)
-
-            # Variables
-            bid_capacity = model.addVar(vtype=GRB.CONTINUOUS, name=f"bid_capacity_Hour{h}", lb=0)
-            violation_binary = {
-                (m, w): model.addVar(vtype=GRB.BINARY, name=f"violation_binary_{m}_{w}")
-                for m in self.data.M
-                for w in self.data.W
-            }
-
-            # Constraints
-            bigM = 1e3  # A large number to use as a big-M constant
-
-            # Capacity limit constraints
-            capacity_limit = {
-                (m, w): model.addConstr(
-                    bid_capacity - self.data.insample_scenarios[h * 60 + m, w],
-                    GRB.LESS_EQUAL,
-                    bigM * violation_binary[m, w],
+        # Variables
+        bid_capacity = model.addVar(vtype=GRB.CONTINUOUS, name=f"bid_capacity_Hour{h}", lb=0)
+        violation_binary = {
+            (m, w): model.addVar(vtype=GRB.BINARY, name=f"violation_binary_{m}_{w}")
+            for m in self.data.M
+            for w in self.data.W
+        }
+
+        # Capacity limit constraints
+        big_m = self.hourly_big_m(h, bid_capacity)
+        for m in self.data.M:
+            for w in self.data.W:
+                self.add_capacity_limit(
+                    model,
+                    bid_capacity,
+                    violation_binary[m, w],
+                    self.data.insample_scenarios[h * 60 + m, w],
+                    big_m[m, w],
                     name=f"capacity_limit_Hour{h}_Minute{m}_Scenario{w}"
                 )
-                for m in self.data.M
-                for w in self.data.W
-            }
 
-            # Violation limit constraint
-            violation_limit = model.addConstr(
-                gp.quicksum(violation_binary[m, w] for m in self.data.M for w in self.data.W),
-                GRB.LESS_EQUAL,
-                self.data.max_violated_scenarios,
-                name=f"violation_limit_Hour{h}"
-            )
+        # Violation limit constraint
+        model.addConstr(
+            gp.quicksum(violation_binary[m, w] for m in self.data.M for w in self.data.W),
+            GRB.LESS_EQUAL,
+            self.data.max_violated_scenarios,
+            name=f"violation_limit_Hour{h}"
+        )
 
-            # Objective function
-            model.setObjective(bid_capacity, GRB.MAXIMIZE)
+        # Objective function
+        model.setObjective(bid_capacity, GRB.MAXIMIZE)
+        model.update()
+        return model, bid_capacity, violation_binary
 
-            self.model.update()
-            if self.verbose:
-                print(f"Number of variables: {self.model.NumVars}")
-                print(f"Number of constraints: {self.model.NumConstrs}")
+    def solve_hour(self, h, env=None, threads=None):
+        """
+        Builds and solves the MILP of hour h.
 
-            # Solve the model
-            model.optimize()
+        Args:
+            h (int): Hour to solve.
+            env (gp.Env): Started Gurobi environment the model is created in.
+            threads (int): Gurobi Threads parameter of the hourly model.
 
-            if model.status == GRB.OPTIMAL:
-                if self.verbose:
-                    print(f"Optimization successful for hour {h}")
-                    print(f"Selected capacity for hour {h}: {bid_capacity.X}")
-                    print(f"Violation count for hour {h}: {sum(violation_binary[m, w].X for m in self.data.M for w in self.data.W)}")
+        Returns:
+            (bid, violations, violation_count) of hour h, or None if the optimization failed.
+        """
+        if self.verbose:
+            print(f"\nSolving for hour h = {h+1}")
 
-                # Store results
-                bids[h] = bid_capacity.X
-                for m in self.data.M:
-                    for w in self.data.W:
-                        violations[(h, m, w)] = violation_binary[m, w].X
-                violation_count[h] = sum(
-                    violation_binary[m, w].X for m in self.data.M for w in self.data.W
-                )
-            else:
-                print(f"Optimization failed for hour {h} with status {model.status}")
+        # Create a new model for each hour
+        model, bid_capacity, violation_binary = self.build_hourly_model(h, env=env)
+        if threads is not None:
+            model.setParam('Threads', threads)
+
+        if self.verbose:
+            print(f"Number of variables: {model.NumVars}")
+            print(f"Number of constraints: {model.NumConstrs + model.NumGenConstrs}")
+
+        # Solve the model
+        model.optimize()
+
+        result = None
+        if model.status == GRB.OPTIMAL:
+            violations = {(h, m, w): violation_binary[m, w].X for m in self.data.M for w in self.data.W}
+            result = (bid_capacity.X, violations, sum(violations.values()))
+            if self.verbose:
+                print(f"Optimization successful for hour {h}")
+                print(f"Selected capacity for hour {h}: {result[0]}")
+                print(f"Violation count for hour {h}: {result[2]}")
+        else:
+            print(f"Optimization failed for hour {h} with status {model.status}")
+        model.dispose()
+        return result
+
+    def run_hourly(self, n_workers=1, threads_per_worker=None):
+        """
+        Solves the model independently for each hour.
+
+        Args:
+            n_workers (int): Number of hours solved concurrently. Each worker thread owns a
+                Gurobi environment that is started once and reused for all the hours it solves.
+            threads_per_worker (int): Gurobi Threads parameter of every hourly model. Defaults to
+                Gurobi's choice when solving sequentially and to an even split of the cores otherwise.
+        """
+        bids = {}
+        violations = {}
+        violation_count = {}
+
+        if n_workers <= 1:
+            hourly_results = {h: self.solve_hour(h, threads=threads_per_worker) for h in self.data.H}
+        else:
+            if threads_per_worker is None:
+                threads_per_worker = max(1, (os.cpu_count() or 1) // n_workers)
+
+            # Pre-start one environment per worker. Environments are not thread safe, so each one
+            # is taken from the pool while a worker solves an hour and returned afterwards
+            envs = queue.Queue()
+            for _ in range(n_workers):
+                env = gp.Env(empty=True)
+                env.setParam('OutputFlag', 0)
+                env.start()
+                envs.put(env)
+
+            def solve_with_pooled_env(h):
+                env = envs.get()
+                try:
+                    return self.solve_hour(h, env=env, threads=threads_per_worker)
+                finally:
+                    envs.put(env)
+
+            try:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    hourly_results = dict(zip(self.data.H, executor.map(solve_with_pooled_env, self.data.H)))
+            finally:
+                while not envs.empty():
+                    envs.get().dispose()
+
+        # Merge the results of every hour
+        for h, result in hourly_results.items():
+            if result is None:
+                continue
+            bids[h], hour_violations, violation_count[h] = result
+            violations.update(hour_violations)
 
         # Save results
         self.results.bid_capacity = bids
@@ -309,7 +433,7 @@ class AncilliaryServiceBiddingModel():
     def run(self):
         # Makes sure the model is solved and saves the results
         try:
-            self.model.optimize()
+            self.solve()
             self.model.write("second_task/output/verification/ancilliary_model.lp")
             if self.model.status == gp.GRB.INFEASIBLE:
                 print("Model is infeasible; computing IIS")
@@ -323,7 +447,7 @@ class AncilliaryServiceBiddingModel():
             elif self.model.status == gp.GRB.OPTIMAL:
                 if self.verbose:
                     print("Optimization was successful!")
-                self.save_results()     
+                self.extract()     
             else:
                 raise TimeoutError("Gurobi optimization failed")       
         except gp.GurobiError as e:
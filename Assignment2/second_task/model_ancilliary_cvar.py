@@ -7,6 +7,10 @@ import numpy as np
 plt.rcParams['font.family'] = 'serif' 
 plt.rcParams['font.size'] = 14
 
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from timed_model import TimedModel
 from .input_data import InputData
 
 class Expando(object):
@@ -15,9 +19,18 @@ class Expando(object):
     '''
     pass
 
-class AncilliaryServiceBiddingModelCVAR():
+class AncilliaryServiceBiddingModelCVAR(TimedModel):
     
-    def __init__(self, input_data: InputData, verbose: bool = True):
+    def __init__(self, input_data: InputData, verbose: bool = True, cutting_plane: bool = False, tolerance: float = 1e-6, max_iterations: int = 1000):
+        """
+        Args:
+            input_data (InputData): Scenario data and P90 requirement.
+            verbose (bool): Print the building and solving steps.
+            cutting_plane (bool): Represent the CVaR constraint with aggregated cuts added iteratively
+                instead of one zeta variable and two constraints per (h, m, w).
+            tolerance (float): Violation below which a CVaR cut is not added.
+            max_iterations (int): Maximum number of cutting-plane iterations.
+        """
         if verbose:
             print()
             print('-' * 50)
@@ -29,6 +42,15 @@ class AncilliaryServiceBiddingModelCVAR():
         self.constraints = Expando()
         self.results = Expando()
         self.verbose = verbose
+        self.cutting_plane = cutting_plane
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+        # Consumption of every hour as a (minutes x scenarios) array
+        self.consumption = {
+            h: np.array([[self.data.insample_scenarios[h * 60 + m, w] for w in self.data.W] for m in self.data.M])
+            for h in self.data.H
+        }
         self.build_model()
     
     def build_variables(self):
@@ -45,6 +67,10 @@ class AncilliaryServiceBiddingModelCVAR():
             for h in self.data.H
         }
 
+        if self.cutting_plane:
+            # zeta is projected out: zeta[h,m,w] = max(bid_capacity[h] - consumption, beta[h], 0) at the optimum
+            return
+
         self.variables.zeta = {
             (h,m,w): self.model.addVar(vtype=GRB.CONTINUOUS, name=f"zeta_Hour{h}_Minute{m}_Scenario{w}")
             for h in self.data.H
@@ -54,7 +80,15 @@ class AncilliaryServiceBiddingModelCVAR():
         
     def build_constraints(self):
         # Create the constraints
+        if self.cutting_plane:
+            self.start_family('cvar_cuts')
+            # Start with the cut that takes bid_capacity - consumption as the active piece of every zeta
+            self.constraints.cvar_cuts = {h: [] for h in self.data.H}
+            for h in self.data.H:
+                self.add_cvar_cut(h, np.ones(self.consumption[h].shape, dtype=bool), np.zeros(self.consumption[h].shape, dtype=bool))
+            return
 
+        self.start_family('capacity_limit')
         self.constraints.capacity_limit = {
             (h, m, w): self.model.addConstr(
                 self.variables.bid_capacity[h] - self.data.insample_scenarios[h * 60 + m, w],
@@ -67,6 +101,7 @@ class AncilliaryServiceBiddingModelCVAR():
             for w in self.data.W
         }
 
+        self.start_family('violation_limit')
         self.constraints.violation_limit = {
             h: self.model.addConstr(sum(self.variables.zeta[h, m, w] for m in self.data.M for w in self.data.W)  * 
                                     (1/len(self.data.M) / len(self.data.W)),
@@ -77,6 +112,7 @@ class AncilliaryServiceBiddingModelCVAR():
         for h in self.data.H
         }
 
+        self.start_family('cvar_constraint')
         # Variable beta has to be lower or equal to the zeta variables for every minute and scenario in an hour
         self.constraints.cvar_constraint = {
             (h, m, w): self.model.addConstr(
@@ -90,6 +126,59 @@ class AncilliaryServiceBiddingModelCVAR():
         for w in self.data.W
         }
         
+    def add_cvar_cut(self, h, bid_active, beta_active):
+        """
+        Adds an aggregated cut of the CVaR constraint of hour h.
+
+        Every zeta[h,m,w] >= bid_capacity[h] - consumption, zeta >= beta[h] and zeta >= 0, so choosing
+        one of these pieces for every (m, w) gives a valid lower bound of the average zeta:
+            (|bid_active| * bid - sum(consumption[bid_active]) + |beta_active| * beta) / (M * W) <= (1 - epsilon) * beta
+        """
+        n_pairs = self.consumption[h].size
+        cut = self.model.addConstr(
+            (bid_active.sum() * self.variables.bid_capacity[h]
+             - self.consumption[h][bid_active].sum()
+             + beta_active.sum() * self.variables.beta[h]) / n_pairs,
+            GRB.LESS_EQUAL,
+            (1 - self.data.epsilon_requirement) * self.variables.beta[h],
+            name=f"cvar_cut_Hour{h}_{len(self.constraints.cvar_cuts[h])}"
+        )
+        self.constraints.cvar_cuts[h].append(cut)
+
+    def projected_zeta(self, h, bid, beta):
+        # Smallest zeta of every (m, w) that is feasible for the given bid and beta
+        return np.maximum(np.maximum(bid - self.consumption[h], beta), 0)
+
+    def separate_cvar_cuts(self):
+        # Adds the most violated cut of every hour whose CVaR constraint is not satisfied. Returns the number of cuts added
+        n_cuts = 0
+        for h in self.data.H:
+            bid = self.variables.bid_capacity[h].X
+            beta = self.variables.beta[h].X
+            bid_piece = bid - self.consumption[h]
+            zeta = self.projected_zeta(h, bid, beta)
+            violation = zeta.mean() - (1 - self.data.epsilon_requirement) * beta
+            if violation > self.tolerance * max(1, abs(beta)):
+                bid_active = (bid_piece >= beta) & (bid_piece > 0)
+                beta_active = ~bid_active & (beta > 0)
+                self.add_cvar_cut(h, bid_active, beta_active)
+                n_cuts += 1
+        return n_cuts
+
+    def run_cutting_plane(self):
+        # Solves the master problem and adds violated CVaR cuts until none is left
+        for it in range(1, self.max_iterations + 1):
+            self.solve()
+            if self.model.status != GRB.OPTIMAL:
+                return
+            n_cuts = self.separate_cvar_cuts()
+            if self.verbose:
+                print(f"Iteration {it}: objective {self.model.ObjVal:.4f}, {n_cuts} cuts added")
+            if n_cuts == 0:
+                return
+            self.model.update()
+        raise TimeoutError(f"CVaR cutting plane did not converge in {self.max_iterations} iterations")
+
     def build_objective_function(self):
         # Create the objective function
 
@@ -110,34 +199,28 @@ class AncilliaryServiceBiddingModelCVAR():
         self.model = gp.Model(name="AncilliaryServiceBiddingModelCVAR")
         self.model.setParam('OutputFlag', 0)
         
-        if self.verbose:
-            print("\nBuilding variables")
-        self.build_variables()
-
-        if self.verbose:
-            print("\nBuilding constraints")
-        self.build_constraints()
-        
-        if self.verbose:
-            print("\nBuilding objective function")
-        self.build_objective_function()
-
-        self.model.update()
-        if self.verbose:
-            print(f"Number of variables: {self.model.NumVars}")
-            print(f"Number of constraints: {self.model.NumConstrs}")
+        self.build_components(self.verbose)
 
     def save_results(self):
         self.results.bid_capacity = {
             h: self.variables.bid_capacity[h].X for h in self.data.H
         }
 
-        self.results.zeta = {
-            (h, m, w): self.variables.zeta[h, m, w].X
-            for h in self.data.H
-            for m in self.data.M
-            for w in self.data.W
-        }
+        if self.cutting_plane:
+            zeta = {h: self.projected_zeta(h, self.variables.bid_capacity[h].X, self.variables.beta[h].X) for h in self.data.H}
+            self.results.zeta = {
+                (h, m, w): zeta[h][i, j]
+                for h in self.data.H
+                for i, m in enumerate(self.data.M)
+                for j, w in enumerate(self.data.W)
+            }
+        else:
+            self.results.zeta = {
+                (h, m, w): self.variables.zeta[h, m, w].X
+                for h in self.data.H
+                for m in self.data.M
+                for w in self.data.W
+            }
         self.results.beta = {
             h: self.variables.beta[h].X for h in self.data.H
         }
@@ -190,7 +273,10 @@ class AncilliaryServiceBiddingModelCVAR():
     def run(self):
         # Makes sure the model is solved and saves the results
         try:
-            self.model.optimize()
+            if self.cutting_plane:
+                self.run_cutting_plane()
+            else:
+                self.solve()
             self.model.write("second_task/output/verification/ancilliary_model_cvar.lp")
             if self.model.status == gp.GRB.INFEASIBLE:
                 print("Model is infeasible; computing IIS")
@@ -204,7 +290,7 @@ class AncilliaryServiceBiddingModelCVAR():
             elif self.model.status == gp.GRB.OPTIMAL:
                 if self.verbose:
                     print("Optimization was successful!")
-                self.save_results()     
+                self.extract()     
             else:
                 raise TimeoutError("Gurobi optimization failed")       
         except gp.GurobiError as e:
@@ -4,6 +4,10 @@ import matplotlib.pyplot as plt
 
 from .input_data import *
 from .model_ancilliary import AncilliaryServiceBiddingModel
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from result_cache import ResultCache
 
 if __name__ == "__main__":
     start_time = time.time() # Start timer
@@ -14,6 +18,9 @@ if __name__ == "__main__":
     outsample_violations = []
     shortfall_violations = np.zeros(len(epsilons))
 
+    # Epsilons solved in a previous run with the same data and code are loaded from the cache
+    cache = ResultCache()
+
     for i, eps in enumerate(epsilons):
         print(f"\nRunning model with epsilon requirement: {eps:.2f}")
         input_data = InputData(
@@ -24,8 +31,7 @@ if __name__ == "__main__":
             epsilon_requirement=eps, 
             num_hours=1,
         )
-        model = AncilliaryServiceBiddingModel(input_data, verbose=False)
-        model.run_hourly()
+        model = cache.run(AncilliaryServiceBiddingModel, input_data, verbose=False, method='run_hourly')
         model.print_results()
 
         # Store optimal bid (sum over hours if more than one)
@@ -67,6 +73,7 @@ if __name__ == "__main__":
     plt.tight_layout()
     plt.show()
 
+    print(f"\nResult cache: {cache.hits} hits, {cache.misses} misses")
     end_time = time.time()
     print(f"\nTotal execution time: {end_time - start_time:.2f} seconds")
     print("End of main.py")
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Benchmark cases of every market model.
+
+Each case runs in its own process from the directory its models are run from (see worker.py), so the
+flat imports of the Assignment1 steps do not clash. A case function receives the Bench recorder of the
+worker and the size knobs, builds the input data and passes every model to bench.measure in the order
+in which the models are solved.
+"""
+import itertools
+from collections import namedtuple
+
+Case = namedtuple('Case', ['directory', 'function', 'quick', 'full'])
+
+# Columns of GeneratorData.csv that scale with the size of a unit
+CAPACITY_COLUMNS = ['Pmax (MW)', 'Pmin (MW)', 'R+ (MW)', 'R- (MW)', 'RU (MW/h)', 'RD (MW/h)']
+
+def replicate_generators(generators, k, prices=(), capacities=()):
+    """
+    Splits every unit into k identical units with 1/k of its capacity, so the number of generators grows
+    while the market stays the same. The units are renumbered 1..k*len(generators), as InputData expects.
+
+    Args:
+        generators (list): Generator records of input_data.
+        k (int): Number of copies of every unit.
+        prices (list): Dicts indexed by unit that are copied (bid offers, reserve bids).
+        capacities (list): Dicts indexed by unit that are scaled by 1/k (initial production).
+
+    Returns:
+        list: Replicated generator records.
+        list: Replicated price dicts.
+        list: Replicated capacity dicts.
+    """
+    if k == 1:
+        return generators, list(prices), list(capacities)
+
+    def scale(value):
+        return [v / k for v in value] if isinstance(value, list) else value / k
+
+    units, new_prices, new_capacities = [], [{} for _ in prices], [{} for _ in capacities]
+    for copy in range(k):
+        for gen in generators:
+            unit = dict(gen)
+            unit['Unit #'] = copy * len(generators) + gen['Unit #']
+            for column in CAPACITY_COLUMNS:
+                unit[column] = scale(gen[column])
+            units.append(unit)
+            for new, old in zip(new_prices, prices):
+                new[unit['Unit #']] = old[gen['Unit #']]
+            for new, old in zip(new_capacities, capacities):
+                new[unit['Unit #']] = old[gen['Unit #']] / k
+    return units, new_prices, new_capacities
+
+# --------------------------------------------------------------------------------
+#       ASSIGNMENT 1
+# --------------------------------------------------------------------------------
+
+def scaled_inputs(buses):
+    # Inputs of the 24-bus system replicated buses / 24 times (see Assignment1/scaled_instance.py)
+    import os, sys
+    sys.path.append(os.path.join(os.getcwd(), '..'))
+    from scaled_instance import scaled_inputs
+    return scaled_inputs(buses)
+
+def copper_plate(bench, hours=1, generators=1, buses=24):
+    from input_data import InputData, generators as units, bid_offers, system_demand, demand_per_load
+    from model import Step1_model
+    if buses != 24:
+        inputs = scaled_inputs(buses)
+        units, bid_offers, system_demand = inputs['generators'], inputs['bid_offers'], inputs['system_demand']
+        demand_per_load = {d: share for (d, n), share in inputs['demand_per_load'].items()}
+    units, (bid_offers,), _ = replicate_generators(units, generators, prices=[bid_offers])
+    input_data = InputData(units, bid_offers, system_demand, demand_per_load, num_hours=hours)
+    bench.measure(lambda: Step1_model(input_data))
+
+def battery(bench, hours=24, generators=1):
+    from input_data import InputData, generators as units, bid_offers, system_demand, demand_per_load, p_initial
+    from model import Step2_model
+    units, (bid_offers,), (p_initial,) = replicate_generators(units, generators, prices=[bid_offers], capacities=[p_initial])
+    input_data = InputData(units, bid_offers, system_demand, demand_per_load, p_initial, num_hours=hours)
+    bench.measure(lambda: Step2_model(input_data))
+
+def nodal(bench, hours=24, generators=1, buses=24):
+    from input_data import InputData, generators as units, bid_offers, system_demand, demand_per_load, bus_reactance, bus_capacity
+    from model import Step3_model
+    if buses != 24:
+        inputs = scaled_inputs(buses)
+        units, bid_offers, system_demand = inputs['generators'], inputs['bid_offers'], inputs['system_demand']
+        demand_per_load, bus_reactance, bus_capacity = inputs['demand_per_load'], inputs['bus_reactance'], inputs['bus_capacity']
+    units, (bid_offers,), _ = replicate_generators(units, generators, prices=[bid_offers])
+    input_data = InputData(units, bid_offers, system_demand, demand_per_load, bus_reactance, bus_capacity, num_hours=hours)
+    bench.measure(lambda: Step3_model(input_data))
+
+def zonal(bench, hours=1, generators=1, buses=24):
+    from input_data import InputData, generators as units, bid_offers, system_demand, demand_per_load, bus_reactance, bus_capacity, zone_mapping
+    from model import Step3_zonal
+    if buses != 24:
+        inputs = scaled_inputs(buses)
+        units, bid_offers, system_demand = inputs['generators'], inputs['bid_offers'], inputs['system_demand']
+        demand_per_load, bus_reactance, bus_capacity = inputs['demand_per_load'], inputs['bus_reactance'], inputs['bus_capacity']
+        zone_mapping = inputs['zone_mapping']
+    units, (bid_offers,), _ = replicate_generators(units, generators, prices=[bid_offers])
+    input_data = InputData(units, bid_offers, system_demand, demand_per_load, bus_reactance, bus_capacity, zone_mapping, num_hours=hours)
+    bench.measure(lambda: Step3_zonal(input_data))
+
+def unit_commitment(bench, hours=24, generators=1, mip_start=True):
+    from input_data import InputData, generators as units, bid_offers, system_demand, demand_per_load, p_initial
+    from model import UnitCommitment_model
+    units, (bid_offers,), (p_initial,) = replicate_generators(units, generators, prices=[bid_offers], capacities=[p_initial])
+    input_data = InputData(units, bid_offers, system_demand, demand_per_load, p_initial, num_hours=hours)
+    bench.measure(lambda: UnitCommitment_model(input_data, mip_start=mip_start))
+
+def day_ahead_regulation(bench, hours=1, generators=1):
+    from input_data_day_ahead import InputDataDayAhead, generators as units, bid_offers, system_demand, demand_per_load
+    from input_data_regulation import InputDataRegulation
+    from day_ahead_model import DayAheadModel
+    from regulation_model import RegulationModel
+    units, (bid_offers,), _ = replicate_generators(units, generators, prices=[bid_offers])
+    input_data = InputDataDayAhead(units, bid_offers, system_demand, demand_per_load, num_hours=hours)
+    day_ahead = bench.measure(lambda: DayAheadModel(input_data))
+    bench.measure(lambda: RegulationModel(day_ahead, InputDataRegulation(day_ahead)))
+
+def reserve_day_ahead(bench, hours=1, generators=1):
+    from input_data import InputData, generators as units, bid_offers, system_demand, demand_per_load, bid_reserve_up, bid_reserve_down
+    from reserve_model import ReserveModel
+    from day_ahead_model import Step6_model
+    units, (bid_offers, bid_reserve_up, bid_reserve_down), _ = replicate_generators(units, generators, prices=[bid_offers, bid_reserve_up, bid_reserve_down])
+    input_data = InputData(units, bid_offers, system_demand, demand_per_load, bid_reserve_up, bid_reserve_down, num_hours=hours)
+    reserve = bench.measure(lambda: ReserveModel(input_data))
+    bench.measure(lambda: Step6_model(input_data, reserve.results))
+
+# --------------------------------------------------------------------------------
+#       ASSIGNMENT 2
+# --------------------------------------------------------------------------------
+
+def bidding_input_data(model_type, scenarios, seed=0):
+    # Input data with a fixed random sample of the scenario combinations
+    import random
+    from first_task.input_data import InputData, T, all_combinations
+    random.seed(seed)
+    sample = all_combinations.materialize(all_combinations.sample(scenarios))
+    return InputData(T, list(sample), sample, 1/scenarios, model_type=model_type)
+
+def one_price(bench, scenarios=100):
+    from first_task.model_one_price import OnePriceBiddingModel
+    input_data = bidding_input_data('one_price', scenarios)
+    bench.measure(lambda: OnePriceBiddingModel(input_data, verbose=False))
+
+def two_price(bench, scenarios=100):
+    from first_task.model_two_price import TwoPriceBiddingModel
+    input_data = bidding_input_data('two_price', scenarios)
+    bench.measure(lambda: TwoPriceBiddingModel(input_data, verbose=False))
+
+def risk_averse(bench, scenarios=100, model_type='two_price', beta=0.5):
+    from first_task.model_risk_averse import RiskAverseExPostAnalysis
+    input_data = bidding_input_data(model_type, scenarios)
+    bench.measure(lambda: RiskAverseExPostAnalysis(input_data, beta=beta, alpha=0.9, verbose=False))
+
+def ancillary_input_data(profiles):
+    # Input data with the first in-sample profiles
+    from second_task.input_data import InputData, insample_scenarios, out_of_sample_scenarios, prob_scenarios_outsample
+    available = len({w for m, w in insample_scenarios})
+    if profiles > available:
+        raise ValueError(f"Only {available} in-sample profiles are available, {profiles} were requested")
+    scenarios = {(m, w): value for (m, w), value in insample_scenarios.items() if w < profiles}
+    return InputData(scenarios, out_of_sample_scenarios, [1/profiles for _ in range(profiles)], prob_scenarios_outsample,
+                     epsilon_requirement=0.1, num_hours=1)
+
+def ancillary(bench, profiles=50, formulation='big_m'):
+    from second_task.model_ancilliary import AncilliaryServiceBiddingModel
+    input_data = ancillary_input_data(profiles)
+    bench.measure(lambda: AncilliaryServiceBiddingModel(input_data, verbose=False, formulation=formulation))
+
+def ancillary_cvar(bench, profiles=50, cutting_plane=False):
+    from second_task.model_ancilliary_cvar import AncilliaryServiceBiddingModelCVAR
+    input_data = ancillary_input_data(profiles)
+    bench.measure(lambda: AncilliaryServiceBiddingModelCVAR(input_data, verbose=False, cutting_plane=cutting_plane),
+                  solve=lambda model: model.run_cutting_plane() if cutting_plane else model.solve())
+
+# Knob grids of every case. The quick grid is a smoke test that also fits a size-limited Gurobi license
+CASES = {
+    'copper_plate': Case('Assignment1/step1', copper_plate,
+        quick={'hours': [24], 'generators': [1]},
+        full={'hours': [1, 24], 'generators': [1, 10, 100]}),
+    'copper_plate_scaled': Case('Assignment1/step1', copper_plate,
+        quick={'buses': [240]},
+        full={'hours': [1, 24], 'buses': [240, 2400, 24000]}),
+    'battery': Case('Assignment1/step2', battery,
+        quick={'hours': [12], 'generators': [1]},
+        full={'hours': [6, 24], 'generators': [1, 10, 100]}),
+    'nodal': Case('Assignment1/step3_nodal', nodal,
+        quick={'hours': [6], 'generators': [1]},
+        full={'hours': [6, 24], 'generators': [1, 10, 100]}),
+    'nodal_scaled': Case('Assignment1/step3_nodal', nodal,
+        quick={'hours': [1], 'buses': [48]},
+        full={'hours': [1, 24], 'buses': [240, 2400, 24000]}),
+    'zonal': Case('Assignment1/step3_zonal', zonal,
+        quick={'hours': [12], 'generators': [1]},
+        full={'hours': [1, 24], 'generators': [1, 10, 100]}),
+    'zonal_scaled': Case('Assignment1/step3_zonal', zonal,
+        quick={'hours': [1], 'buses': [240]},
+        full={'hours': [1, 24], 'buses': [240, 2400, 24000]}),
+    'unit_commitment': Case('Assignment1/unit_commitment', unit_commitment,
+        quick={'hours': [12], 'mip_start': [True]},
+        full={'hours': [24, 72, 168], 'mip_start': [True, False]}),
+    'day_ahead_regulation': Case('Assignment1/step5', day_ahead_regulation,
+        quick={'hours': [1], 'generators': [1]},
+        full={'hours': [1, 24], 'generators': [1, 10, 100]}),
+    'reserve_day_ahead': Case('Assignment1/step6', reserve_day_ahead,
+        quick={'hours': [1], 'generators': [1]},
+        full={'hours': [1, 24], 'generators': [1, 10, 100]}),
+    'one_price': Case('Assignment2', one_price,
+        quick={'scenarios': [40]},
+        full={'scenarios': [100, 500, 2420]}),
+    'two_price': Case('Assignment2', two_price,
+        quick={'scenarios': [15]},
+        full={'scenarios': [100, 500, 2420]}),
+    'risk_averse': Case('Assignment2', risk_averse,
+        quick={'scenarios': [15]},
+        full={'scenarios': [100, 500, 2420], 'model_type': ['one_price', 'two_price']}),
+    'ancillary': Case('Assignment2', ancillary,
+        quick={'profiles': [10]},
+        full={'profiles': [25, 50, 100], 'formulation': ['big_m', 'tight_big_m']}),
+    'ancillary_cvar': Case('Assignment2', ancillary_cvar,
+        quick={'profiles': [10], 'cutting_plane': [False, True]},
+        full={'profiles': [25, 50, 100], 'cutting_plane': [False, True]}),
+}
+
+def expand(grid):
+    # Every combination of the knob values of a grid
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def case_key(name, knobs):
+    # Identifier of a case and its knobs in the results and the baseline
+    return name + ''.join(f'[{knob}={value}]' for knob, value in sorted(knobs.items()))
@@ -0,0 +1,152 @@
+"""
+Benchmark suite of the market models.
+
+Every case is run in a separate process for every combination of its size knobs (see cases.py). The build,
+solve and extract times and the peak memory are written to a JSON file and compared with a baseline:
+
+    python benchmarks/run.py                                  # quick grid of every case
+    python benchmarks/run.py --suite full --case nodal --repeat 3
+    python benchmarks/run.py --suite full --save-baseline     # stores the results as the new baseline
+
+The exit code is 1 if a case fails or is slower (or uses more memory) than the baseline by more than the tolerance.
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+import tempfile
+from datetime import datetime
+
+import gurobipy as gp
+
+from cases import CASES, expand, case_key
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(benchmark_dir)
+worker_path = os.path.join(benchmark_dir, 'worker.py')
+
+# Compared metrics and the smallest increase that counts as a regression, to ignore noise in small cases
+METRICS = {'build': 0.05, 'solve': 0.05, 'extract': 0.05, 'peak_memory_mb': 10}
+
+def run_case(name, knobs, timeout=None):
+    # Runs the case once in a new process, from the directory of its models
+    case = CASES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'result.json')
+        try:
+            process = subprocess.run(
+                [sys.executable, worker_path, name, json.dumps(knobs), output],
+                cwd=os.path.join(root_dir, case.directory), capture_output=True, text=True, timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return {'error': f'Timed out after {timeout} s'}
+        if not os.path.exists(output):
+            return {'error': process.stderr.strip() or f'Worker exited with code {process.returncode}'}
+        with open(output) as f:
+            return json.load(f)
+
+def run_repeated(name, knobs, repeat=1, timeout=None):
+    # Best of repeat runs. The minimum is the least noisy estimate of every metric
+    runs = [run_case(name, knobs, timeout) for _ in range(repeat)]
+    errors = [run['error'] for run in runs if 'error' in run]
+    if errors:
+        return {'case': name, 'knobs': knobs, 'error': errors[0]}
+    result = {'case': name, 'knobs': knobs, 'repeat': repeat}
+    for metric in list(METRICS) + ['peak_rss_mb']:
+        values = [run[metric] for run in runs if run[metric] is not None]
+        result[metric] = min(values) if values else None
+    result['optimal'] = all(run['optimal'] for run in runs)
+    result['models'] = min(runs, key=lambda run: run['solve'])['models']
+    return result
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root_dir, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'gurobi': '.'.join(str(v) for v in gp.gurobi.version()),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Compares every metric of the results with the baseline.
+
+    Returns:
+        list: (case key, metric, baseline value, new value) of the metrics that are worse than
+            baseline * (1 + tolerance) by more than the minimum increase in METRICS.
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None or 'error' in result or 'error' in reference:
+            continue
+        for metric, min_increase in METRICS.items():
+            old, new = reference.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > min_increase:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+def print_results(results, baseline):
+    print(f"\n{'Case':<60}{'Build [s]':>11}{'Solve [s]':>11}{'Extract [s]':>12}{'Memory [MB]':>13}{'Solve vs baseline':>19}")
+    for key, result in results.items():
+        if 'error' in result:
+            print(f"{key:<60}ERROR: {result['error'].strip().splitlines()[-1]}")
+            continue
+        memory = f"{result['peak_memory_mb']:.1f}" if result['peak_memory_mb'] is not None else '-'
+        change = ''
+        reference = baseline.get(key)
+        if reference is not None and reference.get('solve'):
+            change = f"{(result['solve'] / reference['solve'] - 1) * 100:+.1f}%"
+        print(f"{key:<60}{result['build']:>11.3f}{result['solve']:>11.3f}{result['extract']:>12.3f}{memory:>13}{change:>19}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite of the market models")
+    parser.add_argument('--suite', choices=['quick', 'full'], default='quick', help="Knob grid of every case")
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help="Only run this case (can be repeated)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs of every configuration, the best one is kept")
+    parser.add_argument('--timeout', type=float, default=None, help="Time limit of every run [s]")
+    parser.add_argument('--output', default=os.path.join(benchmark_dir, 'results.json'))
+    parser.add_argument('--baseline', default=os.path.join(benchmark_dir, 'baseline.json'))
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Relative increase that counts as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.case or CASES:
+        for knobs in expand(getattr(CASES[name], args.suite)):
+            key = case_key(name, knobs)
+            print(f"Running {key}", flush=True)
+            results[key] = run_repeated(name, knobs, args.repeat, args.timeout)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    output = {'metadata': metadata(), 'suite': args.suite, 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    print_results(results, baseline)
+    print(f"\nResults written to {os.path.relpath(args.output)}")
+
+    failed = [key for key, result in results.items() if 'error' in result]
+    regressions = compare(results, baseline, args.tolerance)
+    for key, metric, old, new in regressions:
+        print(f"REGRESSION {key} {metric}: {old:.3f} -> {new:.3f} ({(new / old - 1) * 100:+.1f}%)")
+    if not baseline and not args.save_baseline:
+        print(f"No baseline found at {os.path.relpath(args.baseline)}, run with --save-baseline to store one")
+    sys.exit(1 if failed or regressions else 0)
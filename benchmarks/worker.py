@@ -0,0 +1,98 @@
+"""
+Runs a single benchmark case in the current process and writes its measurements as JSON.
+It is started by run.py from the directory of the case:
+
+    python worker.py <case> <knobs as JSON> <output file>
+"""
+import os
+import sys
+import json
+import time
+import traceback
+
+from gurobipy import GRB
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# The models of the case are imported from the directory the worker is started from
+sys.path.insert(0, os.getcwd())
+from cases import CASES
+
+def peak_rss_mb():
+    # Peak resident memory of the process so far
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+class Bench:
+    # Records the build, solve and extract times of every model of a case
+    def __init__(self):
+        self.models = []
+        self.rss_before = None
+
+    def measure(self, factory, solve=None):
+        """
+        Builds a model with factory, solves it with solve (model.solve by default) and extracts the results.
+
+        Returns:
+            The solved model, to build the models that depend on its results.
+        """
+        if self.rss_before is None:
+            self.rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        model = factory()
+        build_time = time.perf_counter() - start
+
+        model.model.setParam('OutputFlag', 0)
+        if solve is None:
+            model.solve()
+        else:
+            solve(model)
+        status = model.model.status
+        if status == GRB.OPTIMAL:
+            model.extract()
+
+        profile = model.profile
+        self.models.append({
+            'model': profile['model'],
+            'status': status,
+            'build': build_time,
+            'solve': profile['phases'].get('solve', 0),
+            'extract': profile['phases'].get('extract', 0),
+            'phases': profile['phases'],
+            'constraint_families': profile['constraint_families'],
+            'statistics': profile['statistics'],
+            'solves': profile['solves'],
+            'mip_gap': profile['statistics'].get('MIPGap'),
+        })
+        return model
+
+    def summary(self):
+        peak = peak_rss_mb()
+        return {
+            'build': sum(model['build'] for model in self.models),
+            'solve': sum(model['solve'] for model in self.models),
+            'extract': sum(model['extract'] for model in self.models),
+            'peak_rss_mb': peak,
+            'peak_memory_mb': None if peak is None else peak - self.rss_before,
+            'optimal': all(model['status'] == GRB.OPTIMAL for model in self.models),
+            'models': self.models,
+        }
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        raise ValueError("Usage: python worker.py <case> <knobs as JSON> <output file>")
+
+    name, knobs, output = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3]
+    bench = Bench()
+    try:
+        CASES[name].function(bench, **knobs)
+        result = bench.summary()
+    except Exception:
+        result = {'error': traceback.format_exc()}
+    with open(output, 'w') as f:
+        json.dump(result, f)
@@ -0,0 +1,418 @@
+"""
+Content-addressed cache of model results.
+
+A model run is identified by a hash of the model class, its input data and parameters and the version of the
+code (the source of the modules of this repository that are loaded, except the running script, so a change in a
+plot does not invalidate the cache). The functions passed to memoize are hashed by their source, so editing a
+function of the running script does invalidate its entries. The results are stored on disk as compressed numpy arrays, one .npz file
+per run, and the least recently used entries are evicted when the cache grows over its size limit:
+
+    cache = ResultCache()
+    model = cache.run(Step2_model, input_data)      # builds and solves only if this run is not cached
+    prices = model.results.price
+
+    frontier = cache.memoize('frontier', lambda: model.solve_frontier(betas), input_data, betas)
+
+On a hit, run() returns an instance of the model class with data, results, profile and the plain attributes
+of the original run (verbose, alpha, ...), but without the Gurobi model, variables or constraints.
+The cache is disabled with the environment variable RESULT_CACHE=0 and cleared with
+
+    python result_cache.py --clear
+
+The module is shared by both assignments, whose scripts add the root of the repository to sys.path to import it.
+"""
+import os
+import io
+import sys
+import json
+import time
+import hashlib
+import inspect
+import argparse
+import importlib
+
+import numpy as np
+import pandas as pd
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(CODE_DIR, '.cache', 'results')
+MAX_BYTES = 1024 ** 3
+
+# Model attributes that are not restored on a hit
+MODEL_ATTRIBUTES = ['model', 'variables', 'constraints', 'data', 'results', 'profile']
+
+class Expando(object):
+    '''
+        A small class which can have attributes set
+    '''
+    pass
+
+# --------------------------------------------------------------------------------
+#       HASHING
+# --------------------------------------------------------------------------------
+
+def is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+def fingerprint(value, digest, seen=None):
+    # Feeds a canonical representation of value to digest. Gurobi objects (the model, variables, expressions) are skipped
+    seen = set() if seen is None else seen
+    kind = type(value)
+    if kind.__module__.startswith('gurobipy'):
+        digest.update(b'gurobi')
+    elif value is None or isinstance(value, (bool, np.bool_, str, bytes)) or is_number(value):
+        digest.update(f'{kind.__name__}:{value!r};'.encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'array:{value.dtype}:{value.shape};'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(f'{kind.__name__}:{list(getattr(value, "columns", [value.name]))!r};'.encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError:  # Unhashable cells, e.g. lists
+            fingerprint(value.to_dict(), digest, seen)
+    elif inspect.isfunction(value):
+        # Source of the function and of the functions of its module that it calls, so that an edit of a function of
+        # the running script (which is not part of code_version) changes the key. The values it reads are not hashed
+        if id(value) in seen:
+            digest.update(b'cycle;')
+            return
+        seen.add(id(value))
+        digest.update(f'function:{value.__module__}.{value.__qualname__};'.encode())
+        try:
+            digest.update(inspect.getsource(value).encode())
+        except (OSError, TypeError):  # No source file, e.g. defined in an interactive session
+            digest.update(value.__code__.co_code)
+        for name in sorted(global_names(value.__code__)):
+            item = value.__globals__.get(name)
+            if inspect.isfunction(item) and item.__module__ == value.__module__:
+                fingerprint(item, digest, seen)
+    elif inspect.isclass(value) or inspect.isroutine(value):
+        digest.update(f'code:{getattr(value, "__module__", "")}.{getattr(value, "__qualname__", value)!r};'.encode())
+    elif id(value) in seen:
+        digest.update(b'cycle;')
+    else:
+        seen.add(id(value))
+        if isinstance(value, dict):
+            digest.update(f'dict:{len(value)};'.encode())
+            for key, item in value.items():
+                fingerprint(key, digest, seen)
+                fingerprint(item, digest, seen)
+        elif isinstance(value, (list, tuple)):
+            digest.update(f'{kind.__name__}:{len(value)};'.encode())
+            if value and all(is_number(item) for item in value):
+                digest.update(np.asarray(value, dtype=float).tobytes())
+            else:
+                for item in value:
+                    fingerprint(item, digest, seen)
+        elif isinstance(value, (set, frozenset)):
+            digest.update(f'set:{len(value)};'.encode())
+            for item in sorted(value, key=repr):
+                fingerprint(item, digest, seen)
+        elif hasattr(value, '__dict__'):
+            # Private attributes are lazily computed caches (e.g. InputData._scenario_arrays), not inputs
+            digest.update(f'object:{kind.__module__}.{kind.__qualname__};'.encode())
+            fingerprint({name: item for name, item in vars(value).items() if not name.startswith('_')}, digest, seen)
+        else:
+            digest.update(f'{kind.__name__}:{value!r};'.encode())
+
+def global_names(code):
+    # Global names used by a code object and by the functions, lambdas and comprehensions defined in it
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= global_names(constant)
+    return names
+
+def code_version(code_dir=CODE_DIR):
+    # Hash of the source of the loaded modules of code_dir, except the running script
+    digest = hashlib.sha256()
+    main = os.path.abspath(getattr(sys.modules.get('__main__'), '__file__', '') or '')
+    files = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and path.endswith('.py'):
+            path = os.path.abspath(path)
+            if path.startswith(code_dir + os.sep) and path != main:
+                files.add(path)
+    for path in sorted(files):
+        with open(path, 'rb') as f:
+            digest.update(os.path.relpath(path, code_dir).encode())
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+# --------------------------------------------------------------------------------
+#       ENCODING
+# --------------------------------------------------------------------------------
+
+class Encoder:
+    # Splits a value into a JSON tree and the numeric arrays it references
+    def __init__(self):
+        self.arrays = {}
+
+    def array(self, values):
+        name = f'a{len(self.arrays)}'
+        self.arrays[name] = values
+        return name
+
+    def keys(self, keys):
+        # Integer keys and tuples of integers are stored as arrays, anything else in the JSON tree
+        if keys and all(is_number(k) and float(k).is_integer() for k in keys):
+            return {'array': self.array(np.asarray(keys, dtype=np.int64))}
+        if keys and all(isinstance(k, tuple) for k in keys) and len({len(k) for k in keys}) == 1 \
+                and all(is_number(i) and float(i).is_integer() for k in keys for i in k):
+            return {'tuples': self.array(np.asarray(keys, dtype=np.int64))}
+        return {'list': [self.encode(k) for k in keys]}
+
+    def encode(self, value):
+        if value is None or isinstance(value, (bool, str)):
+            return {'value': value}
+        if isinstance(value, np.bool_):
+            return {'value': bool(value)}
+        if is_number(value):
+            return {'value': value.item() if isinstance(value, np.generic) else value}
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            return {'ndarray': self.array(value)}
+        if isinstance(value, pd.DataFrame):
+            return {'frame': self.encode(value.to_numpy()), 'index': self.encode(list(value.index)),
+                    'columns': self.encode(list(value.columns))}
+        if isinstance(value, pd.Series):
+            return {'series': self.encode(value.to_numpy()), 'index': self.encode(list(value.index)), 'name': self.encode(value.name)}
+        if isinstance(value, np.ndarray):
+            try:
+                return {'ndarray': self.array(value.astype(float))}
+            except (TypeError, ValueError):
+                return {'objects': self.encode(value.tolist())}
+        if isinstance(value, dict):
+            keys, items = list(value), list(value.values())
+            if items and all(is_number(item) for item in items):
+                return {'dict': self.keys(keys), 'values': self.array(np.asarray(items))}
+            return {'dict': self.keys(keys), 'items': [self.encode(item) for item in items]}
+        if isinstance(value, (list, tuple)):
+            kind = 'tuple' if isinstance(value, tuple) else 'list'
+            if value and all(is_number(item) for item in value):
+                return {kind: self.array(np.asarray(value))}
+            return {kind: [self.encode(item) for item in value]}
+        if hasattr(value, '__dict__') and not type(value).__module__.startswith('gurobipy'):
+            kind = type(value)
+            return {'object': f'{kind.__module__}:{kind.__qualname__}', 'attributes': self.encode(vars(value))}
+        raise TypeError(f"Cannot cache values of type {type(value).__name__}")
+
+def decode(node, arrays):
+    # Rebuilds the value of an encoded JSON tree
+    if 'value' in node:
+        return node['value']
+    if 'ndarray' in node:
+        return arrays[node['ndarray']]
+    if 'frame' in node:
+        return pd.DataFrame(decode(node['frame'], arrays), index=decode(node['index'], arrays), columns=decode(node['columns'], arrays))
+    if 'series' in node:
+        return pd.Series(decode(node['series'], arrays), index=decode(node['index'], arrays), name=decode(node['name'], arrays))
+    if 'objects' in node:
+        return np.array(decode(node['objects'], arrays), dtype=object)
+    if 'dict' in node:
+        keys = decode_keys(node['dict'], arrays)
+        items = arrays[node['values']].tolist() if 'values' in node else [decode(item, arrays) for item in node['items']]
+        return dict(zip(keys, items))
+    for kind, container in [('list', list), ('tuple', tuple)]:
+        if kind in node:
+            values = node[kind]
+            return container(arrays[values].tolist() if isinstance(values, str) else [decode(item, arrays) for item in values])
+    if 'object' in node:
+        module, name = node['object'].split(':')
+        kind = importlib.import_module(module)
+        for part in name.split('.'):
+            kind = getattr(kind, part)
+        value = kind.__new__(kind)
+        value.__dict__.update(decode(node['attributes'], arrays))
+        return value
+    raise ValueError(f"Unknown cache node {sorted(node)}")
+
+def decode_keys(node, arrays):
+    if 'array' in node:
+        return arrays[node['array']].tolist()
+    if 'tuples' in node:
+        return [tuple(key) for key in arrays[node['tuples']].tolist()]
+    return [decode(key, arrays) for key in node['list']]
+
+# --------------------------------------------------------------------------------
+#       CACHE
+# --------------------------------------------------------------------------------
+
+class ResultCache:
+    """
+    Results of model runs on disk, addressed by the hash of their inputs and of the code version.
+
+    Args:
+        directory (str): Folder of the entries. Defaults to .cache/results next to this file.
+        max_bytes (int): Size limit of the folder. The least recently used entries are evicted above it.
+        version (str): Code version included in every key. Defaults to code_version() when the first key is computed.
+        enabled (bool): If False every lookup is a miss and nothing is stored. Defaults to RESULT_CACHE != 0.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = MAX_BYTES, version: str = None, enabled: bool = None):
+        self.directory = directory or os.environ.get('RESULT_CACHE_DIR', CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.enabled = enabled if enabled is not None else os.environ.get('RESULT_CACHE', '1') != '0'
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts):
+        # Hash of the parts and the code version
+        if self.version is None:
+            self.version = code_version()
+        digest = hashlib.sha256(self.version.encode())
+        fingerprint(parts, digest)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def load(self, key):
+        # Decoded entry or None. A hit marks the entry as recently used
+        path = self.path(key)
+        if not self.enabled or not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                arrays = {name: archive[name] for name in archive.files}
+            meta = json.loads(arrays.pop('__meta__').tobytes().decode())
+            entry = decode(meta, arrays)
+        except (OSError, ValueError, KeyError, ImportError, AttributeError):
+            # Unreadable entry, e.g. written by an interrupted run or from a class that no longer exists
+            os.remove(path)
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return entry
+
+    def store(self, key, entry):
+        # Writes the entry atomically and evicts the least recently used entries above the size limit
+        if not self.enabled:
+            return False
+        encoder = Encoder()
+        try:
+            meta = encoder.encode(entry)
+        except TypeError as error:
+            print(f"Result cache: not stored ({error})")
+            return False
+        arrays = dict(encoder.arrays)
+        arrays['__meta__'] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+
+        os.makedirs(self.directory, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        temporary = f'{self.path(key)}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(temporary, self.path(key))
+        self.evict()
+        return True
+
+    def entries(self):
+        # (path, size, last use) of every entry, least recently used first
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                status = os.stat(os.path.join(self.directory, name))
+                entries.append((os.path.join(self.directory, name), status.st_size, status.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        # Removes the least recently used entries until the cache fits in max_bytes
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        # Removes every entry, e.g. after a change of the code outside this folder
+        return self.evict(0)
+
+    def memoize(self, name, compute, *inputs):
+        """
+        Cached value of compute(). The value is identified by name, the source of compute and the inputs it
+        depends on, so every value that compute reads (also through its closure or the globals of the script)
+        must be passed in inputs. The value can be made of numbers, strings, arrays, DataFrames, lists and dicts.
+        """
+        key = self.key('memoize', name, compute, inputs)
+        entry = self.load(key)
+        if entry is not None:
+            return entry['value']
+        value = compute()
+        self.store(key, {'value': value})
+        return value
+
+    def run(self, model_class, *args, method='run', **kwargs):
+        """
+        Builds model_class(*args, **kwargs) and calls its method (run by default), unless a run with the same
+        inputs is cached. Then the model is restored from the cache without building or solving it.
+
+        Returns:
+            The model. model.profile['cache'] is 'hit' or 'miss'.
+        """
+        key = self.key('run', model_class, method, args, kwargs)
+        entry = self.load(key)
+        if entry is not None:
+            model = model_class.__new__(model_class)
+            model.__dict__.update(entry['attributes'])
+            model.data = self.input_data(model_class, args, kwargs)
+            model.variables = Expando()
+            model.constraints = Expando()
+            model.results = Expando()
+            model.results.__dict__.update(entry['results'])
+            model.profile = dict(entry['profile'], cache='hit')
+            return model
+
+        start = time.perf_counter()
+        model = model_class(*args, **kwargs)
+        getattr(model, method)()
+        attributes = {name: value for name, value in vars(model).items()
+                      if name not in MODEL_ATTRIBUTES and not name.startswith('_')
+                      and (value is None or isinstance(value, (bool, str)) or is_number(value))}
+        profile = dict(getattr(model, 'profile', {}), elapsed=time.perf_counter() - start)
+        # A run that saved no results (e.g. a failed solve) is not cached
+        if vars(model.results):
+            self.store(key, {'attributes': attributes, 'results': vars(model.results), 'profile': profile})
+        model.profile = dict(profile, cache='miss')
+        return model
+
+    def input_data(self, model_class, args, kwargs):
+        # Input data of a restored model: the input_data argument, or the first one
+        try:
+            arguments = inspect.signature(model_class.__init__).bind(None, *args, **kwargs).arguments
+        except TypeError:
+            return args[0] if args else None
+        if 'input_data' in arguments:
+            return arguments['input_data']
+        values = [value for name, value in arguments.items() if name != 'self']
+        return values[0] if values else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Result cache of the models")
+    parser.add_argument('--directory', default=os.environ.get('RESULT_CACHE_DIR', CACHE_DIR))
+    parser.add_argument('--clear', action='store_true', help="Remove every entry")
+    parser.add_argument('--max-mb', type=float, default=None, help="Evict the least recently used entries above this size")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.directory)
+    if args.clear:
+        print(f"Removed {cache.clear()} entries")
+    elif args.max_mb is not None:
+        print(f"Removed {cache.evict(int(args.max_mb * 1024 ** 2))} entries")
+    print(f"{len(cache.entries())} entries, {cache.size() / 1024 ** 2:.1f} MB in {cache.directory}")
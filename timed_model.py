@@ -0,0 +1,124 @@
+# Shared by the models of both assignments, which add the repository root to sys.path to import it
+import os
+import json
+import time
+from contextlib import contextmanager
+
+import gurobipy as gp
+
+# Gurobi attributes saved in the profile after building and after every solve
+STATISTICS = ['NumVars', 'NumConstrs', 'NumNZs', 'Runtime', 'IterCount', 'NodeCount', 'MIPGap']
+
+class TimedModel:
+    '''
+        Base class of the optimization models. It builds the model phase by phase and times the
+        variables, every constraint family, the objective function, the solve and the result extraction.
+
+        The timings and the Gurobi statistics are kept in self.profile:
+            {'model': class name,
+             'phases': {'variables', 'constraints', 'objective', 'update', 'solve', 'extract': seconds},
+             'constraint_families': {name: {'time': seconds, 'count': number of constraints}},
+             'statistics': {'NumVars', 'NumConstrs', 'NumNZs', 'Runtime', 'IterCount', 'NodeCount', 'MIPGap'},
+             'solves': number of solves}
+        Subclasses create self.model and define build_variables, build_constraints, build_objective_function
+        and save_results. Inside build_constraints every family starts with self.start_family(name).
+    '''
+
+    def reset_profile(self):
+        self.profile = {
+            'model': type(self).__name__,
+            'phases': {},
+            'constraint_families': {},
+            'statistics': {},
+            'solves': 0,
+        }
+        self._family = None
+        self._timing_families = False
+
+    @contextmanager
+    def timed(self, phase):
+        # Adds the wall time of the block to the phase, so repeated solves accumulate
+        if not hasattr(self, 'profile'):
+            self.reset_profile()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = self.profile['phases']
+            phases[phase] = phases.get(phase, 0) + time.perf_counter() - start
+
+    def start_family(self, name):
+        # Starts timing a constraint family. It runs until the next family starts or build_constraints ends
+        if not getattr(self, '_timing_families', False):
+            return
+        self.end_family()
+        self._family = (name, time.perf_counter())
+
+    def end_family(self):
+        if getattr(self, '_family', None) is None:
+            return
+        name, start = self._family
+        family = getattr(self.constraints, name, None)
+        count = len(family) if isinstance(family, (dict, list)) else 1
+        self.profile['constraint_families'][name] = {'time': time.perf_counter() - start, 'count': count}
+        self._family = None
+
+    def record_statistics(self):
+        # Gurobi statistics of the current model. Runtime, IterCount and NodeCount only exist after a solve, MIPGap after a MIP solve
+        for attribute in STATISTICS:
+            try:
+                self.profile['statistics'][attribute] = self.model.getAttr(attribute)
+            except (gp.GurobiError, AttributeError):
+                pass
+
+    def build_components(self, verbose: bool = True):
+        # Calls the functions to build the variables, constraints, and objective function of self.model
+        self.reset_profile()
+
+        if verbose:
+            print("\nBuilding variables")
+        with self.timed('variables'):
+            self.build_variables()
+
+        if verbose:
+            print("\nBuilding constraints")
+        with self.timed('constraints'):
+            self._timing_families = True
+            try:
+                self.build_constraints()
+                self.end_family()
+            finally:
+                self._timing_families = False
+
+        if verbose:
+            print("\nBuilding objective function")
+        with self.timed('objective'):
+            self.build_objective_function()
+
+        with self.timed('update'):
+            self.model.update()
+        self.record_statistics()
+        if verbose:
+            print(f"Number of variables: {self.model.NumVars}")
+            print(f"Number of constraints: {self.model.NumConstrs}")
+
+    def solve(self):
+        # Optimizes self.model and records the statistics of the solve
+        with self.timed('solve'):
+            self.model.optimize()
+        self.profile['solves'] += 1
+        self.record_statistics()
+
+    def extract(self):
+        # Saves the results of the solved model
+        with self.timed('extract'):
+            self.save_results()
+
+    def dump_profile(self, path):
+        # Writes the profile as JSON
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.profile, f, indent=2)
+        return path